@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: memory.py
+#
+#  Description: Peak memory of linting generated designs: N files of one
+#  entity and an architecture of 3,000 signal assignments each, linted by
+#  "python3 . -l" in a child process.
+#
+#  Usage: python3 benchmarks/memory.py [--repo PATH] [--files N [N ...]]
+#
+# -----------------------------------------------------------------------------
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+
+UNIT = '''entity e{0} is
+  port (a : in std_logic; b : in std_logic; y : out std_logic);
+end e{0};
+architecture rtl of e{0} is
+  signal s0, s1, s2, s3, s4, s5, s6, s7 : std_logic;
+begin
+{1}
+  y <= s0;
+end rtl;
+'''
+
+
+def generate(_directory, _num_files, _num_assignments):
+    """ Write _num_files design files of _num_assignments assignments each """
+    body = '\n'.join('  s{} <= a and b;'.format(i % 8) for i in range(_num_assignments))
+    for k in range(_num_files):
+        with open(os.path.join(_directory, 'f{}.vhdl'.format(k)), 'w') as f:
+            f.write(UNIT.format(k, body))
+
+
+def peak_rss(_argv, _cwd):
+    """ Peak resident set size of a child process in MB """
+    with open(os.devnull, 'w') as devnull:
+        process = subprocess.Popen(_argv, cwd=_cwd, stdout=devnull, stderr=devnull)
+        _, _, usage = os.wait4(process.pid, 0)
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return usage.ru_maxrss / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the peak memory of linting.')
+    parser.add_argument('--repo', default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help='turquoise checkout to benchmark (default: this one)')
+    parser.add_argument('--files', type=int, nargs='+', default=[50, 200],
+                        help='numbers of generated files')
+    parser.add_argument('--assignments', type=int, default=3000,
+                        help='signal assignments per architecture')
+    parser.add_argument('--tokenizer', default='fast', help='tokenizer backend')
+    args = parser.parse_args()
+
+    for num_files in args.files:
+        with tempfile.TemporaryDirectory(prefix='turquoise-bench-') as tmp:
+            design = os.path.join(tmp, 'design')
+            os.mkdir(design)
+            generate(design, num_files, args.assignments)
+            rss = peak_rss([sys.executable, os.path.abspath(args.repo), '-l', design,
+                            '--tokenizer', args.tokenizer, '--no-cache'], tmp)
+        print('N = {:<6} {:7.0f} MB'.format(num_files, rss))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: parsers.py
+#
+#  Description: Micro benchmark of the DFA parsers: time per call of
+#  entity, architecture, signal and range parsing over pre-tokenized input.
+#
+#  Usage: python3 benchmarks/parsers.py [--repo PATH]
+#
+# -----------------------------------------------------------------------------
+import os
+import sys
+import timeit
+import argparse
+
+ENTITY = ('entity e is generic(W : integer := 4; D : time); port(a, b : in std_logic; '
+          'c : out std_logic_vector(7 downto 0)); end e;')
+ARCHITECTURE = 'architecture rtl of e is signal s : std_logic; begin c <= a and b; end rtl;'
+SIGNAL = "signal s, t : std_logic := '0';"
+RANGE = '(7 downto 0)'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the DFA parsers per call.')
+    parser.add_argument('--repo', default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help='turquoise checkout to benchmark (default: this one)')
+    parser.add_argument('-n', '--number', type=int, default=2000, help='calls per repeat')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='repeats, the best is kept')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.repo))
+    from pyVHDLParser.Token.Parser import Tokenizer
+    from src.Entity import parse_entity_component
+    from src.Architecture import parse_architecture
+    from src.Signal import parse_signal
+    from src.Prims import parse_to_downto
+    from src.Logger import Logger
+    try:
+        from src.Tokenize import significant_tokens
+    except ImportError:
+        # Checkouts whose parsers read the raw pyVHDLParser token stream
+        significant_tokens = list
+
+    def tokens(_source):
+        # Drop the start and end of document tokens
+        return list(significant_tokens(iter(list(Tokenizer.GetVHDLTokenizer(_source))[1:-1])))
+
+    for name, parse, source in [('entity', parse_entity_component, ENTITY),
+                                ('architecture', parse_architecture, ARCHITECTURE),
+                                ('signal', parse_signal, SIGNAL),
+                                ('to_downto', parse_to_downto, RANGE)]:
+        token_list = tokens(source)
+        best = min(timeit.repeat(lambda: parse(iter(token_list), Logger(), 'bench.vhd'),
+                                 number=args.number, repeat=args.repeat))
+        print('{:<14} {:7.1f} us'.format(name, best / args.number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
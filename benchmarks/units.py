@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: units.py
+#
+#  Description: Lint time of one generated file of many design units
+#  (entity and architecture pairs), linted by "python3 . -l" in a child
+#  process.
+#
+#  Usage: python3 benchmarks/units.py [--repo PATH] [--units N [N ...]]
+#
+# -----------------------------------------------------------------------------
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+UNIT = '''entity e{0} is
+  port (a : in std_logic; b : in std_logic; y : out std_logic);
+end e{0};
+architecture rtl of e{0} is
+  signal s0, s1 : std_logic;
+  signal s2 : std_logic_vector(7 downto 0);
+  constant c : integer := 4;
+begin
+  s0 <= a and b;
+  s1 <= a or s0;
+  s2 <= (others => s1);
+  y <= s2(c);
+end rtl;
+'''
+
+
+def generate(_filename, _num_units):
+    """ Write a file of _num_units design units """
+    with open(_filename, 'w') as f:
+        for k in range(_num_units // 2):
+            f.write(UNIT.format(k))
+
+
+def wall_time(_argv, _cwd, _repeat):
+    """ Best wall clock time of a command over _repeat runs, in seconds """
+    best = None
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(_repeat):
+            start = time.perf_counter()
+            subprocess.run(_argv, cwd=_cwd, stdout=devnull, stderr=devnull)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time linting of a file of many units.')
+    parser.add_argument('--repo', default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help='turquoise checkout to benchmark (default: this one)')
+    parser.add_argument('--units', type=int, nargs='+', default=[1200, 4800],
+                        help='numbers of design units in the generated file')
+    parser.add_argument('--tokenizer', default='fast', help='tokenizer backend')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='runs, the best is kept')
+    args = parser.parse_args()
+
+    for num_units in args.units:
+        with tempfile.TemporaryDirectory(prefix='turquoise-bench-') as tmp:
+            design = os.path.join(tmp, 'units.vhdl')
+            generate(design, num_units)
+            elapsed = wall_time([sys.executable, os.path.abspath(args.repo), '-l', design,
+                                 '--tokenizer', args.tokenizer, '--no-cache'], tmp, args.repeat)
+        print('{:>6} units {:7.2f} s'.format(num_units, elapsed))
+
+
+if __name__ == '__main__':
+    main()
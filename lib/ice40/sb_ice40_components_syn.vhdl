@@ -0,0 +1,218 @@
+-- -----------------------------------------------------------------------------
+--  Turquoise - VHDL linter and compilation toolchain
+--  Copyright (c) 2020-2021: Turquoise team
+--
+--  File name: sb_ice40_components_syn.vhdl
+--
+--  Description: Component declarations of the iCE40 primitives, analyzed
+--  once into library "sb_ice40_components_syn" by the GHDL library cache.
+--  Use with:
+--      library sb_ice40_components_syn;
+--      use sb_ice40_components_syn.components.all;
+--
+-- -----------------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+
+package components is
+
+    -- Logic cells
+    component SB_LUT4 is
+        generic (
+            LUT_INIT : std_logic_vector(15 downto 0) := x"0000"
+        );
+        port (
+            O : out std_logic;
+            I0 : in std_logic := '0';
+            I1 : in std_logic := '0';
+            I2 : in std_logic := '0';
+            I3 : in std_logic := '0'
+        );
+    end component;
+
+    component SB_CARRY is
+        port (
+            CO : out std_logic;
+            I0 : in std_logic := '0';
+            I1 : in std_logic := '0';
+            CI : in std_logic := '0'
+        );
+    end component;
+
+    component SB_DFF is
+        port (
+            Q : out std_logic;
+            C : in std_logic;
+            D : in std_logic
+        );
+    end component;
+
+    component SB_DFFE is
+        port (
+            Q : out std_logic;
+            C : in std_logic;
+            E : in std_logic;
+            D : in std_logic
+        );
+    end component;
+
+    component SB_DFFR is
+        port (
+            Q : out std_logic;
+            C : in std_logic;
+            R : in std_logic;
+            D : in std_logic
+        );
+    end component;
+
+    component SB_DFFS is
+        port (
+            Q : out std_logic;
+            C : in std_logic;
+            S : in std_logic;
+            D : in std_logic
+        );
+    end component;
+
+    component SB_DFFSR is
+        port (
+            Q : out std_logic;
+            C : in std_logic;
+            R : in std_logic;
+            D : in std_logic
+        );
+    end component;
+
+    component SB_DFFSS is
+        port (
+            Q : out std_logic;
+            C : in std_logic;
+            S : in std_logic;
+            D : in std_logic
+        );
+    end component;
+
+    -- IO and global buffers
+    component SB_IO is
+        generic (
+            PIN_TYPE : std_logic_vector(5 downto 0) := "000000";
+            PULLUP : std_logic := '0';
+            NEG_TRIGGER : std_logic := '0';
+            IO_STANDARD : string := "SB_LVCMOS"
+        );
+        port (
+            PACKAGE_PIN : inout std_logic;
+            LATCH_INPUT_VALUE : in std_logic := '0';
+            CLOCK_ENABLE : in std_logic := '1';
+            INPUT_CLK : in std_logic := '0';
+            OUTPUT_CLK : in std_logic := '0';
+            OUTPUT_ENABLE : in std_logic := '0';
+            D_OUT_0 : in std_logic := '0';
+            D_OUT_1 : in std_logic := '0';
+            D_IN_0 : out std_logic;
+            D_IN_1 : out std_logic
+        );
+    end component;
+
+    component SB_GB is
+        port (
+            USER_SIGNAL_TO_GLOBAL_BUFFER : in std_logic;
+            GLOBAL_BUFFER_OUTPUT : out std_logic
+        );
+    end component;
+
+    -- Clocks
+    component SB_HFOSC is
+        generic (
+            CLKHF_DIV : string := "0b00"
+        );
+        port (
+            CLKHFPU : in std_logic := '1';
+            CLKHFEN : in std_logic := '1';
+            CLKHF : out std_logic
+        );
+    end component;
+
+    component SB_LFOSC is
+        port (
+            CLKLFPU : in std_logic := '1';
+            CLKLFEN : in std_logic := '1';
+            CLKLF : out std_logic
+        );
+    end component;
+
+    component SB_PLL40_CORE is
+        generic (
+            FEEDBACK_PATH : string := "SIMPLE";
+            DIVR : std_logic_vector(3 downto 0) := "0000";
+            DIVF : std_logic_vector(6 downto 0) := "0000000";
+            DIVQ : std_logic_vector(2 downto 0) := "000";
+            FILTER_RANGE : std_logic_vector(2 downto 0) := "000"
+        );
+        port (
+            REFERENCECLK : in std_logic;
+            PLLOUTCORE : out std_logic;
+            PLLOUTGLOBAL : out std_logic;
+            RESETB : in std_logic := '1';
+            BYPASS : in std_logic := '0';
+            LOCK : out std_logic
+        );
+    end component;
+
+    -- Memories
+    component SB_RAM40_4K is
+        generic (
+            READ_MODE : integer := 0;
+            WRITE_MODE : integer := 0
+        );
+        port (
+            RDATA : out std_logic_vector(15 downto 0);
+            RCLK : in std_logic;
+            RCLKE : in std_logic := '1';
+            RE : in std_logic := '0';
+            RADDR : in std_logic_vector(10 downto 0);
+            WCLK : in std_logic;
+            WCLKE : in std_logic := '1';
+            WE : in std_logic := '0';
+            WADDR : in std_logic_vector(10 downto 0);
+            MASK : in std_logic_vector(15 downto 0) := x"0000";
+            WDATA : in std_logic_vector(15 downto 0)
+        );
+    end component;
+
+    component SB_SPRAM256KA is
+        port (
+            ADDRESS : in std_logic_vector(13 downto 0);
+            DATAIN : in std_logic_vector(15 downto 0);
+            MASKWREN : in std_logic_vector(3 downto 0);
+            WREN : in std_logic;
+            CHIPSELECT : in std_logic;
+            CLOCK : in std_logic;
+            STANDBY : in std_logic := '0';
+            SLEEP : in std_logic := '0';
+            POWEROFF : in std_logic := '1';
+            DATAOUT : out std_logic_vector(15 downto 0)
+        );
+    end component;
+
+    -- LED driver
+    component SB_RGBA_DRV is
+        generic (
+            CURRENT_MODE : string := "0b0";
+            RGB0_CURRENT : string := "0b000000";
+            RGB1_CURRENT : string := "0b000000";
+            RGB2_CURRENT : string := "0b000000"
+        );
+        port (
+            CURREN : in std_logic;
+            RGBLEDEN : in std_logic;
+            RGB0PWM : in std_logic;
+            RGB1PWM : in std_logic;
+            RGB2PWM : in std_logic;
+            RGB0 : out std_logic;
+            RGB1 : out std_logic;
+            RGB2 : out std_logic
+        );
+    end component;
+
+end package;
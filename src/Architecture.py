@@ -8,17 +8,16 @@
 #  Description: Implementation of DFAs that parse through architecture syntax
 #
 # -----------------------------------------------------------------------------
-from pyVHDLParser.Token import StartOfDocumentToken, EndOfDocumentToken, \
-                               SpaceToken, LinebreakToken, CommentToken, \
-                               IndentationToken
 from pyVHDLParser.Base import ParserException
+from array import array
+from collections import deque
 from enum import Enum
-from itertools import chain
 
-from .State import DFA, State
+from .State import DFA, Grammar, State
 from .Messages import Error, Warning
 from .Entity import parse_entity_component
 from .Signal import parse_signal
+from .Tokenize import SourcePosition, TokenCursor
 
 
 class ArchStateEnum(Enum):
@@ -38,14 +37,19 @@ class ArchStateEnum(Enum):
 
 
 class Architecture:
+    """
+    Summary of a parsed architecture. Only names and positions are kept, so
+    no token outlives the parse of its file.
+    """
     def __init__(self):
         self._name = ''
         self._entity_name = ''
         self._declared_signals = {}
         self._declared_components = []
-        self._portmaps = []
-        self._assigned_signals = []
-        self._body_tokens = []
+        self._instances = {}
+        self._assigned_names = []
+        self._assigned_positions = array('Q')
+        self._referenced_names = set()
 
     def set_name(self, name):
         self._name = name
@@ -59,11 +63,16 @@ class Architecture:
     def add_declared_component(self, component):
         self._declared_components.append(component)
 
-    def add_assigned_signal(self, token):
-        self._assigned_signals.append(token)
+    def add_assigned_signal(self, signal_name, position):
+        # Positions are packed as (row, column, absolute) integers
+        self._assigned_names.append(signal_name)
+        self._assigned_positions.extend(position)
+
+    def add_referenced_name(self, name):
+        self._referenced_names.add(name)
 
-    def add_body_token(self, token):
-        self._body_tokens.append(token)
+    def add_instance(self, unit_name):
+        self._instances[unit_name] = self._instances.get(unit_name, 0) + 1
 
     @property
     def name(self):
@@ -83,11 +92,19 @@ class Architecture:
 
     @property
     def assigned_signals(self):
-        return self._assigned_signals
+        """ (signal name, SourcePosition) pairs in assignment order """
+        positions = self._assigned_positions
+        for i, signal_name in enumerate(self._assigned_names):
+            yield signal_name, SourcePosition(*positions[3 * i:3 * i + 3])
 
     @property
-    def body_tokens(self):
-        return self._body_tokens
+    def referenced_names(self):
+        return self._referenced_names
+
+    @property
+    def instances(self):
+        """ Dict of instantiated unit name to number of instances """
+        return self._instances
 
     def __str__(self):
         return 'ARCHITECTURE {} of {}'.format(self._name, self._entity_name)
@@ -96,101 +113,135 @@ class Architecture:
         return 'ARCHITECTURE {} of {}'.format(self._name, self._entity_name)
 
 
+class _ArchParse:
+    """ Per-call state of parse_architecture """
+    def __init__(self, _token_iter, _logger, _filename):
+        self.token_iter = _token_iter
+        self.logger = _logger
+        self.filename = _filename
+        self.parsed = Architecture()
+
+        # Token tracker
+        self.prev_token = None
+
+        # Last body token values, used to recognize instantiations
+        self.body_window = deque(maxlen=6)
+
+
+# DFA callbacks
+def _set_arch_name(ctx, name):
+    ctx.parsed.set_name(name.value)
+
+
+def _set_entity_name(ctx, name):
+    ctx.parsed.set_entity_name(name.value)
+
+
+def _add_components_and_sigs(ctx, name):
+    _logger, _filename = ctx.logger, ctx.filename
+
+    if name.value == 'component':
+        ctx.token_iter.push_back(name)
+        comp = parse_entity_component(ctx.token_iter, _logger, _filename)
+
+        if comp is None:
+            err = Error(name.Start, _filename, 'Invalid syntax for component declaration',
+                        rule='syntax')
+            _logger.add_log(err)
+        else:
+            ctx.parsed.add_declared_component(comp)
+
+    elif name.value == 'signal' or name.value == 'constant':
+        ctx.token_iter.push_back(name)
+        signal_dict = parse_signal(ctx.token_iter, _logger, _filename)
+
+        if signal_dict is None:
+            err = Error(name.Start, _filename, 'Invalid syntax for signal/constant declaration',
+                        rule='syntax')
+            _logger.add_log(err)
+        else:
+            for signal_name in signal_dict:
+                ctx.parsed.add_declared_signal(signal_name, signal_dict[signal_name])
+
+
+def _add_assigned_token(ctx, name):
+    ctx.parsed.add_assigned_signal(ctx.prev_token.value, ctx.prev_token.Start)
+
+
+def _instantiated_unit(window):
+    # label : [component | entity lib.]unit [(arch)] (generic | port) map
+    i = len(window) - 2
+    if i >= 3 and window[i] == ')' and window[i - 2] == '(':
+        i -= 3
+    if i >= 1 and window[i - 1] in (':', 'component', '.'):
+        return window[i]
+    return None
+
+
+def _add_body_token(ctx, name):
+    ctx.parsed.add_referenced_name(name.value)
+
+    window = ctx.body_window
+    if name.value == 'map' and window and window[-1] in ('port', 'generic'):
+        unit_name = _instantiated_unit(list(window))
+        if unit_name is not None:
+            ctx.parsed.add_instance(unit_name)
+    window.append(name.value)
+
+
+# =============================================================================
+# Build parse_architecture grammar
+# =============================================================================
+ARCH_GRAMMAR = Grammar('parse_arch', ArchStateEnum.START, [ArchStateEnum.SUCCESS])
+
+# Parse entity and port syntax
+ARCH_GRAMMAR.add_transition(ArchStateEnum.START, ArchStateEnum.ARCH, 'architecture')
+ARCH_GRAMMAR.add_transition(ArchStateEnum.ARCH, ArchStateEnum.ARCH_NAME, '_*_',
+                            _set_arch_name)
+ARCH_GRAMMAR.add_transition(ArchStateEnum.ARCH_NAME, ArchStateEnum.OF, 'of')
+ARCH_GRAMMAR.add_transition(ArchStateEnum.OF, ArchStateEnum.ENTITY_NAME, '_*_',
+                            _set_entity_name)
+ARCH_GRAMMAR.add_transition(ArchStateEnum.ENTITY_NAME,ArchStateEnum.IS, 'is')
+ARCH_GRAMMAR.add_transition(ArchStateEnum.IS, ArchStateEnum.IS, '_*_',
+                            _add_components_and_sigs)
+
+ARCH_GRAMMAR.add_transition(ArchStateEnum.IS, ArchStateEnum.BEGIN_ARCH, 'begin')
+ARCH_GRAMMAR.add_transition(ArchStateEnum.BEGIN_ARCH,
+                            ArchStateEnum.ASSIGN, '<=', _add_assigned_token)
+ARCH_GRAMMAR.add_transition(ArchStateEnum.ASSIGN,
+                            ArchStateEnum.BEGIN_ARCH, '_*_', _add_body_token)
+ARCH_GRAMMAR.add_transition(ArchStateEnum.BEGIN_ARCH, ArchStateEnum.NEW_BEGIN_BLK, 'begin')
+ARCH_GRAMMAR.add_transition(ArchStateEnum.NEW_BEGIN_BLK,
+                            ArchStateEnum.ASSIGN_NEW_BEGIN_BLK, '<=', _add_assigned_token)
+ARCH_GRAMMAR.add_transition(ArchStateEnum.ASSIGN_NEW_BEGIN_BLK,
+                            ArchStateEnum.NEW_BEGIN_BLK, '_*_', _add_body_token)
+
+ARCH_GRAMMAR.add_transition(ArchStateEnum.NEW_BEGIN_BLK,
+                            ArchStateEnum.NEW_BEGIN_BLK, '_*_', _add_body_token)
+ARCH_GRAMMAR.add_transition(ArchStateEnum.NEW_BEGIN_BLK, ArchStateEnum.BEGIN_ARCH, 'end')
+
+ARCH_GRAMMAR.add_transition(ArchStateEnum.BEGIN_ARCH,
+                            ArchStateEnum.BEGIN_ARCH, '_*_', _add_body_token)
+ARCH_GRAMMAR.add_transition(ArchStateEnum.BEGIN_ARCH, ArchStateEnum.END, 'end')
+ARCH_GRAMMAR.add_transition(ArchStateEnum.END, ArchStateEnum.SUCCESS, ';')
+ARCH_GRAMMAR.add_transition(ArchStateEnum.END, ArchStateEnum.END_ARCH, '_*_')
+ARCH_GRAMMAR.add_transition(ArchStateEnum.END_ARCH, ArchStateEnum.SUCCESS, ';')
+ARCH_GRAMMAR.compile()
+
+
 def parse_architecture(_token_iter, _logger, _filename):
     """
     @brief Helper function. Parse architecture syntax
-    @param _token_iter Token Iteration
+    @param _token_iter Token Iteration, a TokenCursor
     @param _logger Logger instance
     @param _filename Current file name that is being linted
     @return Parsed Architecture class
     """
-    # Token tracker
-    curr_token = None
-    prev_token = None
-
-    parsed = Architecture()
-    arch_name = ''
-    entity_name = ''
-
-    # DFA callbacks
-    def _set_arch_name(name):
-        nonlocal parsed, arch_name
-        arch_name = name.Value.lower()
-        parsed.set_name(arch_name)
-
-    def _set_entity_name(name):
-        nonlocal parsed, entity_name
-        entity_name = name.Value.lower()
-        parsed.set_entity_name(entity_name)
-
-    def _add_components_and_sigs(name):
-        nonlocal parsed
-        if name.Value.lower() == 'component':
-            new_token_iter = chain([name], _token_iter)
-            comp = parse_entity_component(new_token_iter, _logger, _filename)
-
-            if comp is None:
-                err = Error(name.Start, _filename, 'Invalid syntax for component declaration')
-                _logger.add_log(err)
-            else:
-                parsed.add_declared_component(comp)
-
-        elif name.Value.lower() == 'signal' or name.Value.lower() == 'constant':
-            new_token_iter = chain([name], _token_iter)
-            signal_dict = parse_signal(new_token_iter, _logger, _filename)
-
-            if signal_dict is None:
-                err = Error(name.Start, _filename, 'Invalid syntax for signal/constant declaration')
-                _logger.add_log(err)
-            else:
-                for signal_name in signal_dict:
-                    parsed.add_declared_signal(signal_name, signal_dict[signal_name])
-
-    def _add_assigned_token(name):
-        nonlocal prev_token, parsed
-        parsed.add_assigned_signal(prev_token)
-
-    def _add_body_token(name):
-        nonlocal parsed
-        parsed.add_body_token(name)
+    if not isinstance(_token_iter, TokenCursor):
+        _token_iter = TokenCursor(_token_iter)
 
-    # =========================================================================
-    # Build parse_architecture DFA
-    # =========================================================================
-    dfa = DFA('parse_arch', ArchStateEnum.START, [ArchStateEnum.SUCCESS])
-
-    # Parse entity and port syntax
-    dfa.add_transition(ArchStateEnum.START, ArchStateEnum.ARCH, 'architecture')
-    dfa.add_transition(ArchStateEnum.ARCH, ArchStateEnum.ARCH_NAME, '_*_',
-                       _set_arch_name)
-    dfa.add_transition(ArchStateEnum.ARCH_NAME, ArchStateEnum.OF, 'of')
-    dfa.add_transition(ArchStateEnum.OF, ArchStateEnum.ENTITY_NAME, '_*_',
-                       _set_entity_name)
-    dfa.add_transition(ArchStateEnum.ENTITY_NAME,ArchStateEnum.IS, 'is')
-    dfa.add_transition(ArchStateEnum.IS, ArchStateEnum.IS, '_*_',
-                       _add_components_and_sigs)
-
-    dfa.add_transition(ArchStateEnum.IS, ArchStateEnum.BEGIN_ARCH, 'begin')
-    dfa.add_transition(ArchStateEnum.BEGIN_ARCH,
-                       ArchStateEnum.ASSIGN, '<=', _add_assigned_token)
-    dfa.add_transition(ArchStateEnum.ASSIGN,
-                       ArchStateEnum.BEGIN_ARCH, '_*_', _add_body_token)
-    dfa.add_transition(ArchStateEnum.BEGIN_ARCH, ArchStateEnum.NEW_BEGIN_BLK, 'begin')
-    dfa.add_transition(ArchStateEnum.NEW_BEGIN_BLK,
-                       ArchStateEnum.ASSIGN_NEW_BEGIN_BLK, '<=', _add_assigned_token)
-    dfa.add_transition(ArchStateEnum.ASSIGN_NEW_BEGIN_BLK,
-                       ArchStateEnum.NEW_BEGIN_BLK, '_*_', _add_body_token)
-
-    dfa.add_transition(ArchStateEnum.NEW_BEGIN_BLK,
-                       ArchStateEnum.NEW_BEGIN_BLK, '_*_', _add_body_token)
-    dfa.add_transition(ArchStateEnum.NEW_BEGIN_BLK, ArchStateEnum.BEGIN_ARCH, 'end')
-
-    dfa.add_transition(ArchStateEnum.BEGIN_ARCH,
-                       ArchStateEnum.BEGIN_ARCH, '_*_', _add_body_token)
-    dfa.add_transition(ArchStateEnum.BEGIN_ARCH, ArchStateEnum.END, 'end')
-    dfa.add_transition(ArchStateEnum.END, ArchStateEnum.SUCCESS, ';')
-    dfa.add_transition(ArchStateEnum.END, ArchStateEnum.END_ARCH, '_*_')
-    dfa.add_transition(ArchStateEnum.END_ARCH, ArchStateEnum.SUCCESS, ';')
+    ctx = _ArchParse(_token_iter, _logger, _filename)
+    dfa = DFA(ARCH_GRAMMAR, ctx)
 
     # =========================================================================
     # Token stream iteration
@@ -198,22 +249,16 @@ def parse_architecture(_token_iter, _logger, _filename):
     while not dfa.is_finished:
         try:
             token = next(_token_iter)
-            curr_token = token
-            if isinstance(token, (StartOfDocumentToken, EndOfDocumentToken,
-                                  LinebreakToken, SpaceToken,
-                                  IndentationToken, CommentToken)):
-                pass
-            else:
-                dfa.step(token)
-
-                # Update previous token (a little hacky)
-                # This is used to get port map's name and assigned tokens
-                if token.Value.lower() != '(' and token.Value.lower() != ')' and \
-                   not token.Value.isdigit() and token.Value.lower() != 'downto':
-                    prev_token = token
+            dfa.step(token)
+
+            # Update previous token (a little hacky)
+            # This is used to get port map's name and assigned tokens
+            if token.value != '(' and token.value != ')' and \
+               not token.value.isdigit() and token.value != 'downto':
+                ctx.prev_token = token
 
         except ParserException as ex:
-            err = Error(token.Start, _filename, str(ex))
+            err = Error(token.Start, _filename, str(ex), rule='parse-error')
             _logger.add_log(err)
             break
 
@@ -224,4 +269,4 @@ def parse_architecture(_token_iter, _logger, _filename):
     if not dfa.is_finished_successfully:
         return None
 
-    return parsed
\ No newline at end of file
+    return ctx.parsed
\ No newline at end of file
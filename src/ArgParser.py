@@ -10,14 +10,39 @@
 #
 # -----------------------------------------------------------------------------
 import argparse
+import atexit
+import contextlib
+import difflib
+import io
 import sys
-import subprocess
 import os
+import shutil
 from glob import glob
 
-from .Tokenize import Tokenize
+from .Tokenize import Tokenize, TOKENIZERS
 from .Linter import Linter
+from .Logger import Logger, DEFAULT_SPILL_SIZE
+from .Watch import FileWatcher, VHDL_PATTERNS
+from .Cache import ParseCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE
 from .Messages import pp
+from .Report import open_report, REPORT_FORMATS
+from .Index import SymbolIndex, DEFAULT_INDEX_PATH
+from .Build import ghdl_files, file_dependencies, BuildManifest, DEFAULT_WORKDIR, MANIFEST_NAME, \
+    GHDL
+from .Artifacts import ArtifactStore, file_digest, tool_id
+from .Runner import StageRunner
+from .Libraries import LibraryCache, DEFAULT_LIBRARY_CACHE, GHDL_PREFIX
+from .Explore import parse_explore_spec, synth_variants, explore, best_run, write_results
+from .Wave import WAVE_FORMATS, parse_time, parse_window, format_time, format_size, trim_vcd, \
+    VCDIndex
+from .Testbench import find_testbenches, testbench_units, run_testbenches, result_flags, \
+    TestResult, TEST_RESULTS_NAME
+
+YOSYS = './dist/fpga-toolchain/bin/yosys'
+NEXTPNR = './dist/fpga-toolchain/bin/nextpnr-ice40'
+ICEPACK = './dist/fpga-toolchain/bin/icepack'
+ICEPROG = './dist/fpga-toolchain/bin/iceprog'
+GTKWAVE = './dist/gtkwave/Contents/MacOS/gtkwave'
 
 class App:
 
@@ -38,23 +63,167 @@ class App:
                        help="upload VHDL unit to board")
         g.add_argument("-x", "--clean", action='store_true',
                        help="clean compiled binaries and waveforms")
+        g.add_argument("--test", metavar='path',
+                       help="run every *_tb testbench of VHDL file(s), skipping testbenches " +
+                            "unchanged since they last passed")
+        g.add_argument("--diff-tokenizers", nargs='+', metavar='path',
+                       help="lint VHDL file(s) with every tokenizer backend and " +
+                            "check that the diagnostics match")
+        g.add_argument("--find-entity", metavar='name',
+                       help="find where an entity and its architectures are declared")
+        g.add_argument("--who-uses", metavar='entity',
+                       help="find architectures declaring or instantiating entity")
+        g.add_argument("--ports", metavar='entity',
+                       help="list generics and ports of an entity")
+        g.add_argument("--wave-query", nargs='+', metavar=('vcd', 'query'),
+                       help="query a VCD dump without gtkwave: 'signals', " +
+                            "'value SIGNAL T' or 'changes SIGNAL T0 T1'")
+
+        self._parser.add_argument("-j", "--jobs", metavar='N', type=int,
+                                  help="number of parallel jobs used by the linter and by the " +
+                                       "dependency scan of GHDL analysis/compilation")
+
+        self._parser.add_argument("--tokenizer", choices=TOKENIZERS, default='pyvhdlparser',
+                                  help="tokenizer backend used by the linter")
+        self._parser.add_argument("--watch", action='store_true',
+                                  help="keep linting the path given to -l as files change")
+        self._parser.add_argument("--no-cache", action='store_true',
+                                  help="do not use the linter parse cache")
+        self._parser.add_argument("--cache-dir", metavar='dir', default=DEFAULT_CACHE_DIR,
+                                  help="linter parse cache directory")
+        self._parser.add_argument("--cache-size", metavar='MB', type=int,
+                                  default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+                                  help="maximum size of the linter parse cache")
+        self._parser.add_argument("--max-log-records", metavar='N', type=int,
+                                  default=DEFAULT_SPILL_SIZE,
+                                  help="diagnostics kept in memory before spilling to a " +
+                                       "temporary file")
+        self._parser.add_argument("--format", choices=REPORT_FORMATS,
+                                  help="stream linter diagnostics in a machine readable " +
+                                       "format to the file given to --output")
+        self._parser.add_argument("--output", metavar='file',
+                                  help="linter diagnostics report file")
+        self._parser.add_argument("--index", metavar='file', default=DEFAULT_INDEX_PATH,
+                                  help="project symbol index updated by the linter and " +
+                                       "used by the query commands")
+        self._parser.add_argument("--no-index", action='store_true',
+                                  help="do not update the project symbol index")
+        self._parser.add_argument("--max-per-rule", metavar='N', type=int,
+                                  help="report at most N linter diagnostics per rule")
+        self._parser.add_argument("--max-per-file", metavar='N', type=int,
+                                  help="report at most N linter diagnostics per file")
+        self._parser.add_argument("--no-artifact-cache", action='store_true',
+                                  help="always run synthesis, place-and-route and bitstream " +
+                                       "generation instead of restoring unchanged outputs")
+        self._parser.add_argument("--force", action='store_true',
+                                  help="analyze/compile every file, even if its inputs are " +
+                                       "unchanged since the last successful run")
+        self._parser.add_argument("--signals", metavar='file',
+                                  help="with -w, only dump the signals selected by a GHDL " +
+                                       "wave option file")
+        self._parser.add_argument("--wave-format", choices=WAVE_FORMATS, default='vcd',
+                                  help="waveform format written by -w")
+        self._parser.add_argument("--stop-time", metavar='T',
+                                  help="with -w or --test, stop the simulation at time T, " +
+                                       "e.g. 10us")
+        self._parser.add_argument("--test-timeout", metavar='S', type=float, default=600,
+                                  help="with --test, fail a testbench running longer than S " +
+                                       "seconds")
+        self._parser.add_argument("--window", metavar='T0:T1',
+                                  help="with -w, only keep the waveform from T0 to T1 " +
+                                       "(T0 > 0 requires --wave-format vcd)")
+        self._parser.add_argument("--explore", metavar='spec',
+                                  help="with -u, synthesize and route with every combination " +
+                                       "of placement seeds and synth_ice40 flags, e.g. " +
+                                       "seeds=16,abc9,retime, with -j jobs (default: one per " +
+                                       "core) and keep the best fmax")
+        self._parser.add_argument("--workdir", metavar='dir', default=DEFAULT_WORKDIR,
+                                  help="GHDL work library directory of the project")
+        self._parser.add_argument("--library-cache", metavar='dir', default=DEFAULT_LIBRARY_CACHE,
+                                  help="shared cache of pre-analyzed ieee and iCE40 " +
+                                       "libraries, built once per toolchain version")
+        self._parser.add_argument("--trace", metavar='file',
+                                  help="write a Chrome trace event file with the timing " +
+                                       "and resource usage of every toolchain process")
+        self._parser.add_argument("--hierarchy", metavar='TOP',
+                                  help="print the instance tree of unit TOP of the " +
+                                       "design given to -l")
+        self._parser.add_argument("--hierarchy-json", metavar='file',
+                                  help="also write the instance tree as JSON to file")
 
         args = self._parser.parse_args()
+        if args.format is not None and args.output is None:
+            self._parser.error('--format requires --output')
+        if args.hierarchy is not None and args.lint is None:
+            self._parser.error('--hierarchy requires -l/--lint')
+        if args.hierarchy_json is not None and args.hierarchy is None:
+            self._parser.error('--hierarchy-json requires --hierarchy')
+        if args.explore is not None and args.upload is None:
+            self._parser.error('--explore requires -u/--upload')
+        if args.wave is None and (args.signals is not None or args.window is not None or
+                                  args.wave_format != 'vcd'):
+            self._parser.error('--signals, --wave-format and --window require -w/--wave')
+        if args.stop_time is not None and args.wave is None and args.test is None:
+            self._parser.error('--stop-time requires -w/--wave or --test')
+        if args.stop_time is not None and args.window is not None:
+            self._parser.error('--stop-time and --window are mutually exclusive')
+        if args.signals is not None and not os.path.isfile(args.signals):
+            self._parser.error('--signals: no such file "' + args.signals + '"')
+        self._wave_format = args.wave_format
+        self._signals = args.signals
+        self._stop_time = None
+        self._window_start = 0
+        try:
+            if args.stop_time is not None:
+                self._stop_time = parse_time(args.stop_time)
+            if args.window is not None:
+                self._window_start, self._stop_time = parse_window(args.window)
+        except ValueError as ex:
+            self._parser.error(str(ex))
+        if self._window_start and self._wave_format != 'vcd':
+            self._parser.error('--window start time requires --wave-format vcd')
+
+        self._test_timeout = args.test_timeout if args.test_timeout > 0 else None
+        self._explore = None
+        if args.explore is not None:
+            try:
+                self._explore = parse_explore_spec(args.explore)
+            except ValueError as ex:
+                self._parser.error('--explore: ' + str(ex))
+
+        self._jobs = 1 if args.jobs is None else max(1, args.jobs)
+        self._explore_jobs = (os.cpu_count() or 1) if args.jobs is None else self._jobs
+        self._tokenizer = args.tokenizer
+        self._logger.set_spill_size(args.max_log_records)
+        self._format = args.format
+        self._output = args.output
+        self._max_per_rule = args.max_per_rule
+        self._max_per_file = args.max_per_file
+        self._logger.set_limits(self._max_per_rule, self._max_per_file)
+        self._index_path = None if args.no_index else args.index
+        self._hierarchy = args.hierarchy
+        self._force = args.force
+        self._artifacts = None if args.no_artifact_cache else ArtifactStore()
+        self._trace_path = args.trace
+        self._library_cache_path = args.library_cache
+        self._runner = None
+        self._libraries = None
+        self._workdir = args.workdir
+        self._hierarchy_json = args.hierarchy_json
+        self._cache = None
+        if not args.no_cache:
+            self._cache = ParseCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+        # The toolchain is only set up for the commands running it
+        if args.analyze or args.compile or args.wave or args.upload or args.clean or args.test:
+            self._setup_toolchain()
 
         if args.analyze:
             self._analyze_file_dir(args.analyze)
 
         # Compile file/dir of files
         elif args.compile:
-            if os.path.isfile(args.compile):
-                self._compile_file(args.compile)
-            elif os.path.isdir(args.compile):
-                files = [y for x in os.walk(args.compile)
-                           for y in glob(os.path.join(x[0], '*.vhd[l]'))]
-                for f in files:
-                    self._compile_file(f)
-            else:
-                pp('error', 'Invalid file/dir path.')
+            self._ghdl_file_dir('-c', args.compile)
 
         # Analyze, elaborate, run required files, and simulate unit on gtkwave
         elif args.wave:
@@ -69,105 +238,295 @@ class App:
         # Lint file/dir of files
         elif args.lint:
             pp('info', 'Running "turquoise" linter ...')
+            files = None
             if os.path.isfile(args.lint):
-                self._lint_files([args.lint])
+                files = [args.lint]
             elif os.path.isdir(args.lint):
-                files = [y for x in os.walk(args.lint)
-                           for y in glob(os.path.join(x[0], '*.vhd[l]'))]
-                self._lint_files(files)
+                files = self._vhdl_files(args.lint)
             else:
                 pp('error', 'Failed to lint - Invalid file/dir path.')
 
+            if files is not None and args.watch:
+                self._watch_lint_files(args.lint, files)
+            elif files is not None:
+                self._lint_files(files)
+
         # @TODO: Clean up project
         elif args.clean:
             self._clean()
 
+        # Check that tokenizer backends agree
+        elif args.diff_tokenizers:
+            self._diff_tokenizers(args.diff_tokenizers)
+
+        # Run testbenches
+        elif args.test:
+            self._run_tests(args.test)
+
+        # Query the project symbol index
+        elif args.find_entity:
+            self._query_index('find_entity', args.find_entity)
+        elif args.who_uses:
+            self._query_index('who_uses', args.who_uses)
+        elif args.ports:
+            self._query_index('ports', args.ports)
 
-    def _analyze_file(self, filename):
-        cmd = "./dist/fpga-toolchain/bin/ghdl -a " + "\'" + filename + "\'"
-        pp('info', 'Analyzing file ' + filename + ' ...')
-        returned_value = subprocess.run(cmd, shell=True)
-        if returned_value.returncode == 0:
-            pp('success', 'Finished analyzing successfully!')
+        # Query a waveform dump
+        elif args.wave_query:
+            self._query_wave(args.wave_query[0], args.wave_query[1:])
 
 
     def _analyze_file_dir(self, path):
+        self._ghdl_file_dir('-a', path)
+
+
+    def _ghdl_file_dir(self, option, path):
+        """
+        @brief Analyze (-a) or compile (-c) a file or directory of files with
+        GHDL. Files run in dependency order, one at a time since they share
+        the work library, and files whose inputs did not change since they
+        last succeeded are skipped unless --force is given.
+        @param option GHDL command, '-a' or '-c'
+        @param path VHDL file or directory
+        @return None, exits on failure
+        """
+        if os.path.isfile(path):
+            files = [path]
+        elif os.path.isdir(path):
+            files = self._vhdl_files(path)
+        else:
+            pp('error', 'Failed to ' + ('analyze' if option == '-a' else 'compile') +
+               ' file directory - Invalid file/dir path.')
+            exit(1)
+
+        options = self._ghdl_library_options()
+        manifest = BuildManifest(os.path.join(self._workdir, MANIFEST_NAME))
+        num_failed = ghdl_files(option, files, self._runner, self._jobs, self._cache,
+                                self._tokenizer, manifest, self._force, self._workdir, options)
+        if num_failed:
+            pp('error', str(num_failed) + ' of ' + str(len(files)) + ' file(s) failed.')
+            exit(1)
+
+
+    def _ghdl_library_options(self, std='93c'):
+        """
+        @brief Create the work library directory, and get the GHDL options
+        finding the pre-analyzed libraries of the shared cache
+        @param std VHDL standard of the libraries
+        @return List of GHDL options
+        """
+        os.makedirs(self._workdir, exist_ok=True)
+        directory = self._libraries.get(std)
+        return [] if directory is None else ['-P' + directory]
+
+
+    def _run_tests(self, path):
+        """
+        @brief Elaborate and run the *_tb testbenches of a file or directory
+        of files, up to --jobs at a time. Testbenches whose sources, and the
+        sources these depend on, did not change since they last passed are
+        skipped unless --force is given.
+        @param path VHDL file or directory
+        @return None, exits if a testbench failed
+        """
         if os.path.isfile(path):
-            self._analyze_file(path)
+            files = [path]
         elif os.path.isdir(path):
-            files = [y for x in os.walk(path)
-                       for y in glob(os.path.join(x[0], '*.vhd[l]'))]
-            for f in files:
-                self._analyze_file(f)
+            files = self._vhdl_files(path)
         else:
-            pp('error', 'Failed to analyze file directory - Invalid file/dir path.')
+            pp('error', 'Failed to run testbenches - Invalid file/dir path.')
+            exit(1)
 
+        testbenches = find_testbenches(files)
+        if not testbenches:
+            pp('error', 'No testbench (*_tb.vhd, *_tb.vhdl) found in "' + path + '".')
+            exit(1)
 
-    def _compile_file(self, filename):
-        cmd = "./dist/fpga-toolchain/bin/ghdl -c " + "\'" + filename + "\'"
-        pp('info', 'Compiling file ' + filename + ' ...')
-        returned_value = subprocess.run(cmd, shell=True)
-        if returned_value.returncode == 0:
-            pp('success', 'Finished compiling successfully!')
+        run_options = []
+        if self._stop_time is not None:
+            run_options.append('--stop-time=' + format_time(self._stop_time))
+
+        # A testbench passes again as long as its source closure, the
+        # libraries and the simulation options are unchanged
+        options = ['--workdir=' + self._workdir] + self._ghdl_library_options()
+        deps = file_dependencies(files, self._jobs, self._cache, self._tokenizer)
+        passed = BuildManifest(os.path.join(self._workdir, TEST_RESULTS_NAME))
+        keys = passed.input_keys(files, deps, result_flags(self._runner, options, run_options,
+                                                           self._test_timeout))
+        units = testbench_units([files[i] for i in testbenches], self._jobs, self._cache,
+                                self._tokenizer)
+
+        tests = []
+        unchanged = []
+        for i, names in zip(testbenches, units):
+            for unit in names:
+                if not self._force and passed.is_current('test', unit, keys[i]):
+                    unchanged.append(TestResult(unit, files[i], 'cached'))
+                else:
+                    tests.append((unit, i))
+
+        for result in unchanged:
+            pp('success', str(result))
+
+        results = []
+        if tests:
+            self._ghdl_file_dir('-a', path)
+            pp('info', 'Running ' + str(len(tests)) + ' testbench(es) with ' +
+               str(self._jobs) + ' job(s) ...')
+
+            def progress(result):
+                pp('success' if result.ok else 'error', str(result))
+
+            results = run_testbenches([(unit, files[i]) for unit, i in tests], self._runner,
+                                      options, run_options, self._test_timeout, self._jobs,
+                                      progress)
+            for (unit, i), result in zip(tests, results):
+                if result.ok:
+                    passed.record('test', unit, keys[i], sorted(files[j] for j in deps[i]))
+                else:
+                    passed.forget('test', unit)
+            passed.save()
+
+        num_failed = sum(1 for result in results if not result.ok)
+        pp('info', str(len(results) - num_failed) + ' passed, ' + str(num_failed) +
+           ' failed, ' + str(len(unchanged)) + ' unchanged since they last passed.')
+        if num_failed:
+            exit(1)
 
 
-    def _elaborate_unit(self, unitname):
-        cmd = "./dist/fpga-toolchain/bin/ghdl -e " + unitname
+    def _run_stage(self, stage, argv):
+        """
+        @brief Run a toolchain process, exiting with its log printed on failure
+        @param stage Stage name, used for the log file and the trace
+        @param argv Command as a list of arguments
+        @return StageResult
+        """
+        result = self._runner.run(stage, argv)
+        if not result.ok:
+            self._runner.report_failure(result)
+            exit(1)
+        return result
+
 
+    def _elaborate_unit(self, unitname):
         pp('info', 'Elaborating unit ' + unitname + ' ...')
-        returned_value = subprocess.run(cmd, shell=True)
-        if returned_value.returncode != 0:
-            exit(1)
+        self._run_stage('ghdl-elaborate', [GHDL, '-e', '--workdir=' + self._workdir] +
+                        self._ghdl_library_options() + [unitname])
         pp('success', 'Finished elaborating successfully!')
 
 
     def _elaborate_run_unit(self, unitname):
-        cmd = "./dist/fpga-toolchain/bin/ghdl -r " + unitname + " --vcd=" + unitname + ".vcd"
+        """
+        @brief Run unit, dumping the signals of --signals (all by default) up
+        to --stop-time in the --wave-format format
+        @param unitname Unit to be run
+        @return Waveform file name
+        """
+        dump = unitname + '.' + self._wave_format
+        options = ['--' + ('wave' if self._wave_format == 'ghw' else self._wave_format) + '=' + dump]
+        if self._signals is not None:
+            options.append('--read-wave-opt=' + self._signals)
+        if self._stop_time is not None:
+            options.append('--stop-time=' + format_time(self._stop_time))
+
         pp('info', 'Running unit ' + unitname + ' ...')
-        returned_value = subprocess.run(cmd, shell=True)
-        if returned_value.returncode != 0:
-            exit(1)
+        result = self._run_stage('ghdl-run', [GHDL, '-r', '--workdir=' + self._workdir] +
+                                 self._ghdl_library_options() + [unitname] + options)
+        if self._window_start:
+            trim_vcd(dump, self._window_start)
+
+        size = os.path.getsize(dump) if os.path.isfile(dump) else 0
         pp('success', 'Finished elaborating and running successfully!')
+        pp('info', 'Wrote ' + dump + ' (' + format_size(size) + '), simulation took ' +
+           '{:.2f}'.format(result.wall) + 's.')
+        return dump
 
 
     def _run_gtkwave(self, filename):
-        cmd = "./dist/gtkwave/Contents/MacOS/gtkwave -o " + filename
         pp('info', 'Opening ' + filename + ' in gtkwave ...')
-        returned_value = subprocess.run(cmd, shell=True)
-        if returned_value.returncode != 0:
-            exit(1)
+        # Only VCD dumps benefit from gtkwave's conversion to FST
+        options = ['-o'] if filename.endswith('.vcd') else []
+        self._run_stage('gtkwave', [GTKWAVE] + options + [filename])
         pp('info', 'Closing gtkwave!')
 
 
     def _run_file(self, unitname):
         self._elaborate_unit(unitname)
-        self._elaborate_run_unit(unitname)
-        self._run_gtkwave(unitname + ".vcd")
+        self._run_gtkwave(self._elaborate_run_unit(unitname))
+
+
+    def _setup_toolchain(self):
+        """ Create the stage runner and the library cache used by the toolchain """
+        self._runner = StageRunner(trace_path=self._trace_path)
+        atexit.register(self._runner.close)
+        self._libraries = LibraryCache(self._runner, self._library_cache_path)
+        self._export_ghdl_path()
 
 
     def _export_ghdl_path(self):
-        abspath = os.path.abspath("fpga-toolchain/lib/ghdl")
-        cmd = "export GHDL_PREFIX=" + abspath
-        returned_value = subprocess.run(cmd, shell=True)
-        if returned_value.returncode != 0:
-            exit(1)
-        pp('info', 'Set GHDL export path successfully!')
+        """ Let GHDL, and yosys' GHDL plugin, find the libraries of the toolchain """
+        if 'GHDL_PREFIX' not in os.environ and os.path.isdir(GHDL_PREFIX):
+            os.environ['GHDL_PREFIX'] = GHDL_PREFIX
 
 
-    def _synthesize_unit(self, filepath, unitname):
-        cmd = "./dist/fpga-toolchain/bin/yosys -q -p \'ghdl --std=08 "
+    def _unit_file(self, filepath, unitname, suffix):
+        """ <unit><suffix> in the design directory, or next to the design file """
+        directory = os.path.dirname(filepath) if os.path.isfile(filepath) else filepath
+        return os.path.join(directory, unitname + suffix)
+
+
+    def _vhdl_files(self, directory):
+        return [y for x in os.walk(directory)
+                  for pattern in VHDL_PATTERNS
+                  for y in glob(os.path.join(x[0], pattern))]
+
+
+    def _synth_files(self, filepath):
         if os.path.isfile(filepath):
-            cmd = cmd + path + " "
-        elif os.path.isdir(filepath):
-            files = [y for x in os.walk(filepath) for y in glob(os.path.join(x[0], '*.vhd[l]'))]
-            for f in files:
-                cmd = cmd + f + " "
-        cmd = cmd  + "-e " + unitname + "; synth_ice40 -json " + filepath + "/" + unitname + ".json\'"
+            return [filepath]
+        return self._vhdl_files(filepath)
+
+
+    def _synth_argv(self, files, unitname, output, workdir, flags=()):
+        """
+        @brief yosys command synthesizing unit with the GHDL plugin
+        @param files VHDL files of the design
+        @param unitname Top unit
+        @param output Netlist JSON file
+        @param workdir GHDL work library directory
+        @param flags Extra synth_ice40 options, without the leading dash
+        @return Command as a list of arguments
+        """
+        options = ['--workdir=' + workdir] + self._ghdl_library_options('08')
+        synth = ' '.join(['synth_ice40'] + ['-' + flag for flag in flags] + ['-json', output])
+        script = "ghdl --std=08 " + " ".join(options + files) + " -e " + unitname + "; " + synth
+        return [YOSYS, '-q', '-p', script]
+
+
+    def _route_argv(self, filepath, unitname, netlist, output, seed=None):
+        argv = [NEXTPNR, '--up5k', '--package', 'sg48',
+                '--pcf', self._unit_file(filepath, unitname, ".pcf"),
+                '--asc', output,
+                '--json', netlist,
+                '--top', unitname]
+        if seed is not None:
+            argv += ['--seed', str(seed)]
+        return argv
+
+
+    def _synthesize_unit(self, filepath, unitname):
+        files = self._synth_files(filepath)
+        output = self._unit_file(filepath, unitname, ".json")
+        argv = self._synth_argv(files, unitname, output, self._workdir)
+
+        key = self._artifact_key('synth', argv, [YOSYS, GHDL], sorted(files))
+        if self._restore_artifact(key, output):
+            pp('success', 'Restored synthesized ' + unitname + ' from the artifact cache!')
+            return
 
         pp('info', 'Synthesizing ' + unitname + ' ...')
-        returned_value = subprocess.run(cmd, shell=True)
-        if returned_value.returncode != 0:
-            exit(1)
+        self._run_stage('yosys', argv)
+        self._store_artifact(key, output)
         pp('success', 'Finished synthesizing successfully!')
 
 
@@ -175,69 +534,353 @@ class App:
         pp('info', 'Cleaning current project ...')
         vcd_files = [y for x in os.walk('.')
                        for y in glob(os.path.join(x[0], '*.vcd'))]
+        vcd_index_files = [y for x in os.walk('.')
+                             for y in glob(os.path.join(x[0], '*.vcd.idx'))]
         fst_files = [y for x in os.walk('.')
-                       for y in glob(os.path.join(x[0], '*.vcd.fst'))]
+                       for y in glob(os.path.join(x[0], '*.fst'))]
+        ghw_files = [y for x in os.walk('.')
+                       for y in glob(os.path.join(x[0], '*.ghw'))]
 
-        files_to_be_deleted = vcd_files + fst_files
+        files_to_be_deleted = vcd_files + vcd_index_files + fst_files + ghw_files
 
         for f in files_to_be_deleted:
-            cmd = "rm " + f
-            returned_value = subprocess.run(cmd, shell=True)
-            if returned_value.returncode != 0:
+            try:
+                os.remove(f)
+            except OSError:
                 pp('error', 'Fail to delete file "' + f + '"')
                 exit(1)
 
         pp('info', 'Running ghdl --clean ...')
-        cmd = "./dist/fpga-toolchain/bin/ghdl --clean"
-        returned_value = subprocess.run(cmd, shell=True)
-        if returned_value.returncode != 0:
+        os.makedirs(self._workdir, exist_ok=True)
+        result = self._runner.run('ghdl-clean', [GHDL, '--clean', '--workdir=' + self._workdir])
+        if not result.ok:
+            self._runner.report_failure(result)
             pp('error', 'Fail to run ghdl --clean')
             exit(1)
 
+        manifest = os.path.join(self._workdir, MANIFEST_NAME)
+        if os.path.isfile(manifest):
+            os.remove(manifest)
+
         pp('success', 'Current project is successfully cleaned')
 
 
     def _route_unit(self, filepath, unitname):
-        cmd = "./dist/fpga-toolchain/bin/nextpnr-ice40 --up5k --package sg48 --pcf " + \
-              filepath + "/" + unitname + \
-              ".pcf --asc " + filepath + "/" + unitname + ".asc --json " + filepath + \
-              "/" + unitname + ".json --top " + unitname
+        netlist = self._unit_file(filepath, unitname, ".json")
+        output = self._unit_file(filepath, unitname, ".asc")
+        argv = self._route_argv(filepath, unitname, netlist, output)
+
+        key = self._artifact_key('route', argv, [NEXTPNR],
+                                 [netlist, self._unit_file(filepath, unitname, ".pcf")])
+        if self._restore_artifact(key, output):
+            pp('success', 'Restored routed ' + unitname + ' from the artifact cache!')
+            return
+
         pp('info', 'Routing ' + unitname + ' ...')
-        returned_value = subprocess.run(cmd, shell=True)
-        if returned_value.returncode != 0:
-            exit(1)
-        pp('info', returned_value)
+        self._run_stage('nextpnr', argv)
+        self._store_artifact(key, output)
         pp('success', 'Finished routing successfully!')
 
 
     def _generate_bitstream(self, filepath, unitname):
-        cmd = "./dist/fpga-toolchain/bin/icepack " + filepath + "/" + \
-               unitname + ".asc " + filepath + "/" + unitname + ".bin"
+        asc = self._unit_file(filepath, unitname, ".asc")
+        output = self._unit_file(filepath, unitname, ".bin")
+        argv = [ICEPACK, asc, output]
+
+        key = self._artifact_key('bitstream', argv, [ICEPACK], [asc])
+        if self._restore_artifact(key, output):
+            pp('success', 'Restored bitstream for ' + unitname + ' from the artifact cache!')
+            return
+
         pp('info', 'Generating bitstream for ' + unitname + ' ...')
-        returned_value = subprocess.run(cmd, shell=True)
-        if returned_value.returncode != 0:
-            exit(1)
+        self._run_stage('icepack', argv)
+        self._store_artifact(key, output)
         pp('success', 'Finished generating bitstream successfully!')
 
 
     def _flash_fpga(self, filepath, unitname):
-        cmd = "./dist/fpga-toolchain/bin/iceprog " + filepath + "/" + unitname + ".bin"
         pp('info', 'Flashing ' + unitname + ' to FPGA ...')
-        returned_value = subprocess.run(cmd, shell=True)
-        if returned_value.returncode != 0:
-            exit(1)
+        self._run_stage('iceprog', [ICEPROG, self._unit_file(filepath, unitname, ".bin")])
         pp('success', 'Finished flashing successfully!')
 
 
+    def _explore_unit(self, filepath, unitname):
+        """
+        @brief Synthesize and route unit with every combination of the
+        synthesis flags and placement seeds of --explore, concurrently, and
+        keep the routed design with the best fmax as <unit>.asc. The results
+        table is written to <unit>-explore.json.
+        @param filepath VHDL file or directory of the design
+        @param unitname Top unit
+        @return None, exits if no combination succeeded
+        """
+        seeds, flags = self._explore
+        variants = synth_variants(flags)
+        files = self._synth_files(filepath)
+        explore_dir = os.path.join(self._workdir, 'explore', unitname)
+        jobs = self._explore_jobs
+        pp('info', 'Exploring ' + str(len(variants)) + ' synthesis option set(s) x ' +
+           str(len(seeds)) + ' seed(s) of ' + unitname + ' with ' + str(jobs) + ' job(s) ...')
+
+        def synthesize(flags):
+            name = '+'.join(flags) or 'default'
+            directory = os.path.join(explore_dir, name)
+            os.makedirs(directory, exist_ok=True)
+            netlist = os.path.join(directory, unitname + '.json')
+            argv = self._synth_argv(files, unitname, netlist, directory, flags)
+
+            key = self._artifact_key('synth', argv, [YOSYS, GHDL], sorted(files))
+            if self._restore_artifact(key, netlist):
+                return netlist, None
+            result = self._runner.run('yosys-' + name, argv)
+            if not result.ok:
+                return netlist, 'yosys failed with exit code ' + str(result.returncode)
+            self._store_artifact(key, netlist)
+            return netlist, None
+
+        def route(flags, netlist, seed):
+            name = ('+'.join(flags) or 'default') + '-seed' + str(seed)
+            output = os.path.join(os.path.dirname(netlist), 'seed' + str(seed) + '.asc')
+            argv = self._route_argv(filepath, unitname, netlist, output, seed)
+            log = self._runner.log_path('nextpnr-' + name)
+
+            # The log is kept with the routed design for its fmax and utilization
+            key = self._artifact_key('route', argv, [NEXTPNR],
+                                     [netlist, self._unit_file(filepath, unitname, ".pcf")])
+            log_key = None if key is None else self._artifacts.key('route-log', [key])
+            if self._restore_artifact(key, output) and self._restore_artifact(log_key, log):
+                with open(log, errors='replace') as f:
+                    return output, f.read(), None, log
+            result = self._runner.run('nextpnr-' + name, argv)
+            if not result.ok:
+                return output, result.output, \
+                    'nextpnr failed with exit code ' + str(result.returncode), result.log
+            self._store_artifact(key, output)
+            self._store_artifact(log_key, log)
+            return output, result.output, None, result.log
+
+        def progress(run):
+            if not run.ok:
+                pp('warning', run.name + ': ' + run.error + ' (log: ' + str(run.log) + ')')
+            else:
+                fmax = 'unknown' if run.fmax is None else '{:.2f} MHz'.format(run.fmax)
+                pp('info', run.name + ': fmax ' + fmax)
+
+        runs = explore(variants, seeds, synthesize, route, jobs, progress)
+        best = best_run(runs)
+        results = self._unit_file(filepath, unitname, "-explore.json")
+        write_results(results, runs, best)
+        pp('info', 'Wrote exploration results to ' + results)
+
+        if best is None:
+            pp('error', 'Failed exploring ' + unitname + ' - no combination was routed.')
+            exit(1)
+        shutil.copyfile(best.netlist, self._unit_file(filepath, unitname, ".json"))
+        shutil.copyfile(best.asc, self._unit_file(filepath, unitname, ".asc"))
+        fmax = 'unknown' if best.fmax is None else '{:.2f} MHz'.format(best.fmax)
+        pp('success', 'Kept ' + best.name + ' with fmax ' + fmax + '!')
+
+
     def _upload_file(self, filepath, unitname):
-        self._export_ghdl_path()
-        self._synthesize_unit(filepath, unitname)
-        self._route_unit(filepath, unitname)
+        if self._explore is not None:
+            self._explore_unit(filepath, unitname)
+        else:
+            self._synthesize_unit(filepath, unitname)
+            self._route_unit(filepath, unitname)
         self._generate_bitstream(filepath, unitname)
+        if self._artifacts is not None:
+            self._artifacts.evict()
         self._flash_fpga(filepath, unitname)
 
 
+    def _artifact_key(self, stage, cmd, tools, inputs):
+        """
+        @brief Key of a toolchain stage in the artifact cache
+        @param stage Stage name
+        @param cmd Command of the stage, as a list of arguments
+        @param tools Tool binaries run by the stage
+        @param inputs Input files, including the upstream artifact
+        @return Key, or None when the stage cannot be cached
+        """
+        if self._artifacts is None:
+            return None
+        try:
+            digests = [(f, file_digest(f)) for f in inputs]
+        except OSError:
+            # Let the tool report the missing input
+            return None
+        return self._artifacts.key(stage, [cmd, [tool_id(t) for t in tools], digests])
+
+
+    def _restore_artifact(self, key, output):
+        return key is not None and self._artifacts.restore(key, output)
+
+
+    def _store_artifact(self, key, output):
+        if key is not None and os.path.isfile(output):
+            self._artifacts.store(key, output)
+
+
+    def _open_report(self):
+        if self._format is None:
+            return None
+        return open_report(self._format, self._output)
+
+
+    def _open_index(self):
+        if self._index_path is None:
+            return None
+        return SymbolIndex(self._index_path)
+
+
     def _lint_files(self, _filenames):
-        linter = Linter(_filenames, self._logger)
+        self._logger.set_report(self._open_report())
+        linter = Linter(_filenames, self._logger, self._jobs, self._cache, self._tokenizer,
+                        self._open_index())
+        linter.lint()
+        logger = linter.print_status()
+        if self._hierarchy is not None:
+            self._print_hierarchy(linter)
+
+
+    def _print_hierarchy(self, linter):
+        hierarchy = linter.hierarchy(self._hierarchy)
+        if not hierarchy.found:
+            pp('error', 'No entity or architecture "' + self._hierarchy + '" found.')
+            exit(1)
+
+        print('-----------------------------------------------------')
+        hierarchy.print_tree()
+        print()
+        for cycle in hierarchy.cycles:
+            pp('warning', 'Instantiation cycle: ' + ' -> '.join(cycle + cycle[:1]))
+
+        num_instances = sum(hierarchy.instances.values()) - 1
+        pp('info', 'Hierarchy of "{}": {} unit(s), {} instance(s), depth {}, '
+                   '{} unresolved unit(s), {} cycle(s).'.format(
+                       hierarchy.root.name, len(hierarchy.instances), num_instances,
+                       hierarchy.depth, len(hierarchy.unresolved), len(hierarchy.cycles)))
+
+        if self._hierarchy_json is not None:
+            hierarchy.write_json(self._hierarchy_json)
+            pp('info', 'Wrote hierarchy to "' + self._hierarchy_json + '"')
+
+
+    def _watch_lint_files(self, path, _filenames):
+        self._logger.set_report(self._open_report())
+        linter = Linter(_filenames, self._logger, self._jobs, self._cache, self._tokenizer,
+                        self._open_index())
         linter.lint()
-        logger = linter.print_status()
\ No newline at end of file
+        linter.print_status()
+
+        pp('info', 'Watching "' + path + '" for changes (Ctrl-C to stop) ...')
+        try:
+            for changed in FileWatcher(path).changes():
+                logger = Logger(spill_size=self._logger.spill_size, report=self._open_report(),
+                                max_per_rule=self._max_per_rule,
+                                max_per_file=self._max_per_file)
+                linter.relint(sorted(changed), logger)
+                linter.print_status()
+        except KeyboardInterrupt:
+            pp('info', 'Stopped watching "' + path + '"')
+
+
+    def _diff_tokenizers(self, paths):
+        files = []
+        for path in paths:
+            if os.path.isfile(path):
+                files.append(path)
+            elif os.path.isdir(path):
+                files += sorted(self._vhdl_files(path))
+            else:
+                pp('error', 'Invalid file/dir path "' + path + '".')
+                exit(1)
+
+        pp('info', 'Comparing tokenizer backends on ' + str(len(files)) + ' file(s) ...')
+        diagnostics = {}
+        for tokenizer in TOKENIZERS:
+            logger = Logger()
+            with contextlib.redirect_stdout(io.StringIO()):
+                Linter(files, logger, self._jobs, None, tokenizer).lint()
+            diagnostics[tokenizer] = list(logger.messages())
+
+        reference = diagnostics[TOKENIZERS[0]]
+        mismatched = False
+        for tokenizer in TOKENIZERS[1:]:
+            diff = list(difflib.unified_diff(reference, diagnostics[tokenizer],
+                                             TOKENIZERS[0], tokenizer, lineterm=''))
+            if diff:
+                mismatched = True
+                pp('error', 'Diagnostics of "' + tokenizer + '" tokenizer differ from "' +
+                   TOKENIZERS[0] + '":\n' + '\n'.join(diff))
+
+        if mismatched:
+            exit(1)
+        pp('success', 'All tokenizer backends produced the same ' +
+           str(len(reference)) + ' diagnostic(s)!')
+
+
+    def _query_index(self, query, name):
+        path = self._index_path or DEFAULT_INDEX_PATH
+        if not os.path.isfile(path):
+            pp('error', 'No symbol index found at "' + path + '". Lint the project first.')
+            exit(1)
+
+        index = SymbolIndex(path)
+        rows = getattr(index, query)(name.lower())
+        index.close()
+
+        if not rows:
+            pp('error', 'No match for "' + name + '" in "' + path + '".')
+            exit(1)
+
+        for row in rows:
+            filename, line, col = row[:3]
+            location = '{}:{}:{}'.format(filename, line or 0, col or 0)
+            if query == 'find_entity':
+                _, _, _, kind, unit_name = row
+                print('{}: {} {}'.format(location, kind, unit_name))
+            elif query == 'who_uses':
+                _, _, _, arch_name, entity_name = row
+                print('{}: architecture {} of {}'.format(location, arch_name, entity_name))
+            else:
+                _, _, _, kind, sig_name, direction, sig_type = row
+                print('{}: {} {} : {}{}'.format(location, kind, sig_name,
+                                                direction + ' ' if direction else '', sig_type))
+
+
+    def _query_wave(self, filename, query):
+        """
+        @brief Answer a query on a VCD dump from its sidecar index, built on
+        the first query
+        @param filename VCD file
+        @param query ['signals'], ['value', signal, time] or
+        ['changes', signal, start, end]
+        @return None, exits on an invalid query
+        """
+        usage = ('Invalid wave query - expected "signals", "value SIGNAL T" or ' +
+                 '"changes SIGNAL T0 T1".')
+        kind = query[0] if query else None
+        if (kind, len(query)) not in (('signals', 1), ('value', 3), ('changes', 4)):
+            pp('error', usage)
+            exit(1)
+        if not os.path.isfile(filename):
+            pp('error', 'Failed to query waveform - no such file "' + filename + '".')
+            exit(1)
+
+        index = VCDIndex(filename)
+        try:
+            if kind == 'signals':
+                for name, (_, width) in sorted(index.signals.items()):
+                    print('{} {}'.format(name, width))
+            elif kind == 'value':
+                value = index.value(query[1], parse_time(query[2]))
+                print('U' if value is None else value)
+            else:
+                for time, value in index.changes(query[1], parse_time(query[2]),
+                                                 parse_time(query[3])):
+                    print('{} {}'.format(format_time(time), value))
+        except (KeyError, ValueError) as ex:
+            pp('error', str(ex.args[0]))
+            exit(1)
+
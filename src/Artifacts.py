@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: Artifacts.py
+#
+#  Description: Implementation of the content addressed store of toolchain
+#  outputs (synthesized netlist, placed and routed design, bitstream).
+#
+# -----------------------------------------------------------------------------
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+DEFAULT_ARTIFACT_DIR = os.path.join('.turquoise', 'artifacts')
+DEFAULT_ARTIFACT_SIZE = 1024 * 1024 * 1024
+
+# Bump whenever the input keys change
+ARTIFACT_FORMAT_VERSION = 1
+
+_BUFFER_SIZE = 1024 * 1024
+
+
+def file_digest(_filename):
+    """ sha256 of a file content """
+    h = hashlib.sha256()
+    with open(_filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(_BUFFER_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def tool_id(_path):
+    """ Identity of a tool binary: its real path, size and modification time """
+    try:
+        st = os.stat(_path)
+    except OSError:
+        return _path
+    return '{}:{}:{}'.format(os.path.realpath(_path), st.st_size, st.st_mtime_ns)
+
+
+def _atomic_copy(_src, _dest):
+    directory = os.path.dirname(_dest) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f, open(_src, 'rb') as src:
+            shutil.copyfileobj(src, f, _BUFFER_SIZE)
+        os.replace(tmp, _dest)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class ArtifactStore:
+    """
+    Two level store: "ac" maps the key of a stage's inputs to the digest of
+    its output, and "cas" holds outputs by digest. Keys include the digest
+    of the upstream artifact, so a stage whose output did not change lets
+    the next stages be restored even if it was re-run. Entries are written
+    atomically, so several processes can share one store.
+    """
+    def __init__(self, path=DEFAULT_ARTIFACT_DIR, max_size=DEFAULT_ARTIFACT_SIZE):
+        self._path = path
+        self._max_size = max_size
+
+    @property
+    def path(self):
+        return self._path
+
+    def key(self, _stage, _inputs):
+        """
+        @brief Key of a stage run
+        @param _stage Stage name
+        @param _inputs JSON serializable list of everything the output depends
+        on: command line, tool ids and input file digests
+        @return Hex digest
+        """
+        h = hashlib.sha256()
+        h.update(json.dumps([ARTIFACT_FORMAT_VERSION, _stage, _inputs]).encode())
+        return h.hexdigest()
+
+    def _ac_path(self, _key):
+        return os.path.join(self._path, 'ac', _key[:2], _key)
+
+    def _cas_path(self, _digest):
+        return os.path.join(self._path, 'cas', _digest[:2], _digest)
+
+    def restore(self, _key, _dest):
+        """
+        @brief Copy the output stored for key to dest
+        @return True on a hit, False on a miss
+        """
+        try:
+            with open(self._ac_path(_key)) as f:
+                digest = f.read().strip()
+            blob = self._cas_path(digest)
+            _atomic_copy(blob, _dest)
+        except OSError:
+            return False
+
+        # Mark entries as recently used for LRU eviction
+        for entry in (self._ac_path(_key), blob):
+            try:
+                os.utime(entry)
+            except OSError:
+                pass
+        return True
+
+    def store(self, _key, _src):
+        """ Store output file src for key, return its digest """
+        digest = file_digest(_src)
+        try:
+            blob = self._cas_path(digest)
+            if not os.path.isfile(blob):
+                _atomic_copy(_src, blob)
+
+            entry = self._ac_path(_key)
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(entry), suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(digest)
+            os.replace(tmp, entry)
+        except OSError:
+            # A store that cannot be written is just a miss next time
+            pass
+        return digest
+
+    def evict(self):
+        """ Remove least recently used outputs until the store fits its size cap """
+        entries = []
+        total = 0
+        for root, _, files in os.walk(os.path.join(self._path, 'cas')):
+            for name in files:
+                entry = os.path.join(root, name)
+                try:
+                    st = os.stat(entry)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry))
+                total += st.st_size
+
+        if total <= self._max_size:
+            return
+
+        # Keys pointing to an evicted output are misses
+        entries.sort()
+        for (_, size, entry) in entries:
+            if total <= self._max_size:
+                break
+            try:
+                os.unlink(entry)
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,406 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: Build.py
+#
+#  Description: Implementation of the dependency ordered and incremental
+#  GHDL analysis used by the compilation toolchain.
+#
+# -----------------------------------------------------------------------------
+import os
+import json
+import heapq
+import hashlib
+import tempfile
+import threading
+import functools
+from glob import glob
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .Linter import parse_files
+from .Messages import pp
+
+GHDL = './dist/fpga-toolchain/bin/ghdl'
+
+DEFAULT_WORKDIR = os.path.join('.turquoise', 'work')
+MANIFEST_NAME = 'ghdl-manifest.json'
+
+# Bump whenever the manifest layout or the input keys change
+MANIFEST_VERSION = 1
+
+# (work directory, library name) -> lock held while GHDL writes the library
+_library_locks = {}
+_library_locks_lock = threading.Lock()
+
+
+def file_dependencies(_filenames, _jobs=1, _cache=None, _tokenizer='pyvhdlparser'):
+    """
+    @brief Find which files declare the entities, components and packages
+    each file refers to
+    @param _filenames Files to be analyzed
+    @param _jobs Number of worker processes used for parsing
+    @param _cache Optional ParseCache
+    @param _tokenizer Tokenizer backend, one of Tokenize.TOKENIZERS
+    @return List of sets, the indices of the files each file depends on
+    """
+    declared = {}
+    required = []
+
+    for i, (_, (units, _)) in enumerate(parse_files(_filenames, _jobs, _cache, _tokenizer)):
+        names = set()
+        for (_, kind, unit, _) in units:
+            if kind == 'entity':
+                declared.setdefault(unit.name, i)
+            elif kind == 'package':
+                declared.setdefault(unit, i)
+            elif kind == 'architecture':
+                names.add(unit.entity_name)
+                names.update(unit.instances)
+                names.update(component.name for component in unit.declared_components)
+            elif kind == 'package body':
+                names.add(unit)
+            elif kind == 'use':
+                names.add(unit[1])
+        required.append(names)
+
+    return [set(declared[name] for name in names if declared.get(name, i) != i)
+            for i, names in enumerate(required)]
+
+
+def build_order(_deps):
+    """
+    @brief Order files so that every file comes after the files it depends
+    on, and otherwise in their original order. Cycles (e.g. components of
+    each other) are broken at the earliest file of the cycle.
+    @param _deps List of sets of file indices, from file_dependencies
+    @return (order, waits) where order is the list of file indices and waits
+    the dependencies that each file still waits for in that order
+    """
+    dependents = [[] for _ in _deps]
+    indegree = [len(deps) for deps in _deps]
+    for i, deps in enumerate(_deps):
+        for j in deps:
+            dependents[j].append(i)
+
+    ready = [i for i, n in enumerate(indegree) if n == 0]
+    heapq.heapify(ready)
+    done = [False] * len(_deps)
+    order = []
+    waits = [set() for _ in _deps]
+    position = 0
+
+    while len(order) < len(_deps):
+        if not ready:
+            # Only cycles are left: take the earliest file not yet ordered
+            while done[position]:
+                position += 1
+            heapq.heappush(ready, position)
+            indegree[position] = 0
+
+        i = heapq.heappop(ready)
+        if done[i]:
+            continue
+        done[i] = True
+        order.append(i)
+        waits[i] = set(j for j in _deps[i] if done[j])
+
+        for k in dependents[i]:
+            indegree[k] -= 1
+            if indegree[k] == 0 and not done[k]:
+                heapq.heappush(ready, k)
+
+    return order, waits
+
+
+class BuildResult:
+    """ Outcome of running the command of one file """
+    def __init__(self, filename, returncode=None, output='', failed_dependency=None,
+                 up_to_date=False):
+        self.filename = filename
+        self.returncode = returncode
+        self.output = output
+        self.failed_dependency = failed_dependency
+        self.up_to_date = up_to_date
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+
+def run_ordered(_filenames, _deps, _run, _jobs=1, _up_to_date=()):
+    """
+    @brief Run a command on every file, starting a file once the files it
+    depends on succeeded. Up to _jobs files run concurrently. Files
+    depending on a failed file are not run.
+    @param _filenames Files to be run
+    @param _deps List of sets of file indices, from file_dependencies
+    @param _run Function of a file name running it, returning its exit code
+    and output
+    @param _jobs Number of concurrent commands. With one, files run in the
+    calling thread.
+    @param _up_to_date Indices of files that succeed without being run
+    @return Iterator of BuildResult, in build order, each yielded as soon as
+    it and every result before it are known
+    """
+    order, waits = build_order(_deps)
+    rank = [0] * len(order)
+    for r, i in enumerate(order):
+        rank[i] = r
+
+    dependents = [[] for _ in order]
+    remaining = [len(w) for w in waits]
+    for i, w in enumerate(waits):
+        for j in w:
+            dependents[j].append(i)
+
+    results = [None] * len(order)
+    ready = [rank[i] for i in range(len(order)) if remaining[i] == 0]
+    heapq.heapify(ready)
+    next_result = 0
+
+    def finish(i, result):
+        # Skip dependents of failed files, transitively
+        stack = [(i, result)]
+        while stack:
+            i, result = stack.pop()
+            results[rank[i]] = result
+            for k in dependents[i]:
+                remaining[k] -= 1
+                if not result.ok and results[rank[k]] is None:
+                    failed = result.failed_dependency or result.filename
+                    results[rank[k]] = BuildResult(_filenames[k], failed_dependency=failed)
+                if remaining[k] == 0:
+                    if results[rank[k]] is not None:
+                        stack.append((k, results[rank[k]]))
+                    else:
+                        heapq.heappush(ready, rank[k])
+
+    if _jobs <= 1:
+        # One file at a time, in the calling thread
+        while next_result < len(order):
+            if ready:
+                i = order[heapq.heappop(ready)]
+                if i in _up_to_date:
+                    finish(i, BuildResult(_filenames[i], 0, up_to_date=True))
+                else:
+                    returncode, output = _run(_filenames[i])
+                    finish(i, BuildResult(_filenames[i], returncode, output))
+
+            while next_result < len(order) and results[next_result] is not None:
+                yield results[next_result]
+                next_result += 1
+        return
+
+    with ThreadPoolExecutor(max_workers=_jobs) as executor:
+        running = {}
+        while next_result < len(order):
+            while ready and len(running) < _jobs:
+                i = order[heapq.heappop(ready)]
+                if i in _up_to_date:
+                    finish(i, BuildResult(_filenames[i], 0, up_to_date=True))
+                else:
+                    running[executor.submit(_run, _filenames[i])] = i
+
+            if running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    i = running.pop(future)
+                    returncode, output = future.result()
+                    finish(i, BuildResult(_filenames[i], returncode, output))
+
+            while next_result < len(order) and results[next_result] is not None:
+                yield results[next_result]
+                next_result += 1
+
+
+def library_lock(_workdir, _options=()):
+    """
+    @brief Lock serializing the GHDL commands that write the same library.
+    GHDL rewrites the library index (work-obj*.cf) after every analysis, so
+    concurrent analyses into one library would lose units.
+    @param _workdir GHDL work library directory
+    @param _options GHDL options, naming the library with --work
+    @return threading.Lock
+    """
+    library = 'work'
+    for option in _options:
+        if option.startswith('--work='):
+            library = option[len('--work='):].lower()
+    key = (os.path.realpath(_workdir), library)
+    with _library_locks_lock:
+        return _library_locks.setdefault(key, threading.Lock())
+
+
+def _content_hash(_filename):
+    h = hashlib.sha256()
+    with open(_filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def ghdl_version(_runner):
+    """ First line of "ghdl --version", or 'unknown' """
+    result = _runner.run('ghdl-version', [GHDL, '--version'])
+    output = result.output
+    if not result.ok or not output:
+        return 'unknown'
+    return output.splitlines()[0]
+
+
+class BuildManifest:
+    """
+    Record of the inputs of every successfully analyzed/compiled file: its
+    content hash, the tool version and flags, and the files it depends on.
+    The input key of a file covers the keys of its dependencies, so a file
+    is re-run when it or anything upstream of it changed.
+    """
+    def __init__(self, path=os.path.join(DEFAULT_WORKDIR, MANIFEST_NAME)):
+        self._path = path
+        self._entries = {}
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION:
+                self._entries = manifest['entries']
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    @property
+    def path(self):
+        return self._path
+
+    def input_keys(self, _filenames, _deps, _flags):
+        """
+        @brief Compute the input key of every file
+        @param _filenames Files to be run
+        @param _deps List of sets of file indices, from file_dependencies
+        @param _flags List of tool version and command line flags
+        @return List of hex digests, one per file
+        """
+        order, waits = build_order(_deps)
+        hashes = [_content_hash(f) for f in _filenames]
+        keys = [None] * len(_filenames)
+
+        for i in order:
+            # Dependencies later in the build order are in a cycle with this
+            # file; only their content is covered
+            upstream = sorted(keys[j] if j in waits[i] else hashes[j] for j in _deps[i])
+            h = hashlib.sha256(json.dumps([_flags, hashes[i], upstream]).encode())
+            keys[i] = h.hexdigest()
+        return keys
+
+    def is_current(self, _option, _filename, _key):
+        entry = self._entries.get(_option, {}).get(_filename)
+        return entry is not None and entry['key'] == _key
+
+    def record(self, _option, _filename, _key, _deps):
+        self._entries.setdefault(_option, {})[_filename] = {'key': _key, 'deps': _deps}
+
+    def forget(self, _option, _filename):
+        self._entries.get(_option, {}).pop(_filename, None)
+
+    def clear(self):
+        self._entries = {}
+
+    def save(self):
+        """ Atomically write the manifest """
+        directory = os.path.dirname(self._path) or '.'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump({'version': MANIFEST_VERSION, 'entries': self._entries}, f)
+                os.replace(tmp, self._path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError:
+            pp('warning', 'Failed to write build manifest "' + self._path + '"')
+
+
+def ghdl_files(_option, _filenames, _runner, _jobs=1, _cache=None, _tokenizer='pyvhdlparser',
+               _manifest=None, _force=False, _workdir='.', _options=()):
+    """
+    @brief Run "ghdl <option>" on files in dependency order, printing the
+    captured output of each file in build order
+    @param _option GHDL command, '-a' or '-c'
+    @param _filenames Files to be analyzed/compiled
+    @param _runner StageRunner running GHDL, one stage per file
+    @param _jobs Number of worker processes extracting dependencies. GHDL
+    writes the work library one file at a time.
+    @param _cache Optional ParseCache used to extract dependencies
+    @param _tokenizer Tokenizer backend used to extract dependencies
+    @param _manifest Optional BuildManifest; files whose inputs are unchanged
+    since they last succeeded are skipped
+    @param _force Run every file, and record them in the manifest
+    @param _workdir GHDL work library directory, passed with --workdir
+    @param _options Extra GHDL options, e.g. -P library paths
+    @return Number of files that failed or were skipped because a
+    dependency failed
+    """
+    verb, done = ('analyzing', 'analyzed') if _option == '-a' else ('compiling', 'compiled')
+    options = ['--workdir=' + _workdir] + list(_options)
+    deps = file_dependencies(_filenames, _jobs, _cache, _tokenizer)
+
+    keys = None
+    up_to_date = set()
+    if _manifest is not None:
+        # Analysis results live in the GHDL work library; nothing is up to
+        # date once it is gone (e.g. after ghdl --clean)
+        if _option == '-a' and not glob(os.path.join(_workdir, 'work-obj*.cf')):
+            _manifest.clear()
+
+        keys = _manifest.input_keys(_filenames, deps, [ghdl_version(_runner), _option] + options)
+        if not _force:
+            up_to_date = set(i for i, f in enumerate(_filenames)
+                             if _manifest.is_current(_option, f, keys[i]))
+
+    def run(f):
+        result = _runner.run('ghdl' + _option + ' ' + f, [GHDL, _option] + options + [f])
+        return result.returncode, result.output
+
+    index = dict((f, i) for i, f in enumerate(_filenames))
+    num_failed = 0
+    num_run = 0
+    num_up_to_date = 0
+    # GHDL rewrites the library index (work-obj*.cf) after every file, so the
+    # files of one library are run one at a time
+    for result in run_ordered(_filenames, deps, run, 1, up_to_date):
+        i = index[result.filename]
+        if keys is not None:
+            if result.ok:
+                _manifest.record(_option, result.filename, keys[i],
+                                 sorted(_filenames[j] for j in deps[i]))
+            else:
+                _manifest.forget(_option, result.filename)
+
+        if result.up_to_date:
+            num_up_to_date += 1
+            continue
+        if result.failed_dependency is not None:
+            num_failed += 1
+            pp('error', 'Skipped ' + verb + ' file ' + result.filename + ' - dependency "' +
+               result.failed_dependency + '" failed.')
+            continue
+
+        num_run += 1
+        pp('info', verb.capitalize() + ' file ' + result.filename + ' ...')
+        if result.output:
+            print(result.output.rstrip('\n'))
+        if result.ok:
+            pp('success', 'Finished ' + verb + ' successfully!')
+        else:
+            num_failed += 1
+            pp('error', 'Failed ' + verb + ' file ' + result.filename)
+
+    if _manifest is not None:
+        _manifest.save()
+    pp('info', 'Skipped ' + str(num_up_to_date) + ' up-to-date file(s) / ' +
+       done + ' ' + str(num_run) + ' file(s).')
+
+    return num_failed
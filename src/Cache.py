@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: Cache.py
+#
+#  Description: Implementation of the on-disk parse cache used by the linter
+#
+# -----------------------------------------------------------------------------
+import os
+import hmac
+import time
+import pickle
+import hashlib
+import tempfile
+
+from . import __version__
+
+try:
+    from importlib.metadata import version as _pkg_version
+    PYVHDLPARSER_VERSION = _pkg_version('pyVHDLParser')
+except Exception:
+    PYVHDLPARSER_VERSION = 'unknown'
+
+
+# Bump whenever the layout of cached parse results changes
+CACHE_FORMAT_VERSION = 9
+
+DEFAULT_CACHE_DIR = os.path.join('.turquoise', 'cache')
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+
+# Secret authenticating cache entries. Jobs sharing a cache directory must
+# share the secret, e.g. through a CI secret variable; otherwise a per-user
+# secret is generated on first use.
+CACHE_KEY_ENV = 'TURQUOISE_CACHE_KEY'
+DEFAULT_CACHE_KEY_PATH = os.path.join(os.path.expanduser('~'), '.config', 'turquoise',
+                                      'cache.key')
+
+# Minimum number of seconds between two evictions, and age after which a
+# temporary file is left over by a crashed run rather than being written
+EVICT_INTERVAL = 5 * 60
+TMP_MAX_AGE = 60 * 60
+
+_EVICT_STAMP = '.last-evict'
+_MAC_SIZE = hashlib.sha256().digest_size
+
+
+def cache_secret(_path=DEFAULT_CACHE_KEY_PATH):
+    """
+    @brief Secret used to authenticate cache entries: $TURQUOISE_CACHE_KEY,
+    or a random per-user secret stored in _path
+    @return Secret as bytes, or None if none can be read or created
+    """
+    secret = os.environ.get(CACHE_KEY_ENV)
+    if secret:
+        return secret.encode()
+
+    try:
+        with open(_path, 'rb') as f:
+            secret = f.read()
+        if secret:
+            return secret
+    except OSError:
+        pass
+
+    try:
+        os.makedirs(os.path.dirname(_path), exist_ok=True)
+        fd = os.open(_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(os.urandom(32))
+    except FileExistsError:
+        # Created concurrently by another run
+        pass
+    except OSError:
+        return None
+
+    try:
+        with open(_path, 'rb') as f:
+            return f.read() or None
+    except OSError:
+        return None
+
+
+class ParseCache:
+    """
+    Content addressed cache of per-file parse results. Entries are keyed by
+    the file content hash, the file name (diagnostics embed it), the
+    tokenizer backend, and the turquoise and pyVHDLParser versions. Entries
+    are written atomically, so several processes can share one cache
+    directory. Entries are pickles, so every entry carries an HMAC of its
+    content and is only unpickled if the HMAC matches the cache secret.
+    """
+    def __init__(self, path=DEFAULT_CACHE_DIR, max_size=DEFAULT_CACHE_SIZE, secret=None):
+        self._path = path
+        self._max_size = max_size
+        self._secret = secret if secret is not None else cache_secret()
+
+    @property
+    def path(self):
+        return self._path
+
+    def key(self, _filename, _chunks, _tokenizer):
+        """ Cache key of a file whose content is given as an iterable of bytes """
+        h = hashlib.sha256()
+        h.update(__version__.encode())
+        h.update(b'\0%d' % CACHE_FORMAT_VERSION)
+        h.update(b'\0' + PYVHDLPARSER_VERSION.encode())
+        h.update(b'\0' + _tokenizer.encode())
+        h.update(b'\0' + _filename.encode())
+        h.update(b'\0')
+        for chunk in _chunks:
+            h.update(chunk)
+        return h.hexdigest()
+
+    def _entry_path(self, _key):
+        return os.path.join(self._path, _key[:2], _key + '.pickle')
+
+    def _mac(self, _payload):
+        return hmac.new(self._secret, _payload, hashlib.sha256).digest()
+
+    def get(self, _key):
+        """ Return cached value for key, or None on a miss """
+        if self._secret is None:
+            return None
+        entry = self._entry_path(_key)
+        try:
+            with open(entry, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        # Never unpickle an entry that was not written with the secret
+        mac, payload = data[:_MAC_SIZE], data[_MAC_SIZE:]
+        if not hmac.compare_digest(mac, self._mac(payload)):
+            return None
+        try:
+            value = pickle.loads(payload)
+        except (EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+
+        # Mark entry as recently used for LRU eviction
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return value
+
+    def put(self, _key, _value):
+        """ Atomically store value for key """
+        if self._secret is None:
+            return
+        entry = self._entry_path(_key)
+        entry_dir = os.path.dirname(entry)
+        try:
+            os.makedirs(entry_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=entry_dir, suffix='.tmp')
+            try:
+                payload = pickle.dumps(_value, pickle.HIGHEST_PROTOCOL)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(self._mac(payload))
+                    f.write(payload)
+                os.replace(tmp, entry)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except (OSError, pickle.PicklingError):
+            # A cache that cannot be written is just a cache miss next time
+            pass
+
+    def _evicted_recently(self, _now):
+        """ Claim the next eviction, unless one ran less than EVICT_INTERVAL ago """
+        stamp = os.path.join(self._path, _EVICT_STAMP)
+        try:
+            if _now - os.stat(stamp).st_mtime < EVICT_INTERVAL:
+                return True
+        except OSError:
+            pass
+        try:
+            os.makedirs(self._path, exist_ok=True)
+            with open(stamp, 'a'):
+                pass
+            os.utime(stamp, (_now, _now))
+        except OSError:
+            pass
+        return False
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits its size cap.
+        Runs at most once every EVICT_INTERVAL seconds per cache directory.
+        """
+        now = time.time()
+        if self._evicted_recently(now):
+            return
+
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self._path):
+            for name in files:
+                if name == _EVICT_STAMP:
+                    continue
+                entry = os.path.join(root, name)
+                try:
+                    st = os.stat(entry)
+                except OSError:
+                    continue
+                if name.endswith('.tmp'):
+                    # Only remove temporary files left over by crashed runs,
+                    # never the ones concurrent runs are still writing
+                    if now - st.st_mtime > TMP_MAX_AGE:
+                        try:
+                            os.unlink(entry)
+                        except OSError:
+                            pass
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry))
+                total += st.st_size
+
+        if total <= self._max_size:
+            return
+
+        entries.sort()
+        for (_, size, entry) in entries:
+            if total <= self._max_size:
+                break
+            try:
+                os.unlink(entry)
+            except OSError:
+                # Already evicted by a concurrent run
+                pass
+            total -= size
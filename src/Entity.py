@@ -8,18 +8,14 @@
 #  Description: Implementation of DFAs that parse through entity syntax
 #
 # -----------------------------------------------------------------------------
-from pyVHDLParser.Token import StartOfDocumentToken, EndOfDocumentToken, \
-                               SpaceToken, LinebreakToken, CommentToken, \
-                               IndentationToken
 from pyVHDLParser.Base import ParserException
 from enum import Enum
+from itertools import count
+from functools import lru_cache
 from collections import OrderedDict
 
-from .State import DFA, State
-from .Tokenize import Tokenize
-from .Prims import STD_LOGIC, STD_LOGIC_VECTOR, BIT, SIGNED, UNSIGNED, \
-                   INTEGER, BOOLEAN, TIME, STRING, \
-                   parse_to_downto
+from .State import DFA, Grammar, State
+from .Prims import parse_type
 from .Messages import Error, Warning, Info
 
 
@@ -57,12 +53,48 @@ class EntityStateEnum(Enum):
     SUCCESS = State(27)
 
 
+# Number of distinct signatures whose id is remembered
+SIGNATURE_CACHE_SIZE = 4096
+
+_next_signature_id = count()
+
+
+@lru_cache(maxsize=SIGNATURE_CACHE_SIZE)
+def _signature_id(_key):
+    """
+    Small id of a canonical signature, so that signatures can be compared and
+    used as memo keys in O(1). Ids are never reused: a signature evicted from
+    the cache gets a new id, which only costs a missed fast path.
+    """
+    return next(_next_signature_id)
+
+
 class EntityComponent:
-    def __init__(self, _is_component, _name, _generics, _ports):
+    def __init__(self, _is_component, _name, _generics, _ports, _position=None):
         self._name = _name
         self._is_component = _is_component
         self._generics = _generics
         self._ports = _ports
+        self._position = _position
+        self._signature = None
+
+    def __getstate__(self):
+        # Signature ids are only valid in the process that assigned them
+        state = dict(self.__dict__)
+        state['_signature'] = None
+        return state
+
+    @property
+    def signature(self):
+        """
+        Id of the ordered generics (name, type) and ports (name, direction,
+        type). Entities and components with the same signature match.
+        """
+        if self._signature is None:
+            key = (tuple((name, sig.type) for name, sig in self._generics.items()),
+                   tuple((name, sig.inout, sig.type) for name, sig in self._ports.items()))
+            self._signature = _signature_id(key)
+        return self._signature
 
     @property
     def name(self):
@@ -80,6 +112,10 @@ class EntityComponent:
     def ports(self):
         return self._ports
 
+    @property
+    def position(self):
+        return self._position
+
     def __str__(self):
         if self._is_component:
             return 'COMPONENT {}'.format(self._name)
@@ -102,7 +138,8 @@ class EntityPortSignalTypeToken:
     def __eq__(self, other):
         if not isinstance(other, EntityPortSignalTypeToken):
             return False
-        return self._inout == other._inout and self._type == other._type
+        # Types are interned, see Prims.py
+        return self._inout == other._inout and self._type is other._type
 
     @property
     def line(self):
@@ -131,7 +168,7 @@ class EntityGenericSignalTypeToken:
     def __eq__(self, other):
         if not isinstance(other, EntityGenericSignalTypeToken):
             return False
-        return self._type == other._type
+        return self._type is other._type
 
     @property
     def line(self):
@@ -148,318 +185,229 @@ class EntityGenericSignalTypeToken:
         return '{}'.format(self._type)
 
 
-def parse_entity_component(_token_iter, _logger, _filename):
-    """
-    @brief Helper function. Parse entity/component object
-    @param _token_iter Token Iteration
-    @param _logger Logger instance
-    @param _filename Current file name that is being linted
-    @return EntityComponent
-    """
-    parsed_generic = OrderedDict()
-    parsed_port = OrderedDict()
+class _EntityParse:
+    """ Per-call state of parse_entity_component """
+    def __init__(self, _token_iter, _logger, _filename):
+        self.token_iter = _token_iter
+        self.logger = _logger
+        self.filename = _filename
 
-    # Ports state
-    is_component = False
-    curr_sigs = []
-    curr_sig_type = None
-    curr_sig_in_out = ''
-    curr_entity_name = ''
+        self.parsed_generic = OrderedDict()
+        self.parsed_port = OrderedDict()
 
-    # Generics state
-    curr_generic_sigs = []
-    curr_generic_sig_type = None
+        # Ports state
+        self.is_component = False
+        self.position = None
+        self.curr_sigs = []
+        self.curr_sig_type = None
+        self.curr_sig_in_out = ''
+        self.curr_entity_name = ''
 
-    def _set_is_component(name):
-        nonlocal is_component
-        is_component = (name.Value.lower() == 'component')
+        # Generics state
+        self.curr_generic_sigs = []
+        self.curr_generic_sig_type = None
 
-    # =========================================================================
-    # DFA generic callbacks
-    def _set_curr_generic_sig(name):
-        nonlocal curr_generic_sigs
-        curr_generic_sigs.append(name.Value.lower())
-
-    def _set_generic_sig_type(name):
-        nonlocal curr_generic_sig_type
-
-        if name.Value.lower() == 'std_logic':
-            curr_generic_sig_type = STD_LOGIC()
-        elif name.Value.lower() == 'bit':
-            curr_generic_sig_type = BIT()
-        elif name.Value.lower() == 'integer':
-            curr_generic_sig_type = INTEGER()
-        elif name.Value.lower() == 'boolean':
-            curr_generic_sig_type = BOOLEAN()
-        elif name.Value.lower() == 'time':
-            curr_generic_sig_type = TIME()
-        elif name.Value.lower() == 'string':
-            curr_generic_sig_type = STRING()
-        elif name.Value.lower() == 'std_logic_vector':
-            first, second = parse_to_downto(_token_iter, _logger, _filename)
-
-            # Invalid STD_LOGIC_VECTOR parsing
-            if first is None and second is None:
-                err = Error(name.Start, _filename, 'Invalid syntax for STD_LOGIC_VECTOR')
-                _logger.add_log(err)
-
-                info = Info('hint - STD_LOGIC_VECTOR(3 downto 0) or STD_LOGIC_VECTOR(0 to 3)')
-                _logger.add_log(info)
-            else:
-                curr_generic_sig_type = STD_LOGIC_VECTOR(first, second)
-
-        elif name.Value.lower() == 'signed':
-            first, second = parse_to_downto(_token_iter, _logger, _filename)
-
-            # Invalid SIGNED parsing
-            if first is None and second is None:
-                err = Error(name.Start, _filename, 'Invalid syntax for SIGNED')
-                _logger.add_log(err)
-
-                info = Info('hint - SIGNED(3 downto 0) or SIGNED(0 to 3)')
-                _logger.add_log(info)
-            else:
-                curr_generic_sig_type = SIGNED(first, second)
-
-        elif name.Value.lower() == 'unsigned':
-            first, second = parse_to_downto(_token_iter, _logger, _filename)
-
-            # Invalid UNSIGNED parsing
-            if first is None and second is None:
-                err = Error(name.Start, _filename, 'Invalid syntax for UNSIGNED')
-                _logger.add_log(err)
-
-                info = Info('hint - UNSIGNED(3 downto 0) or UNSIGNED(0 to 3)')
-                _logger.add_log(info)
-            else:
-                curr_generic_sig_type = UNSIGNED(first, second)
 
-        else:
-            warn = Warning(name.Start, _filename,
-                           'Type "' + name.Value.lower() + '" is not supported in generic linting')
-            _logger.add_log(warn)
+def _set_is_component(ctx, name):
+    ctx.is_component = (name.value == 'component')
+    ctx.position = name.Start
 
-    def _add_to_parsed_generic(name):
-        nonlocal parsed_generic, curr_generic_sigs, curr_generic_sig_type
 
-        for sig in curr_generic_sigs:
-            if sig not in parsed_generic:
-                parsed_generic[sig] = EntityGenericSignalTypeToken(curr_generic_sig_type, name.Start)
-            else:
-                warn = Warning(name.Start, _filename,
-                               'Generic signal "' + sig + '" in entity "' +
-                                curr_entity_name + '" is already declared')
-                _logger.add_log(warn)
+# =============================================================================
+# DFA generic callbacks
+def _set_curr_generic_sig(ctx, name):
+    ctx.curr_generic_sigs.append(name.value)
 
-        curr_generic_sigs = []
-        curr_generic_sig_type = None
 
-    # =========================================================================
-    # DFA ports callbacks
-    def _set_curr_entity_name(name):
-        nonlocal curr_entity_name
-        curr_entity_name = name.Value.lower()
-
-    def _set_sig_type(name):
-        nonlocal curr_sig_type
-
-        if name.Value.lower() == 'std_logic':
-            curr_sig_type = STD_LOGIC()
-        elif name.Value.lower() == 'bit':
-            curr_sig_type = BIT()
-        elif name.Value.lower() == 'integer':
-            curr_sig_type = INTEGER()
-        elif name.Value.lower() == 'boolean':
-            curr_sig_type = BOOLEAN()
-        elif name.Value.lower() == 'time':
-            curr_sig_type = TIME()
-        elif name.Value.lower() == 'string':
-            curr_sig_type = STRING()
-        elif name.Value.lower() == 'std_logic_vector':
-            first, second = parse_to_downto(_token_iter, _logger, _filename)
-
-            # Invalid STD_LOGIC_VECTOR parsing
-            if first is None and second is None:
-                err = Error(name.Start, _filename, 'Invalid syntax for STD_LOGIC_VECTOR')
-                _logger.add_log(err)
-
-                info = Info('hint - STD_LOGIC_VECTOR(3 downto 0) or STD_LOGIC_VECTOR(0 to 3)')
-                _logger.add_log(info)
-            else:
-                curr_sig_type = STD_LOGIC_VECTOR(first, second)
-
-        elif name.Value.lower() == 'signed':
-            first, second = parse_to_downto(_token_iter, _logger, _filename)
-
-            # Invalid SIGNED parsing
-            if first is None and second is None:
-                err = Error(name.Start, _filename, 'Invalid syntax for SIGNED')
-                _logger.add_log(err)
-
-                info = Info('hint - SIGNED(3 downto 0) or SIGNED(0 to 3)')
-                _logger.add_log(info)
-            else:
-                curr_sig_type = SIGNED(first, second)
-
-        elif name.Value.lower() == 'unsigned':
-            first, second = parse_to_downto(_token_iter, _logger, _filename)
-
-            # Invalid UNSIGNED parsing
-            if first is None and second is None:
-                err = Error(name.Start, _filename, 'Invalid syntax for UNSIGNED')
-                _logger.add_log(err)
-
-                info = Info('hint - UNSIGNED(3 downto 0) or UNSIGNED(0 to 3)')
-                _logger.add_log(info)
-            else:
-                curr_sig_type = UNSIGNED(first, second)
+def _set_generic_sig_type(ctx, name):
+    ctx.curr_generic_sig_type = parse_type(name, ctx.token_iter, ctx.logger,
+                                           ctx.filename, 'generic')
+
 
+def _add_to_parsed_generic(ctx, name):
+    for sig in ctx.curr_generic_sigs:
+        if sig not in ctx.parsed_generic:
+            ctx.parsed_generic[sig] = EntityGenericSignalTypeToken(ctx.curr_generic_sig_type,
+                                                                   name.Start)
         else:
-            warn = Warning(name.Start, _filename,
-                           'Type "' + name.Value.lower() + '" is not supported in port linting')
-            _logger.add_log(warn)
-
-    def _set_sig_inout(name):
-        nonlocal curr_sig_in_out
-        curr_sig_in_out = name.Value.lower()
-
-    def _append_sig(name):
-        nonlocal curr_sigs
-        curr_sigs.append(name.Value.lower())
-
-    def _add_to_parsed_port(name):
-        nonlocal parsed_port, curr_sigs, curr_sig_type, curr_sig_in_out
-
-        for sig in curr_sigs:
-            if sig not in parsed_port:
-                parsed_port[sig] = EntityPortSignalTypeToken(curr_sig_in_out, curr_sig_type, name.Start)
-            else:
-                warn = Warning(name.Start, _filename,
-                               'Signal "' + sig + '" in entity "' + curr_entity_name +
-                               '" is already declared')
-                _logger.add_log(warn)
-
-        curr_sigs = []
-        curr_sig_type = None
-        curr_sig_in_out = ''
-
-    def _check_entity_name(name):
-        nonlocal curr_entity_name, is_component
-        if not is_component and name.Value.lower() != curr_entity_name:
-            err = Error(name.Start, _filename,
-                        'Expecting entity "' + curr_entity_name + '", got: ' +
-                        '"' + name.Value.lower() + '"')
-            _logger.add_log(err)
+            warn = Warning(name.Start, ctx.filename,
+                           'Generic signal "' + sig + '" in entity "' +
+                            ctx.curr_entity_name + '" is already declared', rule='duplicate-signal')
+            ctx.logger.add_log(warn)
 
-        elif is_component and name.Value.lower() != 'component':
-            err = Error(name.Start, _filename,
-                        'Expecting "component" at end of component declaration, got: ' +
-                        '"' + name.Value.lower() + '"')
-            _logger.add_log(err)
+    ctx.curr_generic_sigs = []
+    ctx.curr_generic_sig_type = None
 
-    def _check_end_component(name):
-        nonlocal curr_entity_name, is_component
-        if not is_component:
-            err = Error(name.Start, _filename,
-                        'Expecting ";" at the end of entity')
-            _logger.add_log(err)
 
-        elif is_component and name.Value.lower() != curr_entity_name:
-            err = Error(name.Start, _filename,
-                        'Expecting component "' + curr_entity_name + '", got: ' +
-                        '"' + name.Value.lower() + '"')
-            _logger.add_log(err)
+# =============================================================================
+# DFA ports callbacks
+def _set_curr_entity_name(ctx, name):
+    ctx.curr_entity_name = name.value
 
-    # =========================================================================
-    # Build parse_entity DFA
-    # =========================================================================
-    dfa = DFA('parse_entity', EntityStateEnum.START, [EntityStateEnum.SUCCESS])
-
-    # Parse entity starting syntax
-    dfa.add_transition(EntityStateEnum.START,
-                       EntityStateEnum.ENTITY, 'entity', _set_is_component)
-    dfa.add_transition(EntityStateEnum.START,
-                       EntityStateEnum.ENTITY, 'component', _set_is_component)
-    dfa.add_transition(EntityStateEnum.ENTITY, EntityStateEnum.NAME, '_*_',
-                       _set_curr_entity_name)
-    dfa.add_transition(EntityStateEnum.NAME, EntityStateEnum.IS, 'is')
-    dfa.add_transition(EntityStateEnum.NAME, EntityStateEnum.GENERIC, 'generic')
-
-    # Parse generic syntax
-    dfa.add_transition(EntityStateEnum.IS, EntityStateEnum.GENERIC, 'generic')
-    dfa.add_transition(EntityStateEnum.GENERIC, EntityStateEnum.GENERIC_OPEN_BRACK, '(')
-    dfa.add_transition(EntityStateEnum.GENERIC_OPEN_BRACK,
-                       EntityStateEnum.GENERIC_NAME, '_*_', _set_curr_generic_sig)
-    dfa.add_transition(EntityStateEnum.GENERIC_NAME,
-                       EntityStateEnum.GENERIC_OPEN_BRACK, ',')
-    dfa.add_transition(EntityStateEnum.GENERIC_NAME, EntityStateEnum.GENERIC_COLON, ':')
-    dfa.add_transition(EntityStateEnum.GENERIC_COLON,
-                       EntityStateEnum.GENERIC_TYPE, '_*_', _set_generic_sig_type)
-
-    dfa.add_transition(EntityStateEnum.GENERIC_TYPE, EntityStateEnum.GENERIC_ASSIGNMENT, ':=')
-    dfa.add_transition(EntityStateEnum.GENERIC_ASSIGNMENT, EntityStateEnum.GENERIC_VALUE, '_*_')
-    dfa.add_transition(EntityStateEnum.GENERIC_VALUE, EntityStateEnum.GENERIC_VALUE, '_*_')
-    dfa.add_transition(EntityStateEnum.GENERIC_VALUE,
-                       EntityStateEnum.GENERIC_OPEN_BRACK, ';', _add_to_parsed_generic)
-
-    dfa.add_transition(EntityStateEnum.GENERIC_TYPE,
-                       EntityStateEnum.GENERIC_OPEN_BRACK, ';', _add_to_parsed_generic)
-    dfa.add_transition(EntityStateEnum.GENERIC_TYPE,
-                       EntityStateEnum.GENERIC_CLOSE_BRACK, ')', _add_to_parsed_generic)
-
-    dfa.add_transition(EntityStateEnum.GENERIC_VALUE,
-                       EntityStateEnum.GENERIC_CLOSE_BRACK, ')', _add_to_parsed_generic)
-    dfa.add_transition(EntityStateEnum.GENERIC_CLOSE_BRACK, EntityStateEnum.GENERIC_END_SEMICOLON, ';')
-
-    dfa.add_transition(EntityStateEnum.GENERIC_END_SEMICOLON, EntityStateEnum.PORT, 'port')
-
-    # Parse port syntax
-    dfa.add_transition(EntityStateEnum.NAME, EntityStateEnum.PORT, 'port')
-    dfa.add_transition(EntityStateEnum.IS, EntityStateEnum.PORT, 'port')
-    dfa.add_transition(EntityStateEnum.PORT, EntityStateEnum.PORT_OPEN_BRACK, '(')
-
-    dfa.add_transition(EntityStateEnum.PORT_OPEN_BRACK,
-                       EntityStateEnum.SIGNAL, '_*_', _append_sig)
-    dfa.add_transition(EntityStateEnum.SIGNAL, EntityStateEnum.PORT_OPEN_BRACK, ',')
-    dfa.add_transition(EntityStateEnum.SIGNAL, EntityStateEnum.SIGNAL_DONE, ':')
-
-    # Parse in out type
-    dfa.add_transition(EntityStateEnum.SIGNAL_DONE,
-                       EntityStateEnum.SIGNAL_IN_OUT, 'in', _set_sig_inout)
-    dfa.add_transition(EntityStateEnum.SIGNAL_DONE,
-                       EntityStateEnum.SIGNAL_IN_OUT, 'out', _set_sig_inout)
-    dfa.add_transition(EntityStateEnum.SIGNAL_DONE,
-                       EntityStateEnum.SIGNAL_IN_OUT, 'buffer', _set_sig_inout)
-    dfa.add_transition(EntityStateEnum.SIGNAL_DONE,
-                       EntityStateEnum.SIGNAL_IN_OUT, 'inout', _set_sig_inout)
-
-    # Parse in signal type
-    dfa.add_transition(EntityStateEnum.SIGNAL_IN_OUT,
-                       EntityStateEnum.SIGNAL_TYPE, '_*_', _set_sig_type)
-
-
-    dfa.add_transition(EntityStateEnum.SIGNAL_TYPE, EntityStateEnum.SIGNAL_ASSIGNMENT, ':=')
-    dfa.add_transition(EntityStateEnum.SIGNAL_ASSIGNMENT, EntityStateEnum.SIGNAL_VALUE, '_*_')
-    dfa.add_transition(EntityStateEnum.SIGNAL_VALUE, EntityStateEnum.SIGNAL_VALUE, '_*_')
-    dfa.add_transition(EntityStateEnum.SIGNAL_VALUE,
-                       EntityStateEnum.PORT_OPEN_BRACK, ';', _add_to_parsed_port)
-    dfa.add_transition(EntityStateEnum.SIGNAL_VALUE,
-                       EntityStateEnum.PORT_CLOSE_BRACK, ')', _add_to_parsed_port)
-
-    dfa.add_transition(EntityStateEnum.SIGNAL_TYPE,
-                       EntityStateEnum.PORT_OPEN_BRACK, ';', _add_to_parsed_port)
-    dfa.add_transition(EntityStateEnum.SIGNAL_TYPE,
-                       EntityStateEnum.PORT_CLOSE_BRACK, ')', _add_to_parsed_port)
-
-    # Parse end entity
-    dfa.add_transition(EntityStateEnum.PORT_CLOSE_BRACK, EntityStateEnum.PORT_SEMICOLON, ';')
-    dfa.add_transition(EntityStateEnum.PORT_SEMICOLON, EntityStateEnum.END, 'end')
-    dfa.add_transition(EntityStateEnum.IS, EntityStateEnum.END, 'end')
-    dfa.add_transition(EntityStateEnum.END,
-                       EntityStateEnum.END_NAME, '_*_', _check_entity_name)
-    dfa.add_transition(EntityStateEnum.END_NAME, EntityStateEnum.SUCCESS, ';')
-    dfa.add_transition(EntityStateEnum.END_NAME,
-                       EntityStateEnum.END_NAME, '_*_', _check_end_component)
+
+def _set_sig_type(ctx, name):
+    ctx.curr_sig_type = parse_type(name, ctx.token_iter, ctx.logger,
+                                   ctx.filename, 'port')
+
+
+def _set_sig_inout(ctx, name):
+    ctx.curr_sig_in_out = name.value
+
+
+def _append_sig(ctx, name):
+    ctx.curr_sigs.append(name.value)
+
+
+def _add_to_parsed_port(ctx, name):
+    for sig in ctx.curr_sigs:
+        if sig not in ctx.parsed_port:
+            ctx.parsed_port[sig] = EntityPortSignalTypeToken(ctx.curr_sig_in_out,
+                                                             ctx.curr_sig_type, name.Start)
+        else:
+            warn = Warning(name.Start, ctx.filename,
+                           'Signal "' + sig + '" in entity "' + ctx.curr_entity_name +
+                           '" is already declared', rule='duplicate-signal')
+            ctx.logger.add_log(warn)
+
+    ctx.curr_sigs = []
+    ctx.curr_sig_type = None
+    ctx.curr_sig_in_out = ''
+
+
+def _check_entity_name(ctx, name):
+    if not ctx.is_component and name.value != ctx.curr_entity_name:
+        err = Error(name.Start, ctx.filename,
+                    'Expecting entity "' + ctx.curr_entity_name + '", got: ' +
+                    '"' + name.value + '"', rule='end-name-mismatch')
+        ctx.logger.add_log(err)
+
+    elif ctx.is_component and name.value != 'component':
+        err = Error(name.Start, ctx.filename,
+                    'Expecting "component" at end of component declaration, got: ' +
+                    '"' + name.value + '"', rule='syntax')
+        ctx.logger.add_log(err)
+
+
+def _check_end_component(ctx, name):
+    if not ctx.is_component:
+        err = Error(name.Start, ctx.filename,
+                    'Expecting ";" at the end of entity', rule='syntax')
+        ctx.logger.add_log(err)
+
+    elif ctx.is_component and name.value != ctx.curr_entity_name:
+        err = Error(name.Start, ctx.filename,
+                    'Expecting component "' + ctx.curr_entity_name + '", got: ' +
+                    '"' + name.value + '"', rule='end-name-mismatch')
+        ctx.logger.add_log(err)
+
+
+# =============================================================================
+# Build parse_entity grammar
+# =============================================================================
+ENTITY_GRAMMAR = Grammar('parse_entity', EntityStateEnum.START, [EntityStateEnum.SUCCESS])
+
+# Parse entity starting syntax
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.START,
+                              EntityStateEnum.ENTITY, 'entity', _set_is_component)
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.START,
+                              EntityStateEnum.ENTITY, 'component', _set_is_component)
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.ENTITY, EntityStateEnum.NAME, '_*_',
+                              _set_curr_entity_name)
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.NAME, EntityStateEnum.IS, 'is')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.NAME, EntityStateEnum.GENERIC, 'generic')
+
+# Parse generic syntax
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.IS, EntityStateEnum.GENERIC, 'generic')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.GENERIC, EntityStateEnum.GENERIC_OPEN_BRACK, '(')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.GENERIC_OPEN_BRACK,
+                              EntityStateEnum.GENERIC_NAME, '_*_', _set_curr_generic_sig)
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.GENERIC_NAME,
+                              EntityStateEnum.GENERIC_OPEN_BRACK, ',')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.GENERIC_NAME, EntityStateEnum.GENERIC_COLON, ':')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.GENERIC_COLON,
+                              EntityStateEnum.GENERIC_TYPE, '_*_', _set_generic_sig_type)
+
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.GENERIC_TYPE,
+                              EntityStateEnum.GENERIC_ASSIGNMENT, ':=')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.GENERIC_ASSIGNMENT,
+                              EntityStateEnum.GENERIC_VALUE, '_*_')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.GENERIC_VALUE, EntityStateEnum.GENERIC_VALUE, '_*_')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.GENERIC_VALUE,
+                              EntityStateEnum.GENERIC_OPEN_BRACK, ';', _add_to_parsed_generic)
+
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.GENERIC_TYPE,
+                              EntityStateEnum.GENERIC_OPEN_BRACK, ';', _add_to_parsed_generic)
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.GENERIC_TYPE,
+                              EntityStateEnum.GENERIC_CLOSE_BRACK, ')', _add_to_parsed_generic)
+
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.GENERIC_VALUE,
+                              EntityStateEnum.GENERIC_CLOSE_BRACK, ')', _add_to_parsed_generic)
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.GENERIC_CLOSE_BRACK,
+                              EntityStateEnum.GENERIC_END_SEMICOLON, ';')
+
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.GENERIC_END_SEMICOLON, EntityStateEnum.PORT, 'port')
+
+# Parse port syntax
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.NAME, EntityStateEnum.PORT, 'port')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.IS, EntityStateEnum.PORT, 'port')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.PORT, EntityStateEnum.PORT_OPEN_BRACK, '(')
+
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.PORT_OPEN_BRACK,
+                              EntityStateEnum.SIGNAL, '_*_', _append_sig)
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.SIGNAL, EntityStateEnum.PORT_OPEN_BRACK, ',')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.SIGNAL, EntityStateEnum.SIGNAL_DONE, ':')
+
+# Parse in out type
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.SIGNAL_DONE,
+                              EntityStateEnum.SIGNAL_IN_OUT, 'in', _set_sig_inout)
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.SIGNAL_DONE,
+                              EntityStateEnum.SIGNAL_IN_OUT, 'out', _set_sig_inout)
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.SIGNAL_DONE,
+                              EntityStateEnum.SIGNAL_IN_OUT, 'buffer', _set_sig_inout)
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.SIGNAL_DONE,
+                              EntityStateEnum.SIGNAL_IN_OUT, 'inout', _set_sig_inout)
+
+# Parse in signal type
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.SIGNAL_IN_OUT,
+                              EntityStateEnum.SIGNAL_TYPE, '_*_', _set_sig_type)
+
+
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.SIGNAL_TYPE, EntityStateEnum.SIGNAL_ASSIGNMENT, ':=')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.SIGNAL_ASSIGNMENT,
+                              EntityStateEnum.SIGNAL_VALUE, '_*_')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.SIGNAL_VALUE, EntityStateEnum.SIGNAL_VALUE, '_*_')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.SIGNAL_VALUE,
+                              EntityStateEnum.PORT_OPEN_BRACK, ';', _add_to_parsed_port)
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.SIGNAL_VALUE,
+                              EntityStateEnum.PORT_CLOSE_BRACK, ')', _add_to_parsed_port)
+
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.SIGNAL_TYPE,
+                              EntityStateEnum.PORT_OPEN_BRACK, ';', _add_to_parsed_port)
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.SIGNAL_TYPE,
+                              EntityStateEnum.PORT_CLOSE_BRACK, ')', _add_to_parsed_port)
+
+# Parse end entity
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.PORT_CLOSE_BRACK, EntityStateEnum.PORT_SEMICOLON, ';')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.PORT_SEMICOLON, EntityStateEnum.END, 'end')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.IS, EntityStateEnum.END, 'end')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.END,
+                              EntityStateEnum.END_NAME, '_*_', _check_entity_name)
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.END_NAME, EntityStateEnum.SUCCESS, ';')
+ENTITY_GRAMMAR.add_transition(EntityStateEnum.END_NAME,
+                              EntityStateEnum.END_NAME, '_*_', _check_end_component)
+ENTITY_GRAMMAR.compile()
+
+
+def parse_entity_component(_token_iter, _logger, _filename):
+    """
+    @brief Helper function. Parse entity/component object
+    @param _token_iter Token Iteration
+    @param _logger Logger instance
+    @param _filename Current file name that is being linted
+    @return EntityComponent
+    """
+    ctx = _EntityParse(_token_iter, _logger, _filename)
+    dfa = DFA(ENTITY_GRAMMAR, ctx)
 
     # =========================================================================
     # Token stream iteration
@@ -469,16 +417,10 @@ def parse_entity_component(_token_iter, _logger, _filename):
         try:
             token = next(_token_iter)
             curr_token = token
-            if isinstance(token, (StartOfDocumentToken, EndOfDocumentToken,
-                                  LinebreakToken, SpaceToken,
-                                  IndentationToken, CommentToken)):
-                pass
-
-            else:
-                dfa.step(token)
+            dfa.step(token)
 
         except ParserException as ex:
-            err = Error(token.Start, _filename, str(ex))
+            err = Error(token.Start, _filename, str(ex), rule='parse-error')
             _logger.add_log(err)
             break
 
@@ -490,18 +432,18 @@ def parse_entity_component(_token_iter, _logger, _filename):
         if dfa.get_curr_state == EntityStateEnum.IS:
             err = Error(curr_token.Start, _filename,
                         'Expecting "port" or "generic", ' +
-                        'got "' + curr_token.Value.lower() + '"')
+                        'got "' + curr_token.value + '"', rule='syntax')
             _logger.add_log(err)
         elif dfa.get_curr_state == EntityStateEnum.SIGNAL_DONE:
             err = Error(curr_token.Start, _filename,
                         'Expecting "in", "out", "buffer", "inout" for signal type, ' +
-                        'got "' + curr_token.Value.lower() + '"')
+                        'got "' + curr_token.value + '"', rule='syntax')
             _logger.add_log(err)
 
         elif dfa.get_curr_state == EntityStateEnum.GENERIC_TYPE:
             err = Error(curr_token.Start, _filename,
                         'Invalid generic type declaration around token "' +
-                        curr_token.Value.lower() + '"')
+                        curr_token.value + '"', rule='syntax')
             _logger.add_log(err)
 
             info = Info('hint - check syntax for declared generic type')
@@ -510,7 +452,7 @@ def parse_entity_component(_token_iter, _logger, _filename):
         elif dfa.get_curr_state == EntityStateEnum.SIGNAL_TYPE:
             err = Error(curr_token.Start, _filename,
                         'Invalid port type declaration around token "' +
-                        curr_token.Value.lower() + '"')
+                        curr_token.value + '"', rule='syntax')
             _logger.add_log(err)
 
             info = Info('hint - check syntax for declared port type')
@@ -519,9 +461,10 @@ def parse_entity_component(_token_iter, _logger, _filename):
         else:
             err = Error(curr_token.Start, _filename,
                         'Invalid declaration around token "' +
-                        curr_token.Value.lower() + '"')
+                        curr_token.value + '"', rule='syntax')
             _logger.add_log(err)
 
         return None
 
-    return EntityComponent(is_component, curr_entity_name, parsed_generic, parsed_port)
\ No newline at end of file
+    return EntityComponent(ctx.is_component, ctx.curr_entity_name,
+                           ctx.parsed_generic, ctx.parsed_port, ctx.position)
\ No newline at end of file
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: Explore.py
+#
+#  Description: Implementation of the design space exploration of the
+#  upload flow: synthesis option sets and placement seeds are run
+#  concurrently, and the routed design with the best fmax is kept.
+#
+# -----------------------------------------------------------------------------
+import re
+import json
+from itertools import combinations
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Options of yosys' synth_ice40 that may be explored
+SYNTH_FLAGS = ('abc2', 'abc9', 'dff', 'dsp', 'flowmap', 'noflatten', 'retime', 'spram')
+
+_FMAX_RE = re.compile(r"Max frequency for clock\s+'([^']*)':\s+([0-9.]+) MHz")
+_UTILIZATION_RE = re.compile(r'^Info:\s+([A-Za-z0-9_]+):\s+(\d+)\s*/\s*(\d+)\s+\d+%', re.M)
+
+
+def parse_explore_spec(_spec):
+    """
+    @brief Parse an exploration spec such as "seeds=16,abc9,retime"
+    @param _spec Comma separated list of "seeds=N" and synth_ice40 flags
+    @return (seeds, flags), the list of placement seeds and of flags
+    @raise ValueError on an invalid spec
+    """
+    seeds = [1]
+    flags = []
+    for item in (s.strip() for s in _spec.split(',')):
+        if item.startswith('seeds='):
+            try:
+                count = int(item[len('seeds='):])
+            except ValueError:
+                count = 0
+            if count < 1:
+                raise ValueError('Invalid seed count "' + item + '"')
+            seeds = list(range(1, count + 1))
+        elif item in SYNTH_FLAGS:
+            if item not in flags:
+                flags.append(item)
+        elif item:
+            raise ValueError('Unknown exploration option "' + item + '", expected seeds=N ' +
+                             'or one of ' + ', '.join(SYNTH_FLAGS))
+    return seeds, flags
+
+
+def synth_variants(_flags):
+    """ Every subset of flags, from none to all of them """
+    return [variant for n in range(len(_flags) + 1) for variant in combinations(_flags, n)]
+
+
+def parse_nextpnr_log(_output):
+    """
+    @brief Extract the achieved fmax and utilization from a nextpnr log
+    @param _output nextpnr output
+    @return (fmax, utilization) where fmax is the lowest final fmax over all
+    clocks in MHz, or None, and utilization maps a cell type to (used, total)
+    """
+    clocks = {}
+    for clock, mhz in _FMAX_RE.findall(_output):
+        # Later reports (after routing) replace earlier estimates
+        clocks[clock] = float(mhz)
+
+    utilization = {}
+    for cell, used, total in _UTILIZATION_RE.findall(_output):
+        utilization[cell] = (int(used), int(total))
+
+    return (min(clocks.values()) if clocks else None), utilization
+
+
+class ExploreRun:
+    """ One synthesis option set and placement seed of an exploration """
+    def __init__(self, flags, seed):
+        self.flags = flags
+        self.seed = seed
+        self.asc = None
+        self.netlist = None
+        self.ok = False
+        self.error = None
+        self.log = None
+        self.fmax = None
+        self.utilization = {}
+
+    @property
+    def name(self):
+        return '+'.join(self.flags or ('default',)) + '/seed' + str(self.seed)
+
+    def to_dict(self):
+        return {
+            'flags': list(self.flags),
+            'seed': self.seed,
+            'ok': self.ok,
+            'error': self.error,
+            'fmax_mhz': self.fmax,
+            'utilization': dict((cell, {'used': used, 'total': total})
+                                for cell, (used, total) in self.utilization.items()),
+            'asc': self.asc,
+            'log': self.log,
+        }
+
+
+def _sort_key(_run):
+    logic_cells = _run.utilization.get('ICESTORM_LC', (0, 0))[0]
+    return (-(_run.fmax or 0.0), logic_cells)
+
+
+def best_run(_runs):
+    """ Successful run with the highest fmax, then the fewest logic cells """
+    runs = [run for run in _runs if run.ok]
+    return min(runs, key=_sort_key) if runs else None
+
+
+def explore(_variants, _seeds, _synthesize, _route, _jobs=1, _progress=None):
+    """
+    @brief Synthesize every variant and place-and-route each netlist with
+    every seed, up to _jobs tool processes at a time. Routing of a netlist
+    starts as soon as its synthesis finished.
+    @param _variants List of synthesis flag tuples, from synth_variants
+    @param _seeds List of placement seeds
+    @param _synthesize Function of flags returning (netlist, error), error
+    being None on success
+    @param _route Function of (flags, netlist, seed) returning (asc, output,
+    error, log), error being None on success
+    @param _jobs Number of concurrent tool processes
+    @param _progress Optional function called with every finished run
+    @return List of ExploreRun, ordered by variant and seed
+    """
+    runs = dict(((flags, seed), ExploreRun(flags, seed)) for flags in _variants for seed in _seeds)
+
+    def finish(run):
+        if _progress is not None:
+            _progress(run)
+
+    with ThreadPoolExecutor(max_workers=max(1, _jobs)) as executor:
+        pending = dict((executor.submit(_synthesize, flags), (flags, None)) for flags in _variants)
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                flags, seed = pending.pop(future)
+
+                if seed is not None:
+                    # Place-and-route of one seed
+                    run = runs[(flags, seed)]
+                    run.asc, output, run.error, run.log = future.result()
+                    run.ok = run.error is None
+                    run.fmax, run.utilization = parse_nextpnr_log(output)
+                    finish(run)
+                    continue
+
+                netlist, error = future.result()
+                for seed in _seeds:
+                    run = runs[(flags, seed)]
+                    run.netlist = netlist
+                    if error is not None:
+                        run.error = error
+                        finish(run)
+                    else:
+                        pending[executor.submit(_route, flags, netlist, seed)] = (flags, seed)
+
+    return [runs[(flags, seed)] for flags in _variants for seed in _seeds]
+
+
+def write_results(_filename, _runs, _best):
+    """ Write the results table of an exploration as JSON """
+    with open(_filename, 'w') as f:
+        json.dump({
+            'best': None if _best is None else _best.to_dict(),
+            'runs': [run.to_dict() for run in _runs],
+        }, f, indent=2)
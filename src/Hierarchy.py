@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: Hierarchy.py
+#
+#  Description: Implementation of the design hierarchy (instance tree) report
+#  built from the linted entities and architectures.
+#
+# -----------------------------------------------------------------------------
+import json
+
+# Node status
+OK = 'ok'
+UNRESOLVED = 'unresolved'
+NO_ARCHITECTURE = 'no-architecture'
+CYCLE = 'cycle'
+REPEATED = 'repeated'
+
+# Deeper levels are not indented any further, so the printed tree stays
+# linear in the number of nodes; their depth is printed instead
+MAX_INDENT = 32
+
+_STATUS_LABELS = {
+    UNRESOLVED: ' [unresolved]',
+    NO_ARCHITECTURE: ' [no architecture]',
+    CYCLE: ' [cycle]',
+    REPEATED: ' [see above]',
+}
+
+
+class HierarchyNode:
+    """ Instantiation of a unit in the tree, count times by its parent """
+    __slots__ = ('id', 'parent', 'name', 'count', 'depth', 'filename', 'status', 'children')
+
+    def __init__(self, _id, _parent, _name, _count, _depth):
+        self.id = _id
+        self.parent = _parent
+        self.name = _name
+        self.count = _count
+        self.depth = _depth
+        self.filename = None
+        self.status = OK
+        self.children = []
+
+
+class Hierarchy:
+    """
+    Instance tree of a top unit. The unit -> instantiated unit graph is built
+    in one pass over the architectures, then walked once from the top. The
+    subtree of a unit is expanded at its first instantiation only, later
+    ones are marked as repeated, so the tree is linear in the size of the
+    design. Instance totals count every instance of the elaborated design.
+    """
+    def __init__(self, _top, _entity_dict, _architecture_dict):
+        self._entity_dict = _entity_dict
+        self._architecture_dict = _architecture_dict
+        self._graph = dict((entity_name, list(architecture.instances.items()))
+                           for entity_name, (_, architecture, _) in _architecture_dict.items())
+
+        self._nodes = []
+        self._cycles = []
+        self._unresolved = []
+        self._instances = {}
+        self._depth = 0
+        self._build(_top.lower())
+
+    @property
+    def root(self):
+        return self._nodes[0]
+
+    @property
+    def found(self):
+        return self.root.status != UNRESOLVED
+
+    @property
+    def depth(self):
+        return self._depth
+
+    @property
+    def instances(self):
+        """ Dict of unit name to number of instances below and including the top """
+        return self._instances
+
+    @property
+    def unresolved(self):
+        return self._unresolved
+
+    @property
+    def cycles(self):
+        """ Lists of unit names, each instantiating the next and the last the first """
+        return self._cycles
+
+    def _new_node(self, _parent, _name, _count):
+        node = HierarchyNode(len(self._nodes), _parent, _name, _count,
+                             0 if _parent is None else _parent.depth + 1)
+        if _name in self._entity_dict:
+            node.filename = self._entity_dict[_name][0]
+            if _name not in self._graph:
+                node.status = NO_ARCHITECTURE
+        elif _name in self._graph:
+            node.filename = self._architecture_dict[_name][0]
+        else:
+            node.status = UNRESOLVED
+
+        if _parent is not None:
+            _parent.children.append(node)
+        self._nodes.append(node)
+        return node
+
+    def _build(self, _top):
+        root = self._new_node(None, _top, 1)
+        if root.status == UNRESOLVED:
+            return
+
+        # Iterative depth first walk; on_path maps unit names being expanded
+        # to their position in the stack
+        postorder = []
+        back_edges = set()
+        done = set()
+        unresolved = set()
+        stack = []
+        on_path = {}
+
+        def enter(node):
+            if node.status == OK:
+                on_path[node.name] = len(stack)
+                stack.append((node, iter(self._graph[node.name])))
+            else:
+                if node.status == UNRESOLVED and node.name not in unresolved:
+                    unresolved.add(node.name)
+                    self._unresolved.append(node.name)
+                done.add(node.name)
+                postorder.append(node.name)
+
+        enter(root)
+        while stack:
+            node, edges = stack[-1]
+            edge = next(edges, None)
+            if edge is None:
+                stack.pop()
+                del on_path[node.name]
+                done.add(node.name)
+                postorder.append(node.name)
+                continue
+
+            name, count = edge
+            if name in on_path:
+                child = self._new_node(node, name, count)
+                child.status = CYCLE
+                back_edges.add((node.name, name))
+                self._cycles.append([n.name for (n, _) in stack[on_path[name]:]])
+            elif name in done:
+                child = self._new_node(node, name, count)
+                if self._graph.get(name):
+                    child.status = REPEATED
+            else:
+                enter(self._new_node(node, name, count))
+
+        # Reverse postorder is a topological order once back edges are ignored
+        instances = {_top: 1}
+        height = {}
+        for name in reversed(postorder):
+            total = instances.get(name, 0)
+            for child, count in self._graph.get(name, ()):
+                if (name, child) not in back_edges:
+                    instances[child] = instances.get(child, 0) + total * count
+        for name in postorder:
+            height[name] = max((height[child] + 1 for child, _ in self._graph.get(name, ())
+                                if (name, child) not in back_edges), default=0)
+
+        self._instances = instances
+        self._depth = height[_top]
+
+    def print_tree(self):
+        """ Print the tree, one instantiated unit per line """
+        stack = [(self.root, '', '')]
+        while stack:
+            node, prefix, child_prefix = stack.pop()
+            line = prefix
+            if node.depth > MAX_INDENT:
+                line += '[' + str(node.depth) + '] '
+            line += node.name
+            if node.parent is not None:
+                line += ' x' + str(node.count)
+            if node.filename is not None and node.status != REPEATED:
+                line += ' (' + node.filename + ')'
+            print(line + _STATUS_LABELS.get(node.status, ''))
+
+            indent = node.depth < MAX_INDENT
+            last = len(node.children) - 1
+            for i in range(last, -1, -1):
+                if i == last:
+                    stack.append((node.children[i], child_prefix + '`-- ',
+                                  child_prefix + '    ' if indent else child_prefix))
+                else:
+                    stack.append((node.children[i], child_prefix + '|-- ',
+                                  child_prefix + '|   ' if indent else child_prefix))
+
+    def to_json(self):
+        """ Tree as a flat list of nodes referring to their parent id """
+        units = {}
+        for node in self._nodes:
+            if node.name not in units:
+                units[node.name] = {
+                    'file': node.filename,
+                    'status': node.status,
+                    'instances': self._instances.get(node.name, 0),
+                }
+
+        return {
+            'top': self.root.name,
+            'depth': self._depth,
+            'units': units,
+            'unresolved': self._unresolved,
+            'cycles': self._cycles,
+            'nodes': [{
+                'id': node.id,
+                'parent': None if node.parent is None else node.parent.id,
+                'name': node.name,
+                'count': node.count,
+                'depth': node.depth,
+                'file': node.filename,
+                'status': node.status,
+            } for node in self._nodes],
+        }
+
+    def write_json(self, _path):
+        with open(_path, 'w') as f:
+            json.dump(self.to_json(), f, indent=1)
+            f.write('\n')
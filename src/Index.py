@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: Index.py
+#
+#  Description: Implementation of the on-disk project symbol index. The linter
+#  keeps it up to date, and queries are answered from it without parsing.
+#
+# -----------------------------------------------------------------------------
+import os
+import sqlite3
+
+DEFAULT_INDEX_PATH = os.path.join('.turquoise', 'index.sqlite')
+
+# Bump whenever the schema changes
+INDEX_VERSION = 2
+
+_SCHEMA = '''
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE units (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    entity_name TEXT,
+    row INTEGER,
+    col INTEGER
+);
+CREATE TABLE signals (
+    unit_id INTEGER NOT NULL REFERENCES units(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    direction TEXT,
+    type TEXT,
+    row INTEGER,
+    col INTEGER
+);
+CREATE TABLE components (
+    unit_id INTEGER NOT NULL REFERENCES units(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    row INTEGER,
+    col INTEGER
+);
+CREATE TABLE instances (
+    unit_id INTEGER NOT NULL REFERENCES units(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE INDEX units_name ON units(kind, name);
+CREATE INDEX units_entity ON units(kind, entity_name);
+CREATE INDEX units_file ON units(file_id);
+CREATE INDEX signals_unit ON signals(unit_id);
+CREATE INDEX components_name ON components(name);
+CREATE INDEX components_unit ON components(unit_id);
+CREATE INDEX instances_name ON instances(name);
+CREATE INDEX instances_unit ON instances(unit_id);
+'''
+
+
+def _row_col(position):
+    if not position:
+        return None, None
+    return position.Row, position.Column
+
+
+def _type_name(_type):
+    return None if _type is None else str(_type)
+
+
+class SymbolIndex:
+    """
+    SQLite index of entities with their generics and ports, architectures
+    with their declared signals, components and instantiated units, and
+    where each is declared. Files are stored by real path, and re-indexed
+    only when their modification time or size changed.
+    """
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self._path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA foreign_keys = ON')
+        self._conn.execute('PRAGMA journal_mode = WAL')
+        self._conn.execute('PRAGMA synchronous = NORMAL')
+
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != INDEX_VERSION:
+            self._create()
+
+    @property
+    def path(self):
+        return self._path
+
+    def _create(self):
+        with self._conn:
+            for (name,) in self._conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+                self._conn.execute('DROP TABLE ' + name)
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute('PRAGMA user_version = %d' % INDEX_VERSION)
+
+    def close(self):
+        self._conn.close()
+
+    # =========================================================================
+    # Updates
+    # =========================================================================
+    def update(self, _results):
+        """
+        @brief Re-index changed files and drop files that no longer exist
+        @param _results Dict of file name to (units, logs) from parse_file
+        @return Number of re-indexed files
+        """
+        stamps = dict((path, (mtime, size)) for (path, mtime, size) in
+                      self._conn.execute('SELECT path, mtime, size FROM files'))
+        updated = 0
+
+        with self._conn:
+            for filename, (units, _) in _results.items():
+                path = os.path.realpath(filename)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if stamps.get(path) == (st.st_mtime_ns, st.st_size):
+                    continue
+
+                self._remove_file(path)
+                self._add_file(path, st, units)
+                stamps[path] = (st.st_mtime_ns, st.st_size)
+                updated += 1
+
+            for filename in stamps:
+                if not os.path.exists(filename):
+                    self._remove_file(filename)
+
+        return updated
+
+    def remove(self, _filename):
+        with self._conn:
+            self._remove_file(os.path.realpath(_filename))
+
+    def _remove_file(self, _filename):
+        self._conn.execute('DELETE FROM files WHERE path = ?', (_filename,))
+
+    def _add_file(self, _filename, _stat, _units):
+        cursor = self._conn.execute('INSERT INTO files (path, mtime, size) VALUES (?, ?, ?)',
+                                    (_filename, _stat.st_mtime_ns, _stat.st_size))
+        file_id = cursor.lastrowid
+
+        for (_, kind, unit, start) in _units:
+            row, col = _row_col(start)
+            if kind == 'entity':
+                cursor = self._conn.execute(
+                    'INSERT INTO units (file_id, kind, name, row, col) VALUES (?, ?, ?, ?, ?)',
+                    (file_id, kind, unit.name, row, col))
+                unit_id = cursor.lastrowid
+
+                signals = [(unit_id, 'generic', name, None, _type_name(sig.type)) +
+                           _row_col(sig.line) for name, sig in unit.generics.items()]
+                signals += [(unit_id, 'port', name, sig.inout, _type_name(sig.type)) +
+                            _row_col(sig.line) for name, sig in unit.ports.items()]
+                self._conn.executemany('INSERT INTO signals VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                       signals)
+
+            elif kind == 'architecture':
+                cursor = self._conn.execute(
+                    'INSERT INTO units (file_id, kind, name, entity_name, row, col) ' +
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (file_id, kind, unit.name, unit.entity_name, row, col))
+                unit_id = cursor.lastrowid
+
+                self._conn.executemany(
+                    'INSERT INTO signals VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [(unit_id, 'signal', name, None, _type_name(sig_type), None, None)
+                     for name, sig_type in unit.declared_signals.items()])
+                self._conn.executemany(
+                    'INSERT INTO components VALUES (?, ?, ?, ?)',
+                    [(unit_id, comp.name) + _row_col(comp.position)
+                     for comp in unit.declared_components])
+                self._conn.executemany(
+                    'INSERT INTO instances VALUES (?, ?, ?)',
+                    [(unit_id, name, count) for name, count in unit.instances.items()])
+
+    # =========================================================================
+    # Queries
+    # =========================================================================
+    def find_entity(self, _name):
+        """ (file, row, col, kind, name) of the entity and its architectures """
+        return self._conn.execute(
+            'SELECT f.path, u.row, u.col, u.kind, u.name FROM units u ' +
+            'JOIN files f ON f.id = u.file_id ' +
+            "WHERE (u.kind = 'entity' AND u.name = ?) OR " +
+            "(u.kind = 'architecture' AND u.entity_name = ?) " +
+            'ORDER BY u.kind DESC, f.path, u.row', (_name, _name)).fetchall()
+
+    def who_uses(self, _entity_name):
+        """
+        (file, row, col, architecture name, entity name) of the architectures
+        declaring the entity as a component, at the declaration, and of those
+        instantiating it directly (entity work.X), at the architecture
+        """
+        return self._conn.execute(
+            'SELECT f.path, c.row, c.col, u.name, u.entity_name FROM components c ' +
+            'JOIN units u ON u.id = c.unit_id JOIN files f ON f.id = u.file_id ' +
+            'WHERE c.name = ? ' +
+            'UNION ALL ' +
+            'SELECT f.path, u.row, u.col, u.name, u.entity_name FROM instances i ' +
+            'JOIN units u ON u.id = i.unit_id JOIN files f ON f.id = u.file_id ' +
+            'WHERE i.name = ? AND NOT EXISTS (SELECT 1 FROM components c ' +
+            'WHERE c.unit_id = i.unit_id AND c.name = i.name) ' +
+            'ORDER BY 1, 2', (_entity_name, _entity_name)).fetchall()
+
+    def ports(self, _entity_name):
+        """ (file, row, col, kind, name, direction, type) of the entity signals """
+        return self._conn.execute(
+            'SELECT f.path, s.row, s.col, s.kind, s.name, s.direction, s.type FROM signals s ' +
+            'JOIN units u ON u.id = s.unit_id JOIN files f ON f.id = u.file_id ' +
+            "WHERE u.kind = 'entity' AND u.name = ? ORDER BY f.path, u.row, s.rowid",
+            (_entity_name,)).fetchall()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: Libraries.py
+#
+#  Description: Implementation of the shared cache of pre-analyzed GHDL
+#  libraries (ieee, iCE40 primitives), built once per toolchain version and
+#  reused by every project.
+#
+# -----------------------------------------------------------------------------
+import os
+import json
+import shutil
+import hashlib
+import threading
+from glob import glob
+
+from .Build import GHDL, file_dependencies, build_order, ghdl_version
+from .Artifacts import file_digest, tool_id
+from .Messages import pp
+
+GHDL_PREFIX = os.path.abspath(os.path.join('dist', 'fpga-toolchain', 'lib', 'ghdl'))
+
+DEFAULT_LIBRARY_CACHE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'turquoise', 'ghdl-libraries')
+
+# Bump whenever the layout or the list of cached libraries changes
+LIBRARY_CACHE_VERSION = 1
+
+# VHDL standard -> (ghdl flag, library file version, ieee source directory)
+STANDARDS = {
+    '93c': ('--std=93c', 'v93', 'v93'),
+    '08': ('--std=08', 'v08', 'v08'),
+}
+
+_LIB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lib')
+
+# Vendor libraries shipped with turquoise: (library name, source files)
+VENDOR_LIBRARIES = [
+    ('sb_ice40_components_syn', [os.path.join(_LIB_DIR, 'ice40', 'sb_ice40_components_syn.vhdl')]),
+]
+
+
+def ghdl_prefix():
+    return os.environ.get('GHDL_PREFIX') or GHDL_PREFIX
+
+
+class LibraryCache:
+    """
+    Directory of pre-analyzed libraries per (GHDL version, GHDL binary,
+    VHDL standard, library sources) key, passed to GHDL with -P. ieee is
+    only analyzed when the toolchain does not ship it pre-analyzed. A cache
+    entry is built in a private directory and renamed into place, so
+    concurrent runs never see a partial entry. An entry GHDL failed to build,
+    e.g. because GHDL is not installed, is marked as failed, so later runs
+    neither retry nor warn until the toolchain changes.
+    """
+    def __init__(self, runner, path=DEFAULT_LIBRARY_CACHE):
+        self._runner = runner
+        self._path = path
+        self._dirs = {}
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path
+
+    def _libraries(self, _std):
+        """ List of (library name, source files) to analyze, in order """
+        libraries = []
+        _, version, ieee_dir = STANDARDS[_std]
+        prefix = ghdl_prefix()
+        if not os.path.isdir(os.path.join(prefix, 'ieee', version)):
+            sources = sorted(glob(os.path.join(prefix, 'src', 'ieee', ieee_dir, '*.vhd*')))
+            if sources:
+                libraries.append(('ieee', sources))
+        return libraries + VENDOR_LIBRARIES
+
+    def _key(self, _std, _libraries):
+        h = hashlib.sha256(json.dumps([
+            LIBRARY_CACHE_VERSION, _std, ghdl_version(self._runner), tool_id(GHDL),
+            [(name, [file_digest(f) for f in files]) for name, files in _libraries]
+        ]).encode())
+        return h.hexdigest()[:16]
+
+    def get(self, _std='93c'):
+        """
+        @brief Directory holding the pre-analyzed libraries, built if missing
+        @param _std VHDL standard, one of STANDARDS
+        @return Directory, or None if the libraries could not be built
+        """
+        with self._lock:
+            if _std in self._dirs:
+                return self._dirs[_std]
+
+            libraries = self._libraries(_std)
+            directory = os.path.join(self._path, _std + '-' + self._key(_std, libraries))
+            if not os.path.isdir(directory) and \
+               (os.path.exists(directory + '.failed') or
+                not self._build(_std, libraries, directory)):
+                directory = None
+
+            self._dirs[_std] = directory
+            return directory
+
+    def _build(self, _std, _libraries, _directory):
+        pp('info', 'Building GHDL library cache "' + _directory + '" (once per toolchain) ...')
+        tmp = _directory + '.tmp-' + str(os.getpid())
+        std_flag = STANDARDS[_std][0]
+
+        try:
+            for name, sources in _libraries:
+                # Analyze copies, so that the library never refers to files
+                # outside of the cache
+                src_dir = os.path.join(tmp, 'src', name)
+                os.makedirs(src_dir, exist_ok=True)
+                files = []
+                for f in sources:
+                    files.append(os.path.join(src_dir, os.path.basename(f)))
+                    shutil.copyfile(f, files[-1])
+
+                order, _ = build_order(file_dependencies(files))
+                result = self._runner.run('ghdl-library-' + name + '-' + _std,
+                                          [GHDL, '-a', std_flag, '--work=' + name,
+                                           '--workdir=' + tmp, '-P' + tmp] +
+                                          [files[i] for i in order])
+                if not result.ok:
+                    self._runner.report_failure(result)
+                    pp('warning', 'Failed to build GHDL library "' + name + '", ' +
+                       'continuing without the library cache.')
+                    # Same toolchain and sources, same failure
+                    open(_directory + '.failed', 'w').close()
+                    return False
+
+            try:
+                os.rename(tmp, _directory)
+            except OSError:
+                # Built concurrently by another run
+                if not os.path.isdir(_directory):
+                    raise
+            return True
+
+        except OSError as ex:
+            pp('warning', 'Failed to build GHDL library cache: ' + str(ex))
+            return False
+
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
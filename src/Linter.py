@@ -9,113 +9,361 @@
 #  provided files. Refer to README.md for supported features.
 #
 # -----------------------------------------------------------------------------
-from pyVHDLParser.Token import StartOfDocumentToken, EndOfDocumentToken, \
-                               SpaceToken, LinebreakToken, CommentToken, \
-                               IndentationToken
 from pyVHDLParser.Base import ParserException
-from itertools import chain
+import os
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 from .Messages import Error, Warning, pp
-from .Tokenize import Tokenize
+from .Logger import Logger
+from .Tokenize import Tokenize, TokenCursor, STREAM_CHUNK_SIZE
 from .Entity import parse_entity_component
 from .Architecture import parse_architecture
 from .Signal import parse_signal
 from .TypeCheck import tc_entity_component
 from .UsedCheck import check_signal_assigned_not_declared, check_signal_declared_not_used
+from .Hierarchy import Hierarchy
+
+def _chunksize(num_files, jobs):
+    """ Hand out files in a few chunks per worker to amortize IPC overhead """
+    return max(1, num_files // (jobs * 4))
+
+
+def parse_file(_filename, _cache=None, _tokenizer='pyvhdlparser'):
+    """
+    @brief Tokenize and parse a single file. Module level so that it can be
+    run in a worker process.
+    @param _filename File to be parsed
+    @param _cache Optional ParseCache consulted before tokenizing
+    @param _tokenizer Tokenizer backend, one of Tokenize.TOKENIZERS
+    @return (units, logs) where units is a list of
+    (log index, 'entity'|'architecture', unit, position) in file order and
+    logs are the diagnostic records produced while parsing the file. Units
+    also include 'package' and 'package body' entries whose unit is the
+    package name, and 'use' entries whose unit is a (library, name) pair.
+    """
+    if _cache is None:
+        return _parse_file(_filename, _tokenizer)
+
+    with open(_filename, 'rb') as f:
+        key = _cache.key(_filename, iter(partial(f.read, STREAM_CHUNK_SIZE), b''), _tokenizer)
+
+    parsed = _cache.get(key)
+    if parsed is None:
+        parsed = _parse_file(_filename, _tokenizer)
+        _cache.put(key, parsed)
+    return parsed
+
+
+def parse_files(_filenames, _jobs=1, _cache=None, _tokenizer='pyvhdlparser'):
+    """
+    @brief Parse files, either serially or across a pool of worker processes
+    @param _filenames Files to be parsed
+    @param _jobs Number of worker processes
+    @param _cache Optional ParseCache
+    @param _tokenizer Tokenizer backend, one of Tokenize.TOKENIZERS
+    @return Iterator of (file name, parse_file result) in file order, yielded
+    as results arrive
+    """
+    if _jobs > 1 and len(_filenames) > 1:
+        with ProcessPoolExecutor(max_workers=_jobs) as executor:
+            results = executor.map(partial(parse_file, _cache=_cache, _tokenizer=_tokenizer),
+                                   _filenames, chunksize=_chunksize(len(_filenames), _jobs))
+            yield from zip(_filenames, results)
+    else:
+        for f in _filenames:
+            yield f, parse_file(f, _cache, _tokenizer)
+
+
+def _parse_file(_filename, _tokenizer):
+    logger = Logger()
+    units = []
+
+    tokenize = Tokenize(_filename, _tokenizer)
+    token_iter = TokenCursor(tokenize.get_significant_token_iter())
+
+    try:
+        for token in token_iter:
+            # Parse entity
+            if token.value == 'entity':
+                token_iter.push_back(token)
+                entity = parse_entity_component(token_iter, logger, _filename)
+
+                if entity is not None:
+                    units.append((len(logger), 'entity', entity, token.Start))
+
+            # Parse architecture
+            elif token.value == 'architecture':
+                token_iter.push_back(token)
+                arch = parse_architecture(token_iter, logger, _filename)
+
+                if arch is not None:
+                    units.append((len(logger), 'architecture', arch, token.Start))
+
+            # Packages and use clauses are only kept as names, for dependency
+            # ordering of the analysis
+            elif token.value == 'package':
+                name = next(token_iter, None)
+                if name is not None and name.value == 'body':
+                    name = next(token_iter, None)
+                    if name is not None:
+                        units.append((len(logger), 'package body', name.value, token.Start))
+                elif name is not None:
+                    units.append((len(logger), 'package', name.value, token.Start))
+
+            elif token.value == 'use':
+                selected_name = []
+                for name in token_iter:
+                    if name.value == ';':
+                        break
+                    if name.value != '.':
+                        selected_name.append(name.value)
+                if len(selected_name) >= 2:
+                    units.append((len(logger), 'use', tuple(selected_name[:2]), token.Start))
+            else:
+                continue
+
+    except ParserException as ex:
+        err = Error(token.Start, _filename, str(ex), rule='parse-error')
+        logger.add_log(err)
+
+    except NotImplementedError as ex:
+        err = Error(token.Start, _filename, str(ex), rule='parse-error')
+        logger.add_log(err)
+
+    return units, list(logger.records())
+
 
 class Linter:
 
-    def __init__(self, _filenames, _logger):
-        self._filenames = _filenames
+    def __init__(self, _filenames, _logger, _jobs=1, _cache=None, _tokenizer='pyvhdlparser',
+                 _index=None):
+        # A file given twice, e.g. through a symbolic link, is linted once
+        self._filenames = []
+        paths = set()
+        for f in _filenames:
+            path = os.path.realpath(f)
+            if path not in paths:
+                paths.add(path)
+                self._filenames.append(f)
         self._logger = _logger
+        self._jobs = _jobs
+        self._cache = _cache
+        self._tokenizer = _tokenizer
+        self._index = _index
+
+        # Parsed design, kept in memory so that it can be incrementally
+        # updated by relint()
+        self._results = {}
+        self._entity_dict = {}
+        self._architecture_dict = {}
+        self._dependents = {}
+
+        # (component signature, entity signature) pairs differing only in
+        # signal order
+        self._matching_pairs = set()
 
     def print_status(self):
         # @TODO: add more stats
-        self._logger.print_logs_to_terminal()
-        self._logger.print_logs_to_file()
+        self._logger.add_suppressed_summary()
+        if self._logger.report is not None:
+            self._logger.close_report()
+        else:
+            self._logger.print_logs_to_terminal()
+            self._logger.print_logs_to_file()
         self._logger.print_status()
 
 
     def lint(self):
         """ Perform linting on provided files """
 
-        # Global states
-        entity_dict = {}
-        architecture_dict = {}
+        # Parse files, either serially or across a pool of worker processes.
+        # Results are merged back in file order as they arrive, so that the
+        # logs are the same regardless of the number of jobs and are reported
+        # while the remaining files are parsed.
+        self._results = {}
+        self._entity_dict = {}
+        self._architecture_dict = {}
+        for f, result in parse_files(self._filenames, self._jobs, self._cache, self._tokenizer):
+            pp('info', 'Linting "' + f + '" ...')
+            self._add_result(f, result)
+
+        if self._cache is not None:
+            self._cache.evict()
+        if self._index is not None:
+            self._index.update(self._results)
+
+        self._index_dependents()
+        self._check_design(self._entity_dict, self._architecture_dict)
+
+
+    def hierarchy(self, _top):
+        """
+        @brief Build the instance tree of a unit of the linted design
+        @param _top Name of the top unit
+        @return Hierarchy instance
+        """
+        return Hierarchy(_top, self._entity_dict, self._architecture_dict)
+
+
+    def relint(self, _changed, _logger):
+        """
+        @brief Incrementally re-lint after some files changed. Only the changed
+        files are re-parsed, and cross-file checks are only run for their
+        architectures, for the architectures of the entities declared in them,
+        and for architectures with components referring to those entities.
+        @param _changed Iterable of changed (modified, created or removed) files
+        @param _logger Logger instance receiving this run's logs
+        @return None
+        """
+        self._logger = _logger
+        changed = set(_changed)
+        entity_names = set()
+
+        for f in changed:
+            entity_names.update(self._entity_names(f))
+
+            if os.path.isfile(f):
+                pp('info', 'Linting "' + f + '" ...')
+                self._results[f] = parse_file(f, self._cache, self._tokenizer)
+                if f not in self._filenames:
+                    self._filenames.append(f)
+                entity_names.update(self._entity_names(f))
+
+            elif f in self._results:
+                del self._results[f]
+                self._filenames.remove(f)
+
+        if self._index is not None:
+            self._index.update(dict((f, self._results[f]) for f in changed
+                                    if f in self._results))
+
+        self._build_design(changed)
+
+        arch_names = [name for name in self._architecture_dict
+                      if self._architecture_dict[name][0] in changed]
+        # Architectures of the changed entities, which may be in other files
+        arch_names.extend(name for name in entity_names
+                          if name in self._architecture_dict and name not in arch_names)
+        for name in entity_names:
+            for arch_name in self._dependents.get(name, ()):
+                if arch_name not in arch_names:
+                    arch_names.append(arch_name)
+
+        self._check_design(self._entity_dict, self._architecture_dict, arch_names)
+
+
+    def _entity_names(self, _filename):
+        """ Names of entities parsed from file in the in-memory design """
+        if _filename not in self._results:
+            return []
+        units, _ = self._results[_filename]
+        return [unit.name for (_, kind, unit, _) in units if kind == 'entity']
+
+
+    def _add_result(self, _filename, _result):
+        """ Keep a parsed file and merge it into the design """
+        self._results[_filename] = _result
+        units, logs = _result
+        self._merge_file(_filename, units, logs, self._entity_dict,
+                         self._architecture_dict, self._logger)
+
+
+    def _build_design(self, _report_files):
+        """
+        @brief Merge parsed files into the global entity/architecture dicts
+        and index which architectures use each entity as a component.
+        @param _report_files Files whose logs are added to the logger
+        @return None
+        """
+        self._entity_dict = {}
+        self._architecture_dict = {}
 
-        # Lint through a list of files
         for f in self._filenames:
-            pp('info', 'Linting "' + f + '" ...')
+            units, logs = self._results[f]
+            logger = self._logger if f in _report_files else Logger()
+            self._merge_file(f, units, logs, self._entity_dict,
+                             self._architecture_dict, logger)
 
-            tokenize = Tokenize(f)
-            token_iter = tokenize.get_token_iter()
-
-            try:
-                for token in token_iter:
-                    # Skip comment and linebreaks
-                    if isinstance(token, (StartOfDocumentToken, EndOfDocumentToken,
-                                  LinebreakToken, SpaceToken,
-                                  IndentationToken, CommentToken)):
-                        continue
-
-                    # Parse entity, add to global state
-                    if token.Value.lower() == 'entity':
-                        token_iter = chain([token], token_iter)
-                        entity = parse_entity_component(token_iter, self._logger, f)
-
-                        if entity is not None:
-                            if entity.name in entity_dict:
-                                duplicated_entity_filename = entity_dict[entity.name][0]
-                                warn = Warning(token.Start, f,
-                                               'Duplicated entity declaration found. ' +
-                                               'Entity "' + entity.name +
-                                               '" was previously declared in "' +
-                                               duplicated_entity_filename + '"')
-                                self._logger.add_log(warn)
-                            else:
-                                entity_dict[entity.name] = (f, entity)
-
-                    # Parse architecture, add to global state
-                    elif token.Value.lower() == 'architecture':
-                        token_iter = chain([token], token_iter)
-                        arch = parse_architecture(token_iter, self._logger, f)
-
-                        if arch is not None:
-                            if arch.entity_name in architecture_dict:
-                                duplicated_arch_filename = arch_dict[arch.entity_name][0]
-                                warn = Warning(token.Start, f,
-                                               'Duplicated architecture declaration found. ' +
-                                               'Archtecture for entity "' + arch.entity_name +
-                                               '" was previously declared in "' +
-                                               duplicated_arch_filename + '"')
-                                self._logger.add_log(warn)
-                            else:
-                                architecture_dict[arch.entity_name] = (f, arch, token.Start)
-                    else:
-                        continue
+        self._index_dependents()
 
-            except ParserException as ex:
-                err = Error(token.Start, f, str(ex))
-                self._logger.add_log(err)
 
-            except NotImplementedError as ex:
-                err = Error(token.Start, f, str(ex))
-                self._logger.add_log(err)
+    def _index_dependents(self):
+        """ Index which architectures use each entity as a component """
+        self._dependents = {}
+        for arch_name in self._architecture_dict:
+            _, architecture, _ = self._architecture_dict[arch_name]
+            for component in architecture.declared_components:
+                self._dependents.setdefault(component.name, []).append(arch_name)
+
+
+    def _merge_file(self, _filename, _units, _logs, _entity_dict, _architecture_dict, _logger):
+        """
+        @brief Replay per-file logs and add parsed units to global state
+        @param _filename File the units were parsed from
+        @param _units List of (log index, kind, unit, position) from parse_file
+        @param _logs Logs produced while parsing the file
+        @param _entity_dict Global entity dict
+        @param _architecture_dict Global architecture dict
+        @param _logger Logger instance
+        @return None
+        """
+        log_idx = 0
+        for (idx, kind, unit, start) in _units:
+            # Replay logs produced before this unit was parsed
+            for record in _logs[log_idx:idx]:
+                _logger.add_record(record)
+            log_idx = idx
+
+            if kind == 'entity':
+                if unit.name in _entity_dict:
+                    duplicated_entity_filename = _entity_dict[unit.name][0]
+                    warn = Warning(start, _filename,
+                                   'Duplicated entity declaration found. ' +
+                                   'Entity "' + unit.name +
+                                   '" was previously declared in "' +
+                                   duplicated_entity_filename + '"', rule='duplicate-entity')
+                    _logger.add_log(warn)
+                else:
+                    _entity_dict[unit.name] = (_filename, unit)
+
+            elif kind == 'architecture':
+                if unit.entity_name in _architecture_dict:
+                    duplicated_arch_filename = _architecture_dict[unit.entity_name][0]
+                    warn = Warning(start, _filename,
+                                   'Duplicated architecture declaration found. ' +
+                                   'Archtecture for entity "' + unit.entity_name +
+                                   '" was previously declared in "' +
+                                   duplicated_arch_filename + '"', rule='duplicate-architecture')
+                    _logger.add_log(warn)
+                else:
+                    _architecture_dict[unit.entity_name] = (_filename, unit, start)
+
+        for record in _logs[log_idx:]:
+            _logger.add_record(record)
+
+
+    def _check_design(self, entity_dict, architecture_dict, arch_names=None):
+        """ Perform cross-file checks on parsed entities and architectures """
+        if arch_names is None:
+            arch_names = list(architecture_dict)
 
         # Architecture list iteration
-        for arch_name in architecture_dict:
+        for arch_name in arch_names:
             filename, architecture, line = architecture_dict[arch_name]
 
             # Perform entity component typecheck
             # ----------------------------------
             component_list = architecture.declared_components
-            tc_entity_component(entity_dict, component_list, filename, self._logger)
+            tc_entity_component(entity_dict, component_list, filename, self._logger,
+                                self._matching_pairs)
 
             # Perform assigned but not declared check
             # ---------------------------------------
             _declared = dict(architecture.declared_signals)
             if arch_name not in entity_dict:
                 err = Error(line, filename,
-                            'No matching entity found for architecture "' + arch_name + '"')
+                            'No matching entity found for architecture "' + arch_name + '"',
+                            rule='missing-entity')
                 self._logger.add_log(err)
             else:
                 _, entity = entity_dict[arch_name]
@@ -123,7 +371,8 @@ class Linter:
                 # Add generic signals to declared signal dict
                 for sig in entity.generics:
                     if sig in _declared:
-                        warn = Warning(line, filename, 'Re-declaration of signal "' + sig + '"')
+                        warn = Warning(line, filename, 'Re-declaration of signal "' + sig + '"',
+                                       rule='redeclared-signal')
                         self._logger.add_log(warn)
                     else:
                         _declared[sig] = entity.generics[sig].type
@@ -131,7 +380,8 @@ class Linter:
                 # Add port signal to declared signals
                 for sig in entity.ports:
                     if sig in _declared:
-                        warn = Warning(line, filename, 'Re-declaration of signal "' + sig + '"')
+                        warn = Warning(line, filename, 'Re-declaration of signal "' + sig + '"',
+                                       rule='redeclared-signal')
                         self._logger.add_log(warn)
                     else:
                         _declared[sig] = entity.ports[sig].type
@@ -142,4 +392,4 @@ class Linter:
             # Perform declared but not used check
             # -----------------------------------
             check_signal_declared_not_used(architecture.declared_signals,
-                                           architecture.body_tokens, filename, self._logger)
\ No newline at end of file
+                                           architecture.referenced_names, filename, self._logger)
\ No newline at end of file
@@ -8,50 +8,195 @@
 #  Description: Implementation of Logger class
 #
 # -----------------------------------------------------------------------------
+import re
 import sys
+import time
+import pickle
 import datetime
-from .Messages import Error, Warning, pp
+import tempfile
+from .Messages import Severity, format_record, pp
+
+# Number of diagnostics kept in memory before older ones spill to disk
+DEFAULT_SPILL_SIZE = 100000
+
+# Quoted names in messages, stripped to get the message template
+_QUOTED_RE = re.compile(r'"[^"\n]*"')
 
 
 class Logger:
-    """ Represent the error logging class """
+    """
+    Represent the error logging class. Diagnostics are stored as
+    (timestamp, severity, rule, filename, row, column, message) records and
+    only formatted when printed. Past spill_size records, batches are moved
+    to a temporary file. With a report attached, records are streamed to
+    the report instead of being kept.
 
-    def __init__(self, init_logs=[], filename=".turquoise.log"):
-        self._logs = init_logs
+    Diagnostics past max_per_rule for their rule or max_per_file for their
+    file are suppressed, and summarized per (rule, file, message template)
+    fingerprint by add_suppressed_summary().
+    """
+
+    def __init__(self, init_logs=None, filename=".turquoise.log", spill_size=DEFAULT_SPILL_SIZE,
+                 report=None, max_per_rule=None, max_per_file=None):
         self._filename = filename
+        self._spill_size = spill_size
+        self._report = report
+        self._records = []
+        self._spill = None
+        self._num_spilled = 0
+        self._counts = [0] * len(Severity)
+        self._num_kept = 0
+
+        self._max_per_rule = max_per_rule
+        self._max_per_file = max_per_file
+        self._per_rule = {}
+        self._per_file = {}
+        self._suppressed = {}
+        self._num_suppressed = 0
+        self._suppressing = False
+
+        # Records hold monotonic timestamps, mapped to wall clock when printed
+        self._wall_start = time.time()
+        self._monotonic_start = time.monotonic()
+
+        for log in init_logs or ():
+            self.add_log(log)
+
+    def __len__(self):
+        return self._num_kept
 
     @property
-    def logs(self):
-        return self._logs
+    def spill_size(self):
+        return self._spill_size
+
+    def set_spill_size(self, spill_size):
+        self._spill_size = max(1, spill_size)
+
+    @property
+    def report(self):
+        return self._report
+
+    def set_report(self, report):
+        self._report = report
+
+    def count(self, severity):
+        return self._counts[severity]
+
+    def set_limits(self, max_per_rule=None, max_per_file=None):
+        self._max_per_rule = max_per_rule
+        self._max_per_file = max_per_file
 
     def add_log(self, log):
-        curr_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self._logs.append((curr_time, log))
+        self.add_record(log.record)
+
+    def add_record(self, record):
+        """ Add a (severity, rule, filename, row, column, message) record """
+        severity = record[0]
+        self._counts[severity] += 1
+
+        if severity == Severity.INFO:
+            # Hints belong to the diagnostic logged right before them
+            if self._suppressing:
+                return
+        elif self._max_per_rule is not None or self._max_per_file is not None:
+            rule, filename = record[1], record[2]
+            num_rule = self._per_rule.get(rule, 0)
+            num_file = self._per_file.get(filename, 0)
+
+            if (self._max_per_rule is not None and num_rule >= self._max_per_rule) or \
+               (self._max_per_file is not None and num_file >= self._max_per_file):
+                fingerprint = (rule, filename, _QUOTED_RE.sub('"..."', record[5] or '').strip())
+                self._suppressed[fingerprint] = self._suppressed.get(fingerprint, 0) + 1
+                self._num_suppressed += 1
+                self._suppressing = True
+                return
+
+            self._per_rule[rule] = num_rule + 1
+            self._per_file[filename] = num_file + 1
+            self._suppressing = False
+
+        self._keep(record)
+
+    def add_suppressed_summary(self):
+        """ Add one summary line per fingerprint of suppressed diagnostics """
+        for (rule, filename, template), count in self._suppressed.items():
+            message = 'Suppressed {} more "{}" diagnostic(s) like: {} @ {}'.format(
+                count, rule, template, filename)
+            self._keep((Severity.INFO, rule, filename, 0, 0, message))
+        self._suppressed = {}
+
+    def _keep(self, record):
+        self._num_kept += 1
+        if self._report is not None:
+            self._report.write(record)
+            return
+
+        self._records.append((time.monotonic(),) + record)
+
+        if len(self._records) >= self._spill_size:
+            if self._spill is None:
+                self._spill = tempfile.TemporaryFile(prefix='turquoise-log-')
+            self._spill.seek(0, 2)
+            pickle.dump(self._records, self._spill, pickle.HIGHEST_PROTOCOL)
+            self._num_spilled += len(self._records)
+            self._records = []
+
+    def _timestamped_records(self):
+        if self._spill is not None:
+            self._spill.seek(0)
+            while True:
+                try:
+                    batch = pickle.load(self._spill)
+                except EOFError:
+                    break
+                yield from batch
+        yield from self._records
+
+    def records(self):
+        """ Iterator of (severity, rule, filename, row, column, message) records """
+        for record in self._timestamped_records():
+            yield record[1:]
+
+    def messages(self):
+        """ Iterator of formatted diagnostics """
+        for record in self.records():
+            yield format_record(record)
+
+    def _formatted_logs(self, color):
+        last_second = None
+        for record in self._timestamped_records():
+            second = int(self._wall_start + record[0] - self._monotonic_start)
+            if second != last_second:
+                last_second = second
+                curr_time = datetime.datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S")
+            yield curr_time, format_record(record[1:], color)
 
     def print_logs_to_file(self):
         orig_stdout = sys.stdout
 
         with open(self._filename, 'w') as f:
             sys.stdout = f
-            for (time, log) in self._logs:
-                print('{}: {}'.format(time, log._message))
+            for (time, log) in self._formatted_logs(False):
+                print('{}: {}'.format(time, log))
 
             self.print_status()
             sys.stdout = orig_stdout
 
     def print_logs_to_terminal(self):
-        for (time, log) in self._logs:
+        for (time, log) in self._formatted_logs(True):
             print('{}: {}\n'.format(time, log))
 
+    def close_report(self):
+        if self._report is not None:
+            self._report.close()
+
     def print_status(self):
-        num_err = 0
-        num_warn = 0
-        for (_, log) in self._logs:
-            if isinstance(log, Error):
-                num_err += 1
-            elif isinstance(log, Warning):
-                num_warn += 1
+        num_err = self._counts[Severity.ERROR]
+        num_warn = self._counts[Severity.WARNING]
+
+        status = 'LINT STATUS: {} error(s), {} warning(s) found.'.format(num_err, num_warn)
+        if self._num_suppressed:
+            status += ' {} repeated diagnostic(s) suppressed.'.format(self._num_suppressed)
 
         print('-----------------------------------------------------')
-        pp('info', 
-           'LINT STATUS: {} error(s), {} warning(s) found.'.format(num_err, num_warn))
\ No newline at end of file
+        pp('info', status)
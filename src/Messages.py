@@ -8,56 +8,103 @@
 #  Description: Implementation of Error class, Warning class, Info class
 #
 # -----------------------------------------------------------------------------
+import sys
+from enum import IntEnum
 from colored import fg, attr
 
 
-class Error:
+class Severity(IntEnum):
+    ERROR = 0
+    WARNING = 1
+    INFO = 2
+
+
+_PREFIXES = ('ERR', 'WARNING', 'INFO')
+_COLORS = ('light_red', 'light_yellow', 'light_blue')
+
+
+def format_position(_row, _column):
+    """ Format a position like pyVHDLParser does, rows start at 1 """
+    if not _row:
+        return ''
+    return '(line: {0: >3}, col: {1: >2})'.format(_row, _column)
+
+
+def format_record(_record, _color=False):
     """
-    Error constructor that contains the line number, filename, and a specific
-    error message
+    @brief Render a diagnostic record to text
+    @param _record (severity, rule, filename, row, column, message) tuple
+    @param _color Wrap the text in the severity's terminal color
+    @return Diagnostic text
     """
-    def __init__(self, line_number, filename, error_message=None):
-        self._line_number = line_number
-        self._filename = filename
-        self._message = "ERR: " + str(line_number) + " @ " + filename
-        if error_message is not None:
-            self._message += ": " + error_message
+    severity, _, filename, row, column, message = _record
+    if severity == Severity.INFO:
+        text = 'INFO: ' + message
+    else:
+        text = _PREFIXES[severity] + ': ' + format_position(row, column) + ' @ ' + filename
+        if message is not None:
+            text += ': ' + message
 
-    def __repr__(self):
-        color = fg('light_red')
-        reset = attr('reset')
-        return (color + str(self._message) + reset)
+    if _color:
+        return fg(_COLORS[severity]) + text + attr('reset')
+    return text
 
 
-class Warning:
+class _Diagnostic:
     """
-    Warning constructor that contains the line number, filename, and a specific
-    warning message
+    Diagnostic kept as a flat record. The text is only formatted when the
+    diagnostic is printed.
     """
-    def __init__(self, line_number, filename, warning_message=None):
-        self._line_number = line_number
-        self._filename = filename
-        self._message = "WARNING: " + str(line_number) + " @ " + filename
-        if warning_message is not None:
-            self._message += ": " + warning_message
+    __slots__ = ('_record',)
+    severity = None
+
+    def __init__(self, line_number, filename, message=None, rule=None):
+        if line_number:
+            row, column = line_number.Row, line_number.Column
+        else:
+            row, column = 0, 0
+        self._record = (self.severity, rule, sys.intern(filename), row, column, message)
+
+    @property
+    def record(self):
+        return self._record
+
+    @property
+    def _message(self):
+        return format_record(self._record)
 
     def __repr__(self):
-        color = fg('light_yellow')
-        reset = attr('reset')
-        return (color + str(self._message) + reset)
+        return format_record(self._record, True)
 
-class Info:
+
+class Error(_Diagnostic):
     """
-    Info constructor that contains the line number, filename, and a specific
-    Info message
+    Error constructor that contains the line number, filename, a specific
+    error message and the id of the rule that produced it
     """
-    def __init__(self, info_message):
-        self._message = "INFO: " + info_message
+    __slots__ = ()
+    severity = Severity.ERROR
+
+
+class Warning(_Diagnostic):
+    """
+    Warning constructor that contains the line number, filename, a specific
+    warning message and the id of the rule that produced it
+    """
+    __slots__ = ()
+    severity = Severity.WARNING
+
+
+class Info(_Diagnostic):
+    """
+    Info constructor that contains a specific Info message
+    """
+    __slots__ = ()
+    severity = Severity.INFO
+
+    def __init__(self, info_message, rule=None):
+        self._record = (Severity.INFO, rule, '', 0, 0, info_message)
 
-    def __repr__(self):
-        color = fg('light_blue')
-        reset = attr('reset')
-        return (color + str(self._message) + reset)
 
 def pp(_status, _message):
     """
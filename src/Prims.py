@@ -8,13 +8,10 @@
 #  Description: Implementation of DFAs that parse through primitive VHDL types
 #
 # -----------------------------------------------------------------------------
-from pyVHDLParser.Token import StartOfDocumentToken, EndOfDocumentToken, \
-                               SpaceToken, LinebreakToken, CommentToken, \
-                               IndentationToken
 from pyVHDLParser.Base import ParserException
 from enum import Enum
-from .State import DFA, State
-from .Messages import Error, Warning
+from .State import DFA, Grammar, State
+from .Messages import Error, Warning, Info
 
 
 class PrimEnum(Enum):
@@ -29,11 +26,28 @@ class PrimEnum(Enum):
     STRING = -9
 
 
+# Hash-consed primitive type instances, so that identical types are the same
+# object and can be compared by identity. Instances are interned in __new__,
+# which also covers unpickling (see __getnewargs__).
+_interned = {}
+
+
+def _intern(cls, *fields):
+    key = (cls,) + fields
+    prim = _interned.get(key)
+    if prim is None:
+        prim = _interned[key] = tuple.__new__(cls, fields)
+    return prim
+
+
 class STD_LOGIC(tuple):
     """ Represent a STD_LOGIC type """
     __slots__ = []
     def __new__(cls):
-        return tuple.__new__(cls, (PrimEnum.STD_LOGIC, 0))
+        return _intern(cls, PrimEnum.STD_LOGIC, 0)
+
+    def __getnewargs__(self):
+        return ()
 
     def __str__(self):
         return 'STD_LOGIC'
@@ -43,7 +57,10 @@ class BIT(tuple):
     """ Represent a BIT type """
     __slots__ = []
     def __new__(cls):
-        return tuple.__new__(cls, (PrimEnum.BIT, 0))
+        return _intern(cls, PrimEnum.BIT, 0)
+
+    def __getnewargs__(self):
+        return ()
 
     def __str__(self):
         return 'BIT'
@@ -53,7 +70,10 @@ class STD_LOGIC_VECTOR(tuple):
     """ Represent a STD_LOGIC_VECTOR type """
     __slots__ = []
     def __new__(cls, start, end):
-        return tuple.__new__(cls, (PrimEnum.STD_LOGIC_VECTOR, start, end))
+        return _intern(cls, PrimEnum.STD_LOGIC_VECTOR, start, end)
+
+    def __getnewargs__(self):
+        return (tuple.__getitem__(self, 1), tuple.__getitem__(self, 2))
 
     def __str__(self):
         return 'STD_LOGIC_VECTOR({} to {})'.format(
@@ -66,7 +86,10 @@ class SIGNED(tuple):
     """ Represent a SIGNED type """
     __slots__ = []
     def __new__(cls, start, end):
-        return tuple.__new__(cls, (PrimEnum.SIGNED, start, end))
+        return _intern(cls, PrimEnum.SIGNED, start, end)
+
+    def __getnewargs__(self):
+        return (tuple.__getitem__(self, 1), tuple.__getitem__(self, 2))
 
     def __str__(self):
         return 'SIGNED({} to {})'.format(
@@ -79,7 +102,10 @@ class UNSIGNED(tuple):
     """ Represent a UNSIGNED type """
     __slots__ = []
     def __new__(cls, start, end):
-        return tuple.__new__(cls, (PrimEnum.UNSIGNED, start, end))
+        return _intern(cls, PrimEnum.UNSIGNED, start, end)
+
+    def __getnewargs__(self):
+        return (tuple.__getitem__(self, 1), tuple.__getitem__(self, 2))
 
     def __str__(self):
         return 'UNSIGNED({} to {})'.format(
@@ -92,7 +118,10 @@ class INTEGER(tuple):
     """ Represent a INTEGER type """
     __slots__ = []
     def __new__(cls):
-        return tuple.__new__(cls, (PrimEnum.INTEGER, 0))
+        return _intern(cls, PrimEnum.INTEGER, 0)
+
+    def __getnewargs__(self):
+        return ()
 
     def __str__(self):
         return 'INTEGER'
@@ -102,7 +131,10 @@ class BOOLEAN(tuple):
     """ Represent a BOOLEAN type """
     __slots__ = []
     def __new__(cls):
-        return tuple.__new__(cls, (PrimEnum.BOOLEAN, 0))
+        return _intern(cls, PrimEnum.BOOLEAN, 0)
+
+    def __getnewargs__(self):
+        return ()
 
     def __str__(self):
         return 'BOOLEAN'
@@ -112,7 +144,10 @@ class TIME(tuple):
     """ Represent a TIME type """
     __slots__ = []
     def __new__(cls):
-        return tuple.__new__(cls, (PrimEnum.TIME, 0))
+        return _intern(cls, PrimEnum.TIME, 0)
+
+    def __getnewargs__(self):
+        return ()
 
     def __str__(self):
         return 'TIME'
@@ -122,7 +157,10 @@ class STRING(tuple):
     """ Represent a STRING type """
     __slots__ = []
     def __new__(cls):
-        return tuple.__new__(cls, (PrimEnum.STRING, 0))
+        return _intern(cls, PrimEnum.STRING, 0)
+
+    def __getnewargs__(self):
+        return ()
 
     def __str__(self):
         return 'STRING'
@@ -137,65 +175,84 @@ class ToDownToStateEnum(Enum):
     SUCCESS = State(6)
 
 
-def parse_to_downto(_token_iter, _logger, _filename):
-    parsed = None
-    first = ''
-    second = ''
-    to_or_downto = ''
-
-    # DFA callbacks
-    def _set_first(name):
-        nonlocal first
-        first = name.Value.lower()
-
-    def _set_second(name):
-        nonlocal second
-        second = name.Value.lower()
-
-    def _set_to_or_downto(name):
-        nonlocal to_or_downto
-        to_or_downto = name.Value.lower()
-
-    def _set_parsed(name):
-        nonlocal parsed, first, second, to_or_downto
-
-        if to_or_downto == 'to':
-            parsed = (first, second)
-            if int(first) >= int(second):
-                warn = Warning(name.Start, _filename,
-                               'Expecting first value to be smaller than ' +
-                               'second value in "to" declaration')
-                _logger.add_log(warn)
-
-        elif to_or_downto == 'downto':
-            parsed = (second, first)
-            if int(first) <= int(second):
-                warn = Warning(name.Start, _filename,
-                               'Expecting first value to be smaller than ' +
-                               'second value in "downto" declaration')
-                _logger.add_log(warn)
-        else:
-            err = Error(name.Start, _filename,
-                        'Expecting "to" or "downto" declaration')
-            _logger.add_log(err)
+class _ToDownToParse:
+    """ Per-call state of parse_to_downto """
+    def __init__(self, _logger, _filename):
+        self.logger = _logger
+        self.filename = _filename
+        self.parsed = None
+        self.first = ''
+        self.second = ''
+        self.to_or_downto = ''
 
-    # =========================================================================
-    # Build parse_to_downto DFA
-    # =========================================================================
-    dfa = DFA('parse_to_downto', ToDownToStateEnum.START,
-              [ToDownToStateEnum.SUCCESS])
 
-    dfa.add_transition(ToDownToStateEnum.START,
-                       ToDownToStateEnum.OPEN_BRACK, '(')
-    dfa.add_transition(ToDownToStateEnum.OPEN_BRACK,
-                       ToDownToStateEnum.FIRST, '_*_', _set_first)
-    dfa.add_transition(ToDownToStateEnum.FIRST,
-                       ToDownToStateEnum.TO, '_*_', _set_to_or_downto)
-    dfa.add_transition(ToDownToStateEnum.TO,
-                       ToDownToStateEnum.SECOND, '_*_', _set_second)
+# DFA callbacks
+def _set_first(ctx, name):
+    ctx.first = name.value
+
+
+def _set_second(ctx, name):
+    ctx.second = name.value
+
 
-    dfa.add_transition(ToDownToStateEnum.SECOND,
-                       ToDownToStateEnum.SUCCESS, ')', _set_parsed)
+def _set_to_or_downto(ctx, name):
+    ctx.to_or_downto = name.value
+
+
+def _set_parsed(ctx, name):
+    first, second = int(ctx.first), int(ctx.second)
+
+    if ctx.to_or_downto == 'to':
+        ctx.parsed = (first, second)
+        if first >= second:
+            warn = Warning(name.Start, ctx.filename,
+                           'Expecting first value to be smaller than ' +
+                           'second value in "to" declaration', rule='range-direction')
+            ctx.logger.add_log(warn)
+
+    elif ctx.to_or_downto == 'downto':
+        ctx.parsed = (second, first)
+        if first <= second:
+            warn = Warning(name.Start, ctx.filename,
+                           'Expecting first value to be smaller than ' +
+                           'second value in "downto" declaration', rule='range-direction')
+            ctx.logger.add_log(warn)
+    else:
+        err = Error(name.Start, ctx.filename,
+                    'Expecting "to" or "downto" declaration', rule='syntax')
+        ctx.logger.add_log(err)
+
+
+# =============================================================================
+# Build parse_to_downto grammar
+# =============================================================================
+TO_DOWNTO_GRAMMAR = Grammar('parse_to_downto', ToDownToStateEnum.START,
+                            [ToDownToStateEnum.SUCCESS])
+
+TO_DOWNTO_GRAMMAR.add_transition(ToDownToStateEnum.START,
+                                 ToDownToStateEnum.OPEN_BRACK, '(')
+TO_DOWNTO_GRAMMAR.add_transition(ToDownToStateEnum.OPEN_BRACK,
+                                 ToDownToStateEnum.FIRST, '_*_', _set_first)
+TO_DOWNTO_GRAMMAR.add_transition(ToDownToStateEnum.FIRST,
+                                 ToDownToStateEnum.TO, '_*_', _set_to_or_downto)
+TO_DOWNTO_GRAMMAR.add_transition(ToDownToStateEnum.TO,
+                                 ToDownToStateEnum.SECOND, '_*_', _set_second)
+
+TO_DOWNTO_GRAMMAR.add_transition(ToDownToStateEnum.SECOND,
+                                 ToDownToStateEnum.SUCCESS, ')', _set_parsed)
+TO_DOWNTO_GRAMMAR.compile()
+
+
+def parse_to_downto(_token_iter, _logger, _filename):
+    """
+    @brief Helper function. Parse "(first to|downto second)" range syntax
+    @param _token_iter Token Iteration
+    @param _logger Logger instance
+    @param _filename Current file name that is being linted
+    @return (low, high) integer bounds, or (None, None) on invalid syntax
+    """
+    ctx = _ToDownToParse(_logger, _filename)
+    dfa = DFA(TO_DOWNTO_GRAMMAR, ctx)
 
     # =========================================================================
     # Token stream iteration
@@ -203,25 +260,93 @@ def parse_to_downto(_token_iter, _logger, _filename):
     while not dfa.is_finished:
         try:
             token = next(_token_iter)
-            if isinstance(token, (StartOfDocumentToken, EndOfDocumentToken,
-                                  LinebreakToken, SpaceToken,
-                                  IndentationToken, CommentToken)):
-                pass
-
-            else:
-                dfa.step(token)
+            dfa.step(token)
 
         except ParserException as ex:
-            err = Error(token.Start, _filename, str(ex))
+            err = Error(token.Start, _filename, str(ex), rule='parse-error')
             _logger.add_log(err)
             break
 
         except ValueError as ex:
-            err = Error(token.Start, _filename, str(ex))
+            err = Error(token.Start, _filename, str(ex), rule='parse-error')
             _logger.add_log(err)
             break
 
     if not dfa.is_finished_successfully:
         return (None, None)
 
-    return parsed
\ No newline at end of file
+    return ctx.parsed
+
+
+# =============================================================================
+# Primitive type registry
+# =============================================================================
+def _scalar_parser(_prim):
+    def parse(_name, _token_iter, _logger, _filename):
+        return _prim()
+    return parse
+
+
+def _vector_parser(_prim):
+    def parse(_name, _token_iter, _logger, _filename):
+        first, second = parse_to_downto(_token_iter, _logger, _filename)
+
+        # Invalid range parsing
+        if first is None and second is None:
+            err = Error(_name.Start, _filename, 'Invalid syntax for ' + _prim.__name__,
+                        rule='syntax')
+            _logger.add_log(err)
+
+            info = Info('hint - {0}(3 downto 0) or {0}(0 to 3)'.format(_prim.__name__))
+            _logger.add_log(info)
+            return None
+
+        return _prim(first, second)
+    return parse
+
+
+# Maps lowered type name to a parser(name token, token iter, logger, filename)
+# returning an interned type instance, or None after logging invalid syntax
+TYPE_PARSERS = {}
+
+
+def register_type(_type_name, _parser):
+    """
+    @brief Register a parser for a type name
+    @param _type_name Lowered VHDL type name
+    @param _parser Callable(name token, token iter, logger, filename)
+    @return None
+    """
+    TYPE_PARSERS[_type_name] = _parser
+
+
+register_type('std_logic', _scalar_parser(STD_LOGIC))
+register_type('bit', _scalar_parser(BIT))
+register_type('integer', _scalar_parser(INTEGER))
+register_type('boolean', _scalar_parser(BOOLEAN))
+register_type('time', _scalar_parser(TIME))
+register_type('string', _scalar_parser(STRING))
+register_type('std_logic_vector', _vector_parser(STD_LOGIC_VECTOR))
+register_type('signed', _vector_parser(SIGNED))
+register_type('unsigned', _vector_parser(UNSIGNED))
+
+
+def parse_type(_name, _token_iter, _logger, _filename, _context):
+    """
+    @brief Helper function. Parse the type whose name token was just read
+    @param _name Type name token
+    @param _token_iter Token Iteration, positioned after the type name
+    @param _logger Logger instance
+    @param _filename Current file name that is being linted
+    @param _context Declaration kind used in the unsupported type warning
+    @return Interned type instance, or None
+    """
+    parser = TYPE_PARSERS.get(_name.value)
+    if parser is None:
+        warn = Warning(_name.Start, _filename,
+                       'Type "' + _name.value + '" is not supported in ' + _context + ' linting',
+                       rule='unsupported-type')
+        _logger.add_log(warn)
+        return None
+
+    return parser(_name, _token_iter, _logger, _filename)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: Report.py
+#
+#  Description: Implementation of machine readable diagnostic reports. Each
+#  diagnostic is written as soon as it is logged.
+#
+# -----------------------------------------------------------------------------
+import os
+import json
+
+from . import __version__
+from .Messages import Severity
+
+REPORT_FORMATS = ('jsonl', 'sarif')
+
+_BUFFER_SIZE = 64 * 1024
+_SEVERITY_NAMES = ('error', 'warning', 'info')
+_SARIF_LEVELS = ('error', 'warning', 'note')
+
+
+class JsonLinesReport:
+    """ One JSON object per diagnostic and per line """
+    def __init__(self, path):
+        self._file = open(path, 'w', buffering=_BUFFER_SIZE, encoding='utf-8')
+
+    def write(self, record):
+        severity, rule, filename, row, column, message = record
+        self._file.write(json.dumps({
+            'severity': _SEVERITY_NAMES[severity],
+            'rule': rule,
+            'file': filename or None,
+            'line': row or None,
+            'column': column or None,
+            'message': message,
+        }))
+        self._file.write('\n')
+
+    def close(self):
+        self._file.close()
+
+
+class SarifReport:
+    """
+    SARIF 2.1.0 log with a single run. Results are streamed into the results
+    array, and the document is closed by close().
+    """
+    def __init__(self, path):
+        self._file = open(path, 'w', buffering=_BUFFER_SIZE, encoding='utf-8')
+        self._first = True
+
+        header = json.dumps({
+            '$schema': 'https://json.schemastore.org/sarif-2.1.0.json',
+            'version': '2.1.0',
+            'runs': [{
+                'tool': {
+                    'driver': {
+                        'name': 'turquoise',
+                        'version': __version__,
+                        'informationUri': 'https://github.com/ttrung149/turquoise'
+                    }
+                },
+                'results': []
+            }]
+        })
+        # Leave the results array open
+        self._file.write(header[:header.rindex('[]') + 1])
+
+    def write(self, record):
+        severity, rule, filename, row, column, message = record
+        result = {
+            'level': _SARIF_LEVELS[severity],
+            'message': {'text': message or ''}
+        }
+        if rule is not None:
+            result['ruleId'] = rule
+
+        if severity != Severity.INFO:
+            location = {'artifactLocation': {'uri': filename.replace(os.sep, '/')}}
+            if row:
+                location['region'] = {'startLine': row, 'startColumn': column}
+            result['locations'] = [{'physicalLocation': location}]
+
+        if not self._first:
+            self._file.write(',')
+        self._first = False
+        self._file.write(json.dumps(result))
+
+    def close(self):
+        self._file.write(']}]}\n')
+        self._file.close()
+
+
+def open_report(_format, _path):
+    """
+    @brief Open a streaming diagnostic report
+    @param _format One of REPORT_FORMATS
+    @param _path Output file
+    @return Report with write(record) and close()
+    """
+    if _format == 'sarif':
+        return SarifReport(_path)
+    return JsonLinesReport(_path)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: Runner.py
+#
+#  Description: Implementation of the toolchain stage runner. Every tool
+#  process is run from an argv list, its output is streamed to a per-stage
+#  log file, and its wall time and resource usage are recorded.
+#
+# -----------------------------------------------------------------------------
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import threading
+import subprocess
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from .Messages import pp
+
+DEFAULT_LOG_DIR = os.path.join('.turquoise', 'logs')
+
+_UNSAFE_CHARS_RE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+class StageResult:
+    """ Exit code, timings (seconds) and max RSS (KiB) of one stage process """
+    def __init__(self, stage, argv, log, returncode, wall, user=0.0, system=0.0, maxrss=0):
+        self.stage = stage
+        self.argv = argv
+        self.log = log
+        self.returncode = returncode
+        self.wall = wall
+        self.user = user
+        self.sys = system
+        self.maxrss = maxrss
+        self.timed_out = False
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+    @property
+    def output(self):
+        """ Output of the process, read back from its log """
+        try:
+            with open(self.log, errors='replace') as f:
+                return f.read()
+        except OSError:
+            return ''
+
+
+def _maxrss_kib(rusage):
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    if sys.platform == 'darwin':
+        return rusage.ru_maxrss // 1024
+    return rusage.ru_maxrss
+
+
+def _exit_code(status):
+    # Exit code of a wait status, negative for a signal as with subprocess
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+class StageRunner:
+    """
+    Run toolchain processes without a shell. Each stage writes its output
+    to <log_dir>/<stage>.log, which is only printed by report_failure().
+    Stage names with characters unsafe in file names get a short hash of the
+    name appended, so that no two stages share a log.
+    With a trace path, every finished stage is added to a Chrome trace
+    event file (chrome://tracing, Perfetto).
+    """
+    def __init__(self, log_dir=DEFAULT_LOG_DIR, trace_path=None):
+        self._log_dir = log_dir
+        self._trace_path = trace_path
+        self._trace = None
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+
+    def log_path(self, _stage):
+        """ Log file of a stage, unique to the stage name """
+        name = _UNSAFE_CHARS_RE.sub('_', _stage)
+        if name != _stage:
+            # Names such as "ghdl -a a/b.vhd" and "ghdl -a a_b.vhd" sanitize alike
+            name += '-' + hashlib.sha1(_stage.encode()).hexdigest()[:8]
+        return os.path.join(self._log_dir, name + '.log')
+
+    def run(self, _stage, _argv, _env=None, _timeout=None):
+        """
+        @brief Run one stage process to completion
+        @param _stage Stage name, used for the log file and the trace
+        @param _argv Command as a list of arguments
+        @param _env Optional environment of the process
+        @param _timeout Optional time limit in seconds, after which the
+        process is killed and the result marked as timed out
+        @return StageResult
+        """
+        log = self.log_path(_stage)
+        os.makedirs(self._log_dir, exist_ok=True)
+
+        with open(log, 'wb') as f:
+            start = time.monotonic()
+            try:
+                proc = subprocess.Popen(_argv, stdout=f, stderr=subprocess.STDOUT, env=_env)
+            except OSError as ex:
+                f.write((str(ex) + '\n').encode())
+                result = StageResult(_stage, _argv, log, 127, time.monotonic() - start)
+                self._add_event(result, start)
+                return result
+
+            killed = []
+            timer = None
+            if _timeout is not None:
+                def kill():
+                    killed.append(True)
+                    proc.kill()
+                timer = threading.Timer(_timeout, kill)
+                timer.start()
+
+            if hasattr(os, 'wait4'):
+                # Resource usage of this very process, even with concurrent stages
+                _, status, rusage = os.wait4(proc.pid, 0)
+                proc.returncode = _exit_code(status)
+                wall = time.monotonic() - start
+                result = StageResult(_stage, _argv, log, proc.returncode, wall,
+                                     rusage.ru_utime, rusage.ru_stime, _maxrss_kib(rusage))
+            else:
+                before = resource.getrusage(resource.RUSAGE_CHILDREN) if resource else None
+                proc.wait()
+                wall = time.monotonic() - start
+                result = StageResult(_stage, _argv, log, proc.returncode, wall)
+                if before is not None:
+                    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+                    result.user = after.ru_utime - before.ru_utime
+                    result.sys = after.ru_stime - before.ru_stime
+                    result.maxrss = _maxrss_kib(after)
+
+            if timer is not None:
+                timer.cancel()
+                result.timed_out = bool(killed)
+
+        self._add_event(result, start)
+        return result
+
+    def report_failure(self, _result):
+        """ Print the log of a failed stage """
+        pp('error', 'Stage "' + _result.stage + '" failed with exit code ' +
+           str(_result.returncode) + ' (log: ' + _result.log + ')')
+        output = _result.output.rstrip('\n')
+        if output:
+            print(output)
+
+    def _add_event(self, _result, _start):
+        if self._trace_path is None:
+            return
+
+        with self._lock:
+            tid = self._threads.setdefault(threading.get_ident(), len(self._threads) + 1)
+            event = {
+                'name': _result.stage,
+                'cat': os.path.basename(_result.argv[0]),
+                'ph': 'X',
+                'ts': int((_start - self._start) * 1e6),
+                'dur': int(_result.wall * 1e6),
+                'pid': os.getpid(),
+                'tid': tid,
+                'args': {
+                    'argv': _result.argv,
+                    'returncode': _result.returncode,
+                    'user_s': round(_result.user, 3),
+                    'sys_s': round(_result.sys, 3),
+                    'max_rss_kib': _result.maxrss,
+                    'log': _result.log,
+                },
+            }
+
+            # JSON array trace format: the closing bracket is optional, so
+            # the trace stays loadable even when a failing stage ends the run
+            if self._trace is None:
+                self._trace = open(self._trace_path, 'w')
+                self._trace.write('[\n')
+            else:
+                self._trace.write(',\n')
+            json.dump(event, self._trace)
+            self._trace.flush()
+
+    def close(self):
+        if self._trace is not None:
+            self._trace.write('\n]\n')
+            self._trace.close()
+            self._trace = None
@@ -28,61 +28,96 @@ class State:
         return hash(self.name)
 
 
-class DFA:
-    """ Implementation of Deterministic Finite Automaton """
+class Grammar:
+    """
+    Transition table of a Deterministic Finite Automaton. A grammar is built
+    and compiled once, then shared by every DFA that parses with it.
+    Callbacks are called as _cb(ctx, token) with the per-parse context.
+    """
     def __init__(self, name: str, start: State, finish: List[State]):
         self._name = name
         self._start = start
-        self._curr_state = start
-
         self._finish = finish
-        self._is_finished = False
-        self._success = False
-
         self._transitions = defaultdict(dict)
-        self._callbacks = defaultdict(dict)
+        self._compiled = False
 
     def add_transition(self, _from: State, _to: State, _input='', _cb=None):
-        self._transitions[_from][_input] = _to
-        self._callbacks[_from][_input] = _cb
+        assert not self._compiled, 'Cannot add transition to compiled grammar'
+        self._transitions[_from][_input] = (_to, _cb)
+        self._transitions[_to]
+
+    def compile(self) -> 'Grammar':
+        """ Freeze transitions into tables indexed by integer state ids """
+        states = list(self._transitions)
+        if self._start not in self._transitions:
+            states.append(self._start)
+        ids = {state: i for i, state in enumerate(states)}
+
+        transitions = []
+        wildcards = []
+        for state in states:
+            row = {}
+            wildcard = None
+            for _input, (_to, _cb) in self._transitions[state].items():
+                if _input == '_*_':
+                    wildcard = (ids[_to], _cb)
+                else:
+                    row[_input] = (ids[_to], _cb)
+            transitions.append(row)
+            wildcards.append(wildcard)
+
+        self.states = tuple(states)
+        self.start = ids[self._start]
+        self.transitions = tuple(transitions)
+        self.wildcards = tuple(wildcards)
+        self.terminal = tuple(not self._transitions[state] for state in states)
+        self.accepting = tuple(state in self._finish for state in states)
+        self._compiled = True
+        return self
+
+    def __str__(self):
+        return self._name
+
+
+class DFA:
+    """ Implementation of Deterministic Finite Automaton over a compiled Grammar """
+    def __init__(self, grammar: Grammar, ctx=None):
+        self._grammar = grammar
+        self._ctx = ctx
+        self._curr_state = grammar.start
+
+        self._is_finished = False
+        self._success = False
 
     def reset(self):
-        self._curr_state = self._start
+        self._curr_state = self._grammar.start
         self._is_finished = False
         self._success = False
 
     def step(self, _input_token) -> None:
-        _input = _input_token.Value.lower()
+        grammar = self._grammar
         _from = self._curr_state
-        if _input in self._transitions[_from]:
-            next_state = self._transitions[_from][_input]
-            self._curr_state = next_state
 
-            if self._callbacks[_from][_input] is not None:
-                self._callbacks[_from][_input](_input_token)
+        transition = grammar.transitions[_from].get(_input_token.value)
+        if transition is None:
+            transition = grammar.wildcards[_from]
 
-            if self._curr_state not in self._transitions:
-                self._is_finished = True
-                self._success = self._curr_state in self._finish
-
-        elif '_*_' in self._transitions[_from]:
-            next_state = self._transitions[_from]['_*_']
-            self._curr_state = next_state
-
-            if self._callbacks[_from]['_*_'] is not None:
-                self._callbacks[_from]['_*_'](_input_token)
+        if transition is None:
+            self._is_finished = True
+            self._success = grammar.accepting[_from]
+            return
 
-            if self._curr_state not in self._transitions:
-                self._is_finished = True
-                self._success = self._curr_state in self._finish
+        self._curr_state, _cb = transition
+        if _cb is not None:
+            _cb(self._ctx, _input_token)
 
-        else:
+        if grammar.terminal[self._curr_state]:
             self._is_finished = True
-            self._success = _from in self._finish
+            self._success = grammar.accepting[self._curr_state]
 
     @property
     def get_curr_state(self) -> State:
-        return self._curr_state
+        return self._grammar.states[self._curr_state]
 
     @property
     def is_finished(self) -> bool:
@@ -93,4 +128,4 @@ class DFA:
         return self._is_finished and self._success
 
     def __str__(self):
-        return self._name
+        return str(self._grammar)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: Testbench.py
+#
+#  Description: Implementation of the testbench regression runner: every
+#  *_tb testbench is elaborated and run by GHDL in a worker pool, and
+#  testbenches whose sources did not change since they last passed are
+#  skipped.
+#
+# -----------------------------------------------------------------------------
+import os
+import re
+import fnmatch
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .Build import GHDL, DEFAULT_WORKDIR, ghdl_version, library_lock
+from .Linter import parse_files
+from .Wave import TIME_UNITS, format_time
+
+TESTBENCH_PATTERNS = ('*_tb.vhd', '*_tb.vhdl')
+
+TEST_RESULTS_NAME = 'test-results.json'
+
+# Reports that fail a testbench, e.g. "tb.vhdl:20:5:@10ns:(assertion error): ..."
+_FAILURE_RE = re.compile(r'\((?:assertion|report) (?:error|failure)\)')
+_SIM_TIME_RE = re.compile(r'@(\d+(?:\.\d+)?)(fs|ps|ns|us|ms|sec)\b')
+
+_STATUS_LABELS = {
+    'pass': 'PASS',
+    'cached': 'PASS (unchanged)',
+    'fail': 'FAIL',
+    'timeout': 'TIMEOUT',
+    'error': 'ERROR',
+}
+
+
+def find_testbenches(_filenames):
+    """ Indices of the testbench files, named *_tb.vhd[l] """
+    return [i for i, f in enumerate(_filenames)
+            if any(fnmatch.fnmatch(os.path.basename(f).lower(), p) for p in TESTBENCH_PATTERNS)]
+
+
+def testbench_units(_filenames, _jobs=1, _cache=None, _tokenizer='pyvhdlparser'):
+    """
+    @brief Entities declared in testbench files
+    @return List of entity names of each file, or the file name stem when
+    it declares none
+    """
+    units = []
+    for f, (parsed, _) in parse_files(_filenames, _jobs, _cache, _tokenizer):
+        names = [unit.name for (_, kind, unit, _) in parsed if kind == 'entity']
+        units.append(names or [os.path.splitext(os.path.basename(f))[0]])
+    return units
+
+
+def parse_sim_output(_output):
+    """
+    @brief Find failed assertions and the last simulation time reported by
+    a GHDL run
+    @param _output Output of "ghdl -r"
+    @return (failed, time) where time is in femtoseconds, or None
+    """
+    times = _SIM_TIME_RE.findall(_output)
+    time = None
+    if times:
+        value, unit = times[-1]
+        time = int(round(float(value) * TIME_UNITS[unit]))
+    return _FAILURE_RE.search(_output) is not None, time
+
+
+class TestResult:
+    """ Outcome of one testbench """
+    def __init__(self, unit, filename, status, wall=0.0, sim_time=None, log=None):
+        self.unit = unit
+        self.filename = filename
+        self.status = status
+        self.wall = wall
+        self.sim_time = sim_time
+        self.log = log
+
+    @property
+    def ok(self):
+        return self.status in ('pass', 'cached')
+
+    def __str__(self):
+        details = []
+        if self.status != 'cached':
+            details.append('{:.2f}s'.format(self.wall))
+        if self.sim_time is not None:
+            details.append('@' + format_time(self.sim_time))
+        if not self.ok and self.log is not None:
+            details.append('log: ' + self.log)
+        line = '{:<16} {}'.format(_STATUS_LABELS[self.status], self.unit)
+        return line + (' (' + ', '.join(details) + ')' if details else '')
+
+
+def run_testbench(_runner, _unit, _filename, _options=(), _run_options=(), _timeout=None):
+    """
+    @brief Elaborate and run a testbench with GHDL
+    @param _runner StageRunner
+    @param _unit Testbench entity
+    @param _filename File declaring the testbench
+    @param _options GHDL options, e.g. --workdir and -P
+    @param _run_options Simulation options, e.g. --stop-time
+    @param _timeout Time limit of the simulation in seconds
+    @return TestResult
+    """
+    options = list(_options)
+    workdir = DEFAULT_WORKDIR
+    for option in options:
+        if option.startswith('--workdir='):
+            workdir = option[len('--workdir='):]
+    # Elaboration writes the library index, the simulations only read it
+    with library_lock(workdir, options):
+        result = _runner.run('test-elaborate-' + _unit, [GHDL, '-e'] + options + [_unit])
+    if not result.ok:
+        return TestResult(_unit, _filename, 'error', result.wall, log=result.log)
+
+    result = _runner.run('test-run-' + _unit, [GHDL, '-r'] + options + [_unit] +
+                         list(_run_options), _timeout=_timeout)
+    failed, sim_time = parse_sim_output(result.output)
+    if result.timed_out:
+        status = 'timeout'
+    elif failed or not result.ok:
+        status = 'fail'
+    else:
+        status = 'pass'
+    return TestResult(_unit, _filename, status, result.wall, sim_time, result.log)
+
+
+def run_testbenches(_tests, _runner, _options=(), _run_options=(), _timeout=None, _jobs=1,
+                    _progress=None):
+    """
+    @brief Run testbenches in a pool of _jobs workers
+    @param _tests List of (unit, filename)
+    @param _progress Optional function called with every TestResult, in
+    order of completion
+    @return List of TestResult, in the order of _tests
+    """
+    results = [None] * len(_tests)
+    with ThreadPoolExecutor(max_workers=max(1, _jobs)) as executor:
+        futures = dict((executor.submit(run_testbench, _runner, unit, filename, _options,
+                                        _run_options, _timeout), i)
+                       for i, (unit, filename) in enumerate(_tests))
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if _progress is not None:
+                _progress(results[futures[future]])
+    return results
+
+
+def result_flags(_runner, _options=(), _run_options=(), _timeout=None):
+    """
+    @brief Everything besides the sources that a passing result depends on
+    @param _runner StageRunner
+    @param _options GHDL options, e.g. --workdir and the -P library paths
+    @param _run_options Simulation options, e.g. --stop-time
+    @param _timeout Time limit of the simulation in seconds
+    @return List of flags
+    """
+    return [ghdl_version(_runner), '--test'] + list(_options) + list(_run_options) + \
+        ['--test-timeout=' + str(_timeout)]
@@ -8,23 +8,316 @@
 #  Description: Implementation of tokenizer class
 #
 # -----------------------------------------------------------------------------
+import re
+import sys
 from pyVHDLParser.Token.Parser import Tokenizer
+from pyVHDLParser.Token import StartOfDocumentToken, EndOfDocumentToken, \
+                               SpaceToken, LinebreakToken, CommentToken, \
+                               IndentationToken, WordToken, LiteralToken, \
+                               ExtendedIdentifier
 from pyVHDLParser.Blocks import TokenToBlockParser
 from pyVHDLParser.Base import ParserException
+from collections import namedtuple
+from itertools import chain
+from enum import IntEnum
+
+
+class TokenKind(IntEnum):
+    KEYWORD = 0
+    IDENTIFIER = 1
+    LITERAL = 2
+    DELIMITER = 3
+
+
+# IEEE 1076-2008 reserved words
+KEYWORDS = frozenset((
+    'abs', 'access', 'after', 'alias', 'all', 'and', 'architecture', 'array',
+    'assert', 'assume', 'assume_guarantee', 'attribute', 'begin', 'block',
+    'body', 'buffer', 'bus', 'case', 'component', 'configuration', 'constant',
+    'context', 'cover', 'default', 'disconnect', 'downto', 'else', 'elsif',
+    'end', 'entity', 'exit', 'fairness', 'file', 'for', 'force', 'function',
+    'generate', 'generic', 'group', 'guarded', 'if', 'impure', 'in',
+    'inertial', 'inout', 'is', 'label', 'library', 'linkage', 'literal',
+    'loop', 'map', 'mod', 'nand', 'new', 'next', 'nor', 'not', 'null', 'of',
+    'on', 'open', 'or', 'others', 'out', 'package', 'parameter', 'port',
+    'postponed', 'procedure', 'process', 'property', 'protected', 'pure',
+    'range', 'record', 'register', 'reject', 'release', 'rem', 'report',
+    'restrict', 'restrict_guarantee', 'return', 'rol', 'ror', 'select',
+    'sequence', 'severity', 'shared', 'signal', 'sla', 'sll', 'sra', 'srl',
+    'strong', 'subtype', 'then', 'to', 'transport', 'type', 'unaffected',
+    'units', 'until', 'use', 'variable', 'vmode', 'vprop', 'vunit', 'wait',
+    'when', 'while', 'with', 'xnor', 'xor'
+))
+
+_SKIPPED_TOKENS = (StartOfDocumentToken, EndOfDocumentToken, LinebreakToken,
+                   SpaceToken, IndentationToken, CommentToken)
+
+
+# Significant token as seen by the parsers. The value is lowered and interned
+# once, and the record (including its SourcePosition) does not hold on to the
+# pyVHDLParser token chain, so it is cheap to keep around and to send between
+# processes.
+TokenRecord = namedtuple('TokenRecord', ['value', 'kind', 'Start'])
+
+
+class SourcePosition(namedtuple('SourcePosition', ['Row', 'Column', 'Absolute'])):
+    """ Position of a significant token, formatted like pyVHDLParser positions """
+    __slots__ = ()
+
+    def __str__(self):
+        return '(line: {0: >3}, col: {1: >2})'.format(self.Row, self.Column)
+
+
+def significant_tokens(_token_iter):
+    """
+    @brief Drop whitespace, comment and document tokens from a pyVHDLParser
+    token stream, and classify and lower every remaining token once.
+    @param _token_iter pyVHDLParser token iteration
+    @return Iterator of TokenRecord
+    """
+    lowered = {}
+    for token in _token_iter:
+        # Tokens are linked back to the start of the document. Cut the link so
+        # that consumed tokens are freed instead of kept alive by the newest.
+        token._previousToken = None
+        if isinstance(token, _SKIPPED_TOKENS):
+            continue
+
+        raw = token.Value
+        value = lowered.get(raw)
+        if value is None:
+            value = lowered[raw] = sys.intern(raw.lower())
+
+        if isinstance(token, WordToken):
+            kind = TokenKind.KEYWORD if value in KEYWORDS else TokenKind.IDENTIFIER
+        elif isinstance(token, ExtendedIdentifier):
+            kind = TokenKind.IDENTIFIER
+        elif isinstance(token, LiteralToken):
+            kind = TokenKind.LITERAL
+        else:
+            kind = TokenKind.DELIMITER
+
+        start = token.Start
+        yield TokenRecord(value, kind, SourcePosition(start.Row, start.Column, start.Absolute))
+
+
+class TokenizeError(ParserException):
+    """ Raised by the fast tokenizer on malformed input """
+    def __init__(self, message, position):
+        super().__init__(message)
+        self.Position = position
+
+
+# Lexical subset of VHDL needed by the linter. Alternatives are tried in order,
+# so multi-character delimiters come before single characters.
+_FAST_TOKEN_RE = re.compile(r'''
+    (?P<newline>\n)
+  | (?P<space>[ \t\r\f\v]+)
+  | (?P<comment>--[^\n]*\n?)
+  | (?P<block_comment>/\*.*?\*/)
+  | (?P<word>[A-Za-z][A-Za-z0-9_]*)
+  | (?P<extended>\\[^\\]*\\)
+  | (?P<number>[0-9][0-9_]*(?:\.[0-9_]*)?)
+  | (?P<string>"[^"]*")
+  | (?P<char>'.')
+  | (?P<fused>\?/=|=>|\*\*|:=|/=|<=|>=|<>|<<|>>|\?\?|\?=|\?<|\?>)
+  | (?P<other>.)
+''', re.VERBOSE | re.DOTALL)
+
+
+_STALE_START_CHARS = frozenset('-=<:/*>?')
+
+
+# Longest fixed-length lexeme ("?/=" or a character literal). A lexeme
+# starting closer than this to the end of the buffer may still change once
+# the next chunk is read.
+_LOOKAHEAD = 3
+
+
+def fast_significant_tokens(_chunks):
+    """
+    @brief Single-pass regular expression tokenizer producing the same
+    significant token stream as significant_tokens() over pyVHDLParser
+    @param _chunks VHDL source as an iterable of strings. Only the current
+    chunk and a lexeme spanning into the next one are held in memory.
+    @return Iterator of TokenRecord
+    """
+    lowered = {}
+    row = 1
+    line_start = 0
+    prev_kind = None
+    prev_value = None
+    stale_start = None
+    match = _FAST_TOKEN_RE.match
+
+    chunks = iter(_chunks)
+    buf = ''
+    base = 0
+    pos = 0
+    end = 0
+    eof = False
+
+    while True:
+        if pos >= end:
+            if eof:
+                break
+            m = None
+        else:
+            m = match(buf, pos)
+            group = m.lastgroup
+            text = m.group(group)
+
+        # Lexemes touching the end of the buffer, and comments, strings and
+        # extended identifiers left open by it, may continue in the next
+        # chunk. Carry them over and scan again.
+        if not eof and (m is None or m.end() >= end or end - pos < _LOOKAHEAD or
+                        (group == 'other' and (text in '"\\' or
+                                               (text == '/' and buf.startswith('/*', pos))))):
+            chunk = next(chunks, None)
+            if chunk is None:
+                eof = True
+            else:
+                buf = buf[pos:] + chunk
+                base += pos
+                pos = 0
+                end = len(buf)
+            continue
+
+        start = pos
+        pos = m.end()
+        absolute = base + start
+
+        # pyVHDLParser does not move its token start past a single "-" or an
+        # unfused "=<:/*>?", so the lexeme right after one of them is reported
+        # at that character's position. Mirror it to keep diagnostics identical.
+        if stale_start is not None:
+            position = stale_start
+        else:
+            position = SourcePosition(row, absolute - line_start + 1, absolute + 1)
+        stale_start = position if group == 'other' and text in _STALE_START_CHARS else None
+
+        if group == 'newline':
+            row += 1
+            line_start = base + pos
+            continue
+        if group == 'space':
+            continue
+        if group == 'comment':
+            if text.endswith('\n'):
+                row += 1
+                line_start = base + pos
+            continue
+        if group == 'block_comment':
+            newlines = text.count('\n')
+            if newlines:
+                row += newlines
+                line_start = absolute + text.rfind('\n') + 1
+            continue
+
+        if group == 'char':
+            # A tick right after a name or a closing bracket is an attribute
+            # or qualified expression, not a character literal. Keywords such
+            # as "else" are followed by literals.
+            if prev_kind == TokenKind.IDENTIFIER or prev_value == ')':
+                text = "'"
+                pos = start + 1
+                group = 'other'
+            else:
+                text = text[1]
+        elif group == 'string':
+            text = text[1:-1]
+        elif group == 'other' and text == '/' and buf.startswith('/*', start):
+            raise TokenizeError('End of document before end of multi line comment.', position)
+        elif group == 'other' and text == '"':
+            raise TokenizeError('End of document before end of string literal.', position)
+
+        value = lowered.get(text)
+        if value is None:
+            value = lowered[text] = sys.intern(text.lower())
+
+        if group == 'word':
+            kind = TokenKind.KEYWORD if value in KEYWORDS else TokenKind.IDENTIFIER
+        elif group == 'extended':
+            kind = TokenKind.IDENTIFIER
+        elif group in ('number', 'string', 'char'):
+            kind = TokenKind.LITERAL
+        else:
+            kind = TokenKind.DELIMITER
+
+        yield TokenRecord(value, kind, position)
+        prev_kind = kind
+        prev_value = value
+
+        # Strings and extended identifiers may span lines
+        if group in ('string', 'extended'):
+            newlines = text.count('\n')
+            if newlines:
+                row += newlines
+                line_start = absolute + m.group(group).rfind('\n') + 1
+
+
+TOKENIZERS = ('pyvhdlparser', 'fast')
+
+
+class TokenCursor:
+    """
+    Iterator over significant tokens shared by all parsers. Consumed tokens
+    can be put back without wrapping the underlying iterator.
+    """
+    def __init__(self, _token_iter):
+        self._token_iter = iter(_token_iter)
+        self._pushed = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._pushed:
+            return self._pushed.pop()
+        return next(self._token_iter)
+
+    def push_back(self, token):
+        """ Put a token back, so that it is returned by the next next() """
+        self._pushed.append(token)
+
+
+# Files are read in chunks of this many characters, so tokenizing a file
+# does not need the whole file in memory
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class Tokenize():
 
-    def __init__(self, filename=None):
+    def __init__(self, filename=None, backend='pyvhdlparser', chunk_size=STREAM_CHUNK_SIZE):
         self._filename = filename
+        self._backend = backend
+        self._chunk_size = chunk_size
 
-    def get_token_stream(self):
+    def get_content(self):
         with open (self._filename, 'r') as handle:
             content = handle.read()
+        return content
+
+    def get_chunks(self):
+        with open (self._filename, 'r') as handle:
+            while True:
+                chunk = handle.read(self._chunk_size)
+                if not chunk:
+                    break
+                yield chunk
 
-        stream = Tokenizer.GetVHDLTokenizer(content)
+    def get_token_stream(self):
+        chars = chain.from_iterable(self.get_chunks())
+
+        stream = Tokenizer.GetVHDLTokenizer(chars)
         return stream
 
     def get_token_iter(self):
         stream = self.get_token_stream()
         token_iter = iter(stream)
-        return token_iter
\ No newline at end of file
+        return token_iter
+
+    def get_significant_token_iter(self):
+        if self._backend == 'fast':
+            return fast_significant_tokens(self.get_chunks())
+        return significant_tokens(self.get_token_iter())
@@ -10,13 +10,17 @@
 # -----------------------------------------------------------------------------
 from .Messages import Error, Info
 
-def tc_entity_component(_entity_dict, _component_list, _filename, _logger):
+
+def tc_entity_component(_entity_dict, _component_list, _filename, _logger,
+                        _matching_pairs=None):
     """
     @brief Helper function. Typecheck component against entity declaration
     @param _entity_dict
     @param _component_list
     @param _filename
     @param _logger Logger instance
+    @param _matching_pairs Optional set of (component signature, entity
+    signature) pairs known to match, updated with the pairs found to match
     @return None
     """
     for component in _component_list:
@@ -24,57 +28,88 @@ def tc_entity_component(_entity_dict, _component_list, _filename, _logger):
 
         if component_name not in _entity_dict:
             err = Error('', _filename, 'Component "' + component_name +
-                        '" has not been declared.')
+                        '" has not been declared.', rule='undeclared-component')
             _logger.add_log(err)
 
         else:
-            entity_file_name = _entity_dict[component_name][0]
-            entity = _entity_dict[component_name][1]
-            entity_name = entity.name
-            entity_generics = entity.generics
-            entity_ports = entity.ports
+            entity_file_name, entity = _entity_dict[component_name]
+
+            # Same signature, nothing to compare
+            if component.signature == entity.signature:
+                continue
+
+            # Signatures differing only in signal order still match
+            pair = (component.signature, entity.signature)
+            if _matching_pairs is not None and pair in _matching_pairs:
+                continue
+
+            logs = _diff_entity_component(entity, entity_file_name, component, _filename)
+            if not logs and _matching_pairs is not None:
+                _matching_pairs.add(pair)
+            for log in logs:
+                _logger.add_log(log)
+
+
+def _diff_entity_component(_entity, _entity_file_name, _component, _filename):
+    """
+    @brief Helper function. Compare component against entity signal by signal
+    @param _entity Declared entity
+    @param _entity_file_name File the entity is declared in
+    @param _component Component declaration
+    @param _filename File the component is declared in
+    @return List of diagnostics, empty when they match
+    """
+    logs = []
+    component_name = _component.name
+    entity_name = _entity.name
+    entity_file_name = _entity_file_name
+    entity_generics = _entity.generics
+    entity_ports = _entity.ports
+
+    comp_generics = _component.generics
+    comp_ports = _component.ports
 
-            comp_generics = component.generics
-            comp_ports = component.ports
+    if len(comp_generics) != len(entity_generics) or \
+       len(comp_ports) != len(entity_ports) :
+        err = Error('', _filename, 'Component "' + component_name +
+                    '" does not match declared entity "' + entity_name + '" @ "' +
+                    entity_file_name + '"', rule='component-mismatch')
+        logs.append(err)
 
-            if len(comp_generics) != len(entity_generics) or \
-               len(comp_ports) != len(entity_ports) :
-                err = Error('', _filename, 'Component "' + component_name +
-                            '" does not match declared entity "' + entity_name + '" @ "' +
-                            entity_file_name + '"')
-                _logger.add_log(err)
+        info = Info('hint - check each signal in the component and its matching entity')
+        logs.append(info)
 
-                info = Info('hint - check each signal in the component and its matching entity')
-                _logger.add_log(info)
+    # Compare generic signals against entity declaration
+    for sig in comp_generics:
+        if sig not in entity_generics:
+            err = Error(comp_generics[sig].line, _filename, '\nGeneric signal "' + sig +
+                        '" in component "' + component_name + '"' +
+                        '" is not declared in entity "' + entity_name + '" @ "' +
+                        entity_file_name + '"', rule='component-mismatch')
+            logs.append(err)
+        
+        elif comp_generics[sig] != entity_generics[sig]:
+            err = Error(comp_generics[sig].line, _filename, '\nGeneric signal "' + sig +
+                        '" in component "' + entity_name + '" has type ' + 
+                        str(comp_generics[sig]) + ', but is declared to have type ' +
+                        str(entity_generics[sig]) + '" in "' + entity_file_name + '"',
+                        rule='component-mismatch')
+            logs.append(err)
 
-            # Compare generic signals against entity declaration
-            for sig in comp_generics:
-                if sig not in entity_generics:
-                    err = Error(comp_generics[sig].line, _filename, '\nGeneric signal "' + sig +
-                                '" in component "' + component_name + '"' +
-                                '" is not declared in entity "' + entity_name + '" @ "' +
-                                entity_file_name + '"')
-                    _logger.add_log(err)
-                
-                elif comp_generics[sig] != entity_generics[sig]:
-                    err = Error(comp_generics[sig].line, _filename, '\nGeneric signal "' + sig +
-                                '" in component "' + entity_name + '" has type ' + 
-                                str(comp_generics[sig]) + ', but is declared to have type ' +
-                                str(entity_generics[sig]) + '" in "' + entity_file_name + '"')
-                    _logger.add_log(err)
+    # Compare ports signals against entity declaration
+    for sig in comp_ports:
+        if sig not in entity_ports:
+            err = Error(comp_ports[sig].line, _filename, '\nPort signal "' + sig +
+                        '" in component "' + component_name + '"' +
+                        '" is not declared in entity "' + entity_name + '" @ "' +
+                        entity_file_name + '"', rule='component-mismatch')
+            logs.append(err)
+        
+        elif comp_ports[sig] != entity_ports[sig]:
+            err = Error(comp_ports[sig].line, _filename, '\nPort signal "' + sig +
+                        '" in component "' + entity_name + '" has type ' + str(comp_ports[sig]) +
+                        ', but is declared to have type ' + str(entity_ports[sig])
+                        + ' in "' + entity_file_name + '"', rule='component-mismatch')
+            logs.append(err)
 
-            # Compare ports signals against entity declaration
-            for sig in comp_ports:
-                if sig not in entity_ports:
-                    err = Error(comp_ports[sig].line, _filename, '\nPort signal "' + sig +
-                                '" in component "' + component_name + '"' +
-                                '" is not declared in entity "' + entity_name + '" @ "' +
-                                entity_file_name + '"')
-                    _logger.add_log(err)
-                
-                elif comp_ports[sig] != entity_ports[sig]:
-                    err = Error(comp_ports[sig].line, _filename, '\nPort signal "' + sig +
-                                '" in component "' + entity_name + '" has type ' + str(comp_ports[sig]) +
-                                ', but is declared to have type ' + str(entity_ports[sig])
-                                + ' in "' + entity_file_name + '"')
-                    _logger.add_log(err)
\ No newline at end of file
+    return logs
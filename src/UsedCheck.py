@@ -11,22 +11,17 @@
 # -----------------------------------------------------------------------------
 from .Messages import Error, Warning
 
-def check_signal_declared_not_used(_declared, _body, _filename, _logger):
-    used_sigs = set()
-
-    for token in _body:
-        if token.Value.lower() in _declared:
-            used_sigs.add(token.Value.lower())
-
+def check_signal_declared_not_used(_declared, _referenced, _filename, _logger):
     for sig in _declared:
-        if sig not in used_sigs:
-            warn = Warning('', _filename, 'Signal "' + sig + '" is declared but never used')
+        if sig not in _referenced:
+            warn = Warning('', _filename, 'Signal "' + sig + '" is declared but never used',
+                           rule='unused-signal')
             _logger.add_log(warn)
 
 
 def check_signal_assigned_not_declared(_declared, _assigned, _filename, _logger):
-    for sig in _assigned:
-        if sig.Value.lower() not in _declared:
-            err = Error(sig.Start, _filename, 'Signal "' + sig.Value.lower() + 
-                        '" is assigned but not declared' )
-            _logger.add_log(err)
\ No newline at end of file
+    for (sig, position) in _assigned:
+        if sig not in _declared:
+            err = Error(position, _filename, 'Signal "' + sig +
+                        '" is assigned but not declared' , rule='undeclared-signal')
+            _logger.add_log(err)
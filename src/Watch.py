@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: Watch.py
+#
+#  Description: Implementation of file watcher used by the linter watch mode.
+#  Uses inotify on Linux and falls back to polling elsewhere.
+#
+# -----------------------------------------------------------------------------
+import os
+import sys
+import time
+import struct
+import select
+import ctypes
+import ctypes.util
+from fnmatch import fnmatch
+
+VHDL_PATTERNS = ('*.vhd', '*.vhdl')
+
+# inotify(7) constants
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0x00000800
+_IN_CLOEXEC = 0x00080000
+_EVENT_HEADER = struct.Struct('iIII')
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | \
+              _IN_CREATE | _IN_DELETE
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class FileWatcher:
+    """
+    Watch a VHDL file or directory tree and yield sets of changed files.
+    Bursts of events (e.g. editors saving through a temp file) are debounced
+    into a single change set.
+    """
+    def __init__(self, path, debounce=0.2, poll_interval=0.5):
+        self._path = path
+        self._debounce = debounce
+        self._poll_interval = poll_interval
+
+        if os.path.isfile(path):
+            self._root = os.path.dirname(path) or '.'
+            self._only = path
+        else:
+            self._root = path
+            self._only = None
+
+    def _is_watched(self, filename):
+        if self._only is not None:
+            return os.path.normpath(filename) == os.path.normpath(self._only)
+        return any(fnmatch(os.path.basename(filename), pattern) for pattern in VHDL_PATTERNS)
+
+    def changes(self):
+        """ Generator of sets of changed files """
+        libc = _load_libc()
+        if libc is not None:
+            fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+            if fd >= 0:
+                try:
+                    yield from self._inotify_changes(libc, fd)
+                finally:
+                    os.close(fd)
+                return
+
+        yield from self._poll_changes()
+
+    # =========================================================================
+    # inotify backend
+    # =========================================================================
+    def _add_watch(self, libc, fd, wds, directory):
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), _WATCH_MASK)
+        if wd >= 0:
+            wds[wd] = directory
+
+    def _read_events(self, fd, wds, libc):
+        changed = set()
+        try:
+            buf = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        i = 0
+        while i + _EVENT_HEADER.size <= len(buf):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(buf, i)
+            i += _EVENT_HEADER.size
+            name = os.fsdecode(buf[i:i + length].rstrip(b'\0'))
+            i += length
+
+            if wd not in wds or not name:
+                continue
+            filename = os.path.join(wds[wd], name)
+
+            if mask & _IN_ISDIR:
+                if self._only is None and mask & (_IN_CREATE | _IN_MOVED_TO):
+                    for root, _, _ in os.walk(filename):
+                        self._add_watch(libc, fd, wds, root)
+            elif self._is_watched(filename):
+                changed.add(filename)
+
+        return changed
+
+    def _inotify_changes(self, libc, fd):
+        wds = {}
+        if self._only is not None:
+            self._add_watch(libc, fd, wds, self._root)
+        else:
+            for root, _, _ in os.walk(self._root):
+                self._add_watch(libc, fd, wds, root)
+
+        while True:
+            select.select([fd], [], [])
+            changed = self._read_events(fd, wds, libc)
+
+            # Debounce: keep collecting until events stop for a while
+            while True:
+                ready, _, _ = select.select([fd], [], [], self._debounce)
+                if not ready:
+                    break
+                changed |= self._read_events(fd, wds, libc)
+
+            if changed:
+                yield changed
+
+    # =========================================================================
+    # Polling backend
+    # =========================================================================
+    def _snapshot(self):
+        snapshot = {}
+        if self._only is not None:
+            files = [self._only]
+        else:
+            files = [os.path.join(root, name) for root, _, names in os.walk(self._root)
+                     for name in names
+                     if any(fnmatch(name, pattern) for pattern in VHDL_PATTERNS)]
+
+        for f in files:
+            try:
+                st = os.stat(f)
+            except OSError:
+                continue
+            snapshot[f] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def _diff(self, old, new):
+        return {f for f in old.keys() | new.keys() if old.get(f) != new.get(f)}
+
+    def _poll_changes(self):
+        snapshot = self._snapshot()
+        while True:
+            time.sleep(self._poll_interval)
+            current = self._snapshot()
+            changed = self._diff(snapshot, current)
+            snapshot = current
+
+            # Debounce: wait until the tree stops changing
+            while changed:
+                time.sleep(self._debounce)
+                current = self._snapshot()
+                more = self._diff(snapshot, current)
+                snapshot = current
+                if not more:
+                    break
+                changed |= more
+
+            if changed:
+                yield changed
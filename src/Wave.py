@@ -0,0 +1,384 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: Wave.py
+#
+#  Description: Implementation of the waveform helpers of the simulation
+#  flow: VHDL time values, time window trimming of VCD dumps, and the
+#  indexed VCD reader used by headless waveform queries.
+#
+# -----------------------------------------------------------------------------
+import os
+import re
+import json
+import bisect
+import shutil
+import tempfile
+
+WAVE_FORMATS = ('vcd', 'fst', 'ghw')
+
+# VHDL time units, in femtoseconds
+TIME_UNITS = {
+    'fs': 1,
+    'ps': 10 ** 3,
+    'ns': 10 ** 6,
+    'us': 10 ** 9,
+    'ms': 10 ** 12,
+    'sec': 10 ** 15,
+}
+
+_TIME_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(fs|ps|ns|us|ms|sec|s)\s*$')
+_TIMESCALE_RE = re.compile(rb'\$timescale\s+(\d+)\s*(fs|ps|ns|us|ms|s)\s+\$end')
+
+_BUFFER_SIZE = 1024 * 1024
+
+# Bytes of value changes between two time checkpoints of a VCD index
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+# Bump whenever the VCD index layout changes
+VCD_INDEX_VERSION = 1
+
+
+def parse_time(_text):
+    """
+    @brief Parse a VHDL time value such as "10 us" or "1.5ms"
+    @param _text Time value
+    @return Time in femtoseconds
+    @raise ValueError on an invalid time value
+    """
+    match = _TIME_RE.match(_text)
+    if match is None:
+        raise ValueError('Invalid time "' + _text + '", expected e.g. 10us or 1.5 ms')
+    unit = 'sec' if match.group(2) == 's' else match.group(2)
+    return int(round(float(match.group(1)) * TIME_UNITS[unit]))
+
+
+def format_time(_fs):
+    """ Time in femtoseconds as a GHDL time value, in the largest exact unit """
+    for unit in ('sec', 'ms', 'us', 'ns', 'ps'):
+        if _fs % TIME_UNITS[unit] == 0:
+            return str(_fs // TIME_UNITS[unit]) + unit
+    return str(_fs) + 'fs'
+
+
+def parse_window(_text):
+    """
+    @brief Parse a time window "T0:T1"
+    @return (start, end) in femtoseconds
+    @raise ValueError on an invalid or empty window
+    """
+    start, sep, end = _text.partition(':')
+    if not sep:
+        raise ValueError('Invalid window "' + _text + '", expected T0:T1')
+    start, end = parse_time(start), parse_time(end)
+    if end <= start:
+        raise ValueError('Empty window "' + _text + '"')
+    return start, end
+
+
+def format_size(_size):
+    """ Size in bytes, for humans """
+    if _size < 1024:
+        return str(_size) + ' B'
+    for unit in ('KB', 'MB', 'GB'):
+        _size /= 1024.0
+        if _size < 1024 or unit == 'GB':
+            return '{:.1f} {}'.format(_size, unit)
+
+
+def trim_vcd(_filename, _start):
+    """
+    @brief Drop the value changes of a VCD dump before time start, in one
+    streaming pass. The values of every signal at start are written as the
+    initial $dumpvars, so the trimmed dump shows the same waveforms from
+    start on.
+    @param _filename VCD file, replaced by the trimmed dump
+    @param _start Start time in femtoseconds
+    @return None
+    """
+    directory = os.path.dirname(_filename) or '.'
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.vcd.tmp')
+    try:
+        with open(_filename, 'rb') as src, os.fdopen(fd, 'wb') as dest:
+            # Header, up to the end of the definitions
+            header = []
+            for line in src:
+                header.append(line)
+                if line.startswith(b'$enddefinitions'):
+                    break
+            dest.writelines(header)
+
+            match = _TIMESCALE_RE.search(b''.join(header))
+            scale = 1
+            if match is not None:
+                unit = match.group(2).decode()
+                scale = int(match.group(1)) * TIME_UNITS['sec' if unit == 's' else unit]
+            start = _start // scale
+
+            # Last value of every signal up to start
+            values = {}
+            rest = None
+            for line in src:
+                c = line[:1]
+                if c == b'#':
+                    if int(line[1:]) > start:
+                        rest = line
+                        break
+                elif c and c in b'bBrR':
+                    value, _, ident = line.rstrip().partition(b' ')
+                    values[ident] = value + b' '
+                elif c and c not in b'$ \r\n':
+                    values[line[1:].rstrip()] = c
+
+            dest.write(b'#' + str(start).encode() + b'\n$dumpvars\n')
+            dest.writelines(value + ident + b'\n' for ident, value in values.items())
+            dest.write(b'$end\n')
+            if rest is not None:
+                dest.write(rest)
+                shutil.copyfileobj(src, dest, _BUFFER_SIZE)
+
+        os.replace(tmp, _filename)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _timescale(_header):
+    """ Femtoseconds per time unit of a VCD header """
+    match = _TIMESCALE_RE.search(_header)
+    if match is None:
+        return 1
+    unit = match.group(2).decode()
+    return int(match.group(1)) * TIME_UNITS['sec' if unit == 's' else unit]
+
+
+def _parse_scopes(_header):
+    """ Map of hierarchical signal name (top.sub.signal) to (id code, width) """
+    signals = {}
+    scopes = []
+    tokens = iter(_header.split())
+    for token in tokens:
+        if token == b'$scope':
+            next(tokens, None)
+            scopes.append(next(tokens, b'').decode(errors='replace'))
+        elif token == b'$upscope':
+            if scopes:
+                scopes.pop()
+        elif token == b'$var':
+            var = []
+            for token in tokens:
+                if token == b'$end':
+                    break
+                var.append(token.decode(errors='replace'))
+            if len(var) >= 4:
+                # $var type width id reference [bit range] $end
+                name = '.'.join(scopes + [var[3].split('[')[0]])
+                signals[name] = (var[2], int(var[1]))
+    return signals
+
+
+def _add_posting(_ranges, _block):
+    """ Add block to a list of [first, last] block ranges """
+    if _ranges and _ranges[-1][1] >= _block - 1:
+        _ranges[-1][1] = _block
+    else:
+        _ranges.append([_block, _block])
+
+
+class VCDIndex:
+    """
+    Random access to the value changes of a VCD dump. One streaming pass
+    splits the value changes into blocks of about block_size bytes, each
+    starting at a timestamp, and records the start time and offset of every
+    block and the blocks in which each signal changes. The index is kept in
+    a <dump>.idx sidecar file, rebuilt when the dump changes. A query then
+    only reads the blocks holding the changes it needs.
+    """
+    def __init__(self, filename, block_size=DEFAULT_BLOCK_SIZE):
+        self._filename = filename
+        self._path = filename + '.idx'
+        st = os.stat(filename)
+        self._stamp = [st.st_size, st.st_mtime_ns]
+        self._patterns = {}
+        if not self._load(block_size):
+            self._build(block_size)
+            self._save()
+
+    @property
+    def signals(self):
+        """ Map of hierarchical signal name to (id code, width) """
+        return self._signals
+
+    @property
+    def timescale(self):
+        """ Femtoseconds per time unit of the dump """
+        return self._scale
+
+    def _load(self, _block_size):
+        try:
+            with open(self._path) as f:
+                index = json.load(f)
+            if index['version'] != VCD_INDEX_VERSION or index['stamp'] != self._stamp or \
+               index['block_size'] != _block_size:
+                return False
+            self._scale = index['timescale']
+            self._signals = dict((name, tuple(signal))
+                                 for name, signal in index['signals'].items())
+            self._offsets = index['offsets']
+            self._times = index['times']
+            self._postings = index['postings']
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        self._block_size = _block_size
+        return True
+
+    def _save(self):
+        directory = os.path.dirname(self._path) or '.'
+        try:
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump({
+                        'version': VCD_INDEX_VERSION,
+                        'stamp': self._stamp,
+                        'block_size': self._block_size,
+                        'timescale': self._scale,
+                        'signals': self._signals,
+                        'offsets': self._offsets,
+                        'times': self._times,
+                        'postings': self._postings,
+                    }, f, separators=(',', ':'))
+                os.replace(tmp, self._path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError:
+            # A read-only directory only costs rebuilding the index next time
+            pass
+
+    def _build(self, _block_size):
+        self._block_size = _block_size
+        with open(self._filename, 'rb') as f:
+            header = []
+            for line in f:
+                header.append(line)
+                if line.startswith(b'$enddefinitions'):
+                    break
+            header = b''.join(header)
+            self._scale = _timescale(header)
+            self._signals = _parse_scopes(header)
+
+            offset = len(header)
+            self._offsets = [offset]
+            self._times = [0]
+            postings = {}
+            changed = set()
+            next_checkpoint = offset + _block_size
+
+            for line in f:
+                c = line[:1]
+                if c == b'#':
+                    if offset >= next_checkpoint:
+                        block = len(self._offsets) - 1
+                        for ident in changed:
+                            _add_posting(postings.setdefault(ident, []), block)
+                        changed.clear()
+                        self._offsets.append(offset)
+                        self._times.append(int(line[1:]))
+                        next_checkpoint = offset + _block_size
+                elif c in b'bBrR':
+                    if c:
+                        changed.add(line.rstrip().rpartition(b' ')[2])
+                elif c not in b'$ \r\n':
+                    changed.add(line[1:].rstrip())
+                offset += len(line)
+
+            block = len(self._offsets) - 1
+            for ident in changed:
+                _add_posting(postings.setdefault(ident, []), block)
+            self._offsets.append(offset)
+
+        self._postings = dict((ident.decode(errors='replace'), ranges)
+                              for ident, ranges in postings.items())
+
+    def _pattern(self, _ident):
+        """ Compiled regex of the value change lines of a signal id """
+        pattern = self._patterns.get(_ident)
+        if pattern is None:
+            pattern = re.compile(rb'^(?:([bBrR]\S*) |([^#$\s]))' + re.escape(_ident.encode()) +
+                                 rb'\r?$', re.M)
+            self._patterns[_ident] = pattern
+        return pattern
+
+    def _read_block(self, _block, _ident):
+        """ List of (time, value) changes of signal id in a block """
+        with open(self._filename, 'rb') as f:
+            f.seek(self._offsets[_block])
+            data = b'\n' + f.read(self._offsets[_block + 1] - self._offsets[_block])
+
+        # Find the lines of the signal, then the timestamp above each of them
+        changes = []
+        for match in self._pattern(_ident).finditer(data):
+            start = data.rfind(b'\n#', 0, match.start())
+            if start < 0:
+                time = self._times[_block]
+            else:
+                time = int(data[start + 2:data.index(b'\n', start + 2)])
+            changes.append((time, (match.group(1) or match.group(2)).decode()))
+        return changes
+
+    def _signal(self, _name):
+        name = _name.strip('/').replace('/', '.')
+        if name not in self._signals:
+            raise KeyError('Unknown signal "' + _name + '"')
+        return self._signals[name][0]
+
+    def _block_at(self, _time):
+        return max(0, bisect.bisect_right(self._times, _time) - 1)
+
+    def value(self, _name, _time):
+        """
+        @brief Value of a signal at a time, after the changes at that time
+        @param _name Hierarchical signal name, e.g. top.counter or /top/counter
+        @param _time Time in femtoseconds
+        @return Value as written in the dump (e.g. '1', 'b0101', 'r0.5'), or
+        None before the first value of the signal
+        @raise KeyError on an unknown signal
+        """
+        ident = self._signal(_name)
+        time = _time // self._scale
+        block = self._block_at(time)
+        ranges = self._postings.get(ident, [])
+
+        # Walk the blocks holding changes of the signal back from time
+        r = bisect.bisect_right([first for first, _ in ranges], block) - 1
+        while r >= 0:
+            first, last = ranges[r]
+            for b in range(min(last, block), first - 1, -1):
+                changes = [value for (t, value) in self._read_block(b, ident) if t <= time]
+                if changes:
+                    return changes[-1]
+            r -= 1
+        return None
+
+    def changes(self, _name, _start, _end):
+        """
+        @brief Changes of a signal from start to end, both included
+        @param _name Hierarchical signal name
+        @param _start Start time in femtoseconds
+        @param _end End time in femtoseconds
+        @return List of (time in femtoseconds, value)
+        @raise KeyError on an unknown signal
+        """
+        ident = self._signal(_name)
+        start, end = _start // self._scale, _end // self._scale
+        first_block, last_block = self._block_at(start), self._block_at(end)
+
+        changes = []
+        for first, last in self._postings.get(ident, []):
+            for b in range(max(first, first_block), min(last, last_block) + 1):
+                changes.extend((t * self._scale, value)
+                               for (t, value) in self._read_block(b, ident) if start <= t <= end)
+        return changes
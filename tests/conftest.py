@@ -0,0 +1,16 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: conftest.py
+#
+#  Description: pytest configuration. Tests import the turquoise modules as
+#  the "src" package, like __main__.py does.
+#
+# -----------------------------------------------------------------------------
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: test_build.py
+#
+#  Description: Tests of the dependency ordered GHDL analysis
+#
+# -----------------------------------------------------------------------------
+import time
+import threading
+import contextlib
+import io
+
+from src.Build import ghdl_files, run_ordered, library_lock
+
+
+class FakeResult:
+    def __init__(self):
+        self.returncode = 0
+        self.output = ''
+
+    @property
+    def ok(self):
+        return True
+
+
+class FakeRunner:
+    """ Runs nothing, but records how many commands overlapped """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.stages = []
+
+    def run(self, _stage, _argv, _env=None, _timeout=None):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.stages.append(_stage)
+        time.sleep(0.02)
+        with self._lock:
+            self.running -= 1
+        return FakeResult()
+
+
+def test_library_lock_per_workdir_and_library(tmp_path):
+    workdir = str(tmp_path)
+    assert library_lock(workdir) is library_lock(workdir + '/.')
+    assert library_lock(workdir) is library_lock(workdir, ['--work=WORK'])
+    assert library_lock(workdir) is not library_lock(workdir, ['--work=other'])
+
+
+def test_run_ordered_follows_dependencies():
+    # Listed against the build order: testbench, entity, package
+    filenames = ['top_tb.vhd', 'top.vhd', 'pkg.vhd', 'other.vhd']
+    deps = [{1, 2}, {2}, set(), set()]
+
+    for jobs in (1, 4):
+        lock = threading.Lock()
+        finished = []
+
+        def run(f):
+            time.sleep(0.01)
+            with lock:
+                finished.append(f)
+            return 0, f
+
+        results = list(run_ordered(filenames, deps, run, jobs))
+        assert all(result.ok for result in results)
+        assert sorted(result.filename for result in results) == sorted(filenames)
+        assert finished.index('pkg.vhd') < finished.index('top.vhd') < \
+            finished.index('top_tb.vhd')
+        assert [result.filename for result in results].index('top.vhd') < \
+            [result.filename for result in results].index('top_tb.vhd')
+
+
+def test_run_ordered_skips_dependents_of_failed_files():
+    filenames = ['top_tb.vhd', 'top.vhd', 'pkg.vhd']
+    deps = [{1}, {2}, set()]
+
+    def run(f):
+        return (1 if f == 'pkg.vhd' else 0), ''
+
+    results = dict((result.filename, result) for result in run_ordered(filenames, deps, run))
+    assert results['pkg.vhd'].returncode == 1
+    assert results['top.vhd'].failed_dependency == 'pkg.vhd'
+    assert results['top_tb.vhd'].failed_dependency == 'pkg.vhd'
+
+
+def test_analysis_into_one_library_is_serialized(tmp_path):
+    files = []
+    for k in range(6):
+        files.append(str(tmp_path / 'e{}.vhd'.format(k)))
+        with open(files[-1], 'w') as f:
+            f.write('entity e{0} is\nend e{0};\n'.format(k))
+
+    runner = FakeRunner()
+    with contextlib.redirect_stdout(io.StringIO()):
+        num_failed = ghdl_files('-a', files, runner, _jobs=4, _workdir=str(tmp_path))
+    assert num_failed == 0
+    assert len(runner.stages) == len(files)
+    assert runner.max_running == 1
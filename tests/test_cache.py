@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: test_cache.py
+#
+#  Description: Tests of the on-disk parse cache
+#
+# -----------------------------------------------------------------------------
+import os
+import time
+import pickle
+
+from src.Cache import ParseCache, TMP_MAX_AGE
+
+
+class Exploit:
+    def __reduce__(self):
+        return (os.system, ('touch pwned',))
+
+
+def test_round_trip(tmp_path):
+    cache = ParseCache(str(tmp_path), secret=b'k')
+    key = cache.key('a.vhd', [b'entity a is end;'], 'fast')
+    assert cache.get(key) is None
+    cache.put(key, ([1, 2], ['log']))
+    assert cache.get(key) == ([1, 2], ['log'])
+
+
+def test_rejects_unauthenticated_entries(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = ParseCache(str(tmp_path / 'cache'), secret=b'k')
+    key = cache.key('a.vhd', [b''], 'fast')
+    entry = cache._entry_path(key)
+    os.makedirs(os.path.dirname(entry))
+
+    # Written by someone without the secret: a plain pickle, or one with a
+    # MAC from another secret
+    with open(entry, 'wb') as f:
+        pickle.dump(Exploit(), f)
+    assert cache.get(key) is None
+    ParseCache(str(tmp_path / 'cache'), secret=b'other').put(key, Exploit())
+    assert cache.get(key) is None
+    assert not os.path.exists('pwned')
+
+
+def test_evict_keeps_young_tmp_files_and_is_rate_limited(tmp_path):
+    cache = ParseCache(str(tmp_path), max_size=0, secret=b'k')
+    for name in ('a', 'b'):
+        cache.put(cache.key(name, [b''], 'fast'), name)
+    entry_dir = os.path.dirname(cache._entry_path(cache.key('a', [b''], 'fast')))
+    young = os.path.join(entry_dir, 'young.tmp')
+    old = os.path.join(entry_dir, 'old.tmp')
+    for tmp in (young, old):
+        open(tmp, 'w').close()
+    os.utime(old, (time.time() - TMP_MAX_AGE - 1,) * 2)
+
+    cache.evict()
+    assert os.path.exists(young)
+    assert not os.path.exists(old)
+    assert cache.get(cache.key('a', [b''], 'fast')) is None
+
+    # A second eviction right away does nothing
+    cache.put(cache.key('c', [b''], 'fast'), 'c')
+    cache.evict()
+    assert cache.get(cache.key('c', [b''], 'fast')) == 'c'
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: test_explore.py
+#
+#  Description: Tests of the design space exploration, with the yosys and
+#  nextpnr-ice40 stand-ins of tests/tools
+#
+# -----------------------------------------------------------------------------
+import os
+import json
+
+from src.Explore import (parse_explore_spec, synth_variants, parse_nextpnr_log, explore,
+                         best_run, write_results)
+from src.Runner import StageRunner
+
+TOOLS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools')
+YOSYS = os.path.join(TOOLS, 'yosys')
+NEXTPNR = os.path.join(TOOLS, 'nextpnr-ice40')
+
+
+def test_parse_nextpnr_log_keeps_final_fmax():
+    output = ("Info: \t         ICESTORM_LC:    120/ 5280     2%\n"
+              "Info: Max frequency for clock 'clk': 40.00 MHz (PASS at 12.00 MHz)\n"
+              "Info: Max frequency for clock 'clk': 55.50 MHz (PASS at 12.00 MHz)\n")
+    assert parse_nextpnr_log(output) == (55.5, {'ICESTORM_LC': (120, 5280)})
+
+
+def test_explore_keeps_best_run(tmp_path):
+    runner = StageRunner(str(tmp_path / 'logs'))
+    seeds, flags = parse_explore_spec('seeds=3,abc9')
+
+    def synthesize(flags):
+        name = '+'.join(flags) or 'default'
+        netlist = str(tmp_path / (name + '.json'))
+        synth = ' '.join(['synth_ice40'] + ['-' + flag for flag in flags] + ['-json', netlist])
+        result = runner.run('yosys-' + name, [YOSYS, '-q', '-p', 'ghdl -e top; ' + synth])
+        return netlist, None if result.ok else 'yosys failed'
+
+    def route(flags, netlist, seed):
+        name = ('+'.join(flags) or 'default') + '-seed' + str(seed)
+        output = str(tmp_path / (name + '.asc'))
+        result = runner.run('nextpnr-' + name, [NEXTPNR, '--json', netlist, '--asc', output,
+                                                '--seed', str(seed)])
+        return output, result.output, None if result.ok else 'nextpnr failed', result.log
+
+    runs = explore(synth_variants(flags), seeds, synthesize, route, _jobs=4)
+    best = best_run(runs)
+    results = str(tmp_path / 'top-explore.json')
+    write_results(results, runs, best)
+
+    with open(results) as f:
+        table = json.load(f)
+    assert [(run['flags'], run['seed'], run['ok'], run['fmax_mhz']) for run in table['runs']] == [
+        ([], 1, True, 47.0), ([], 2, True, 54.0), ([], 3, False, None),
+        (['abc9'], 1, True, 52.0), (['abc9'], 2, True, 59.0), (['abc9'], 3, False, None),
+    ]
+    assert table['runs'][0]['utilization']['ICESTORM_LC'] == {'used': 101, 'total': 5280}
+    assert table['runs'][2]['error'] == 'nextpnr failed'
+
+    assert table['best']['flags'] == ['abc9'] and table['best']['seed'] == 2
+    with open(best.asc) as f:
+        assert f.read() == '.comment flags=abc9 seed=2\n'
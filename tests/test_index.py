@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: test_index.py
+#
+#  Description: Tests of the project symbol index
+#
+# -----------------------------------------------------------------------------
+import os
+
+from src.Index import SymbolIndex
+from src.Linter import parse_file
+
+LEAF = '''entity leaf is
+  port (a : in bit; y : out bit);
+end leaf;
+'''
+
+# Instantiates leaf directly
+TOP = '''entity top is
+  port (a : in bit; y : out bit);
+end top;
+architecture rtl of top is
+begin
+  u0 : entity work.leaf port map (a => a, y => y);
+end rtl;
+'''
+
+# Declares leaf as a component, and instantiates it
+MID = '''entity mid is
+  port (a : in bit; y : out bit);
+end mid;
+architecture rtl of mid is
+  component leaf
+    port (a : in bit; y : out bit);
+  end component;
+begin
+  u0 : leaf port map (a => a, y => y);
+end rtl;
+'''
+
+
+def _index(_index_path, _filenames):
+    index = SymbolIndex(_index_path)
+    index.update(dict((f, parse_file(f)) for f in _filenames))
+    return index
+
+
+def test_who_uses_finds_components_and_instances(tmp_path):
+    files = []
+    for name, source in (('leaf', LEAF), ('top', TOP), ('mid', MID)):
+        files.append(str(tmp_path / (name + '.vhd')))
+        with open(files[-1], 'w') as f:
+            f.write(source)
+
+    index = _index(str(tmp_path / 'index.sqlite'), files)
+    assert index.who_uses('leaf') == [
+        (files[2], 5, 3, 'rtl', 'mid'),
+        (files[1], 4, 1, 'rtl', 'top'),
+    ]
+    index.close()
+
+
+def test_paths_are_stored_resolved(tmp_path):
+    design = tmp_path / 'design'
+    design.mkdir()
+    with open(str(design / 'leaf.vhd'), 'w') as f:
+        f.write(LEAF)
+    os.symlink(str(design), str(tmp_path / 'link'))
+
+    index_path = str(tmp_path / 'index.sqlite')
+    _index(index_path, [str(tmp_path / 'link' / 'leaf.vhd')]).close()
+    index = _index(index_path, [str(design / 'leaf.vhd')])
+    real = os.path.realpath(str(design / 'leaf.vhd'))
+    assert index.find_entity('leaf') == [(real, 1, 1, 'entity', 'leaf')]
+    index.close()
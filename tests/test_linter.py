@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: test_linter.py
+#
+#  Description: Tests of the Linter class
+#
+# -----------------------------------------------------------------------------
+import contextlib
+import io
+import os
+
+from src.Linter import Linter
+from src.Logger import Logger
+
+ENTITY = '''entity foo is
+  port (a : in bit; b : out bit);
+end foo;
+'''
+
+ARCHITECTURE = '''architecture rtl of foo is
+begin
+  b <= a;
+end rtl;
+'''
+
+UNUSED_SIGNALS = '''entity e1 is
+  port (a : in bit);
+end e1;
+
+architecture rtl of e1 is
+  signal s : bit;
+begin
+end rtl;
+
+entity e2 is
+  port (a : in bit);
+end e2;
+
+architecture rtl of e2 is
+  signal s : bit;
+begin
+end rtl;
+'''
+
+
+def test_reports_identical_diagnostics_of_two_architectures(tmp_path):
+    design = tmp_path / 'design.vhd'
+    design.write_text(UNUSED_SIGNALS)
+
+    # The second path names the same file, which is linted only once
+    logger = Logger()
+    linter = Linter([str(design), os.path.join(str(tmp_path), '.', 'design.vhd')], logger)
+    with contextlib.redirect_stdout(io.StringIO()):
+        linter.lint()
+    messages = list(logger.messages())
+    assert len(messages) == 2
+    assert all('Signal "s" is declared but never used' in message for message in messages)
+
+
+def test_relint_checks_architecture_of_edited_entity(tmp_path):
+    entity, architecture = tmp_path / 'foo.vhd', tmp_path / 'foo_rtl.vhd'
+    entity.write_text(ENTITY)
+    architecture.write_text(ARCHITECTURE)
+
+    logger = Logger()
+    linter = Linter([str(entity), str(architecture)], logger)
+    with contextlib.redirect_stdout(io.StringIO()):
+        linter.lint()
+    assert list(logger.messages()) == []
+
+    # Dropping port b breaks the architecture, in a file that did not change
+    entity.write_text(ENTITY.replace('; b : out bit', ''))
+    logger = Logger()
+    with contextlib.redirect_stdout(io.StringIO()):
+        linter.relint([str(entity)], logger)
+    messages = list(logger.messages())
+    assert len(messages) == 1
+    assert str(architecture) in messages[0] and '"b"' in messages[0]
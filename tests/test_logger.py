@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: test_logger.py
+#
+#  Description: Tests of the Logger class
+#
+# -----------------------------------------------------------------------------
+from src.Logger import Logger
+from src.Messages import Severity
+
+
+def _error(_row, _message='Signal "a" is assigned but not declared'):
+    return (Severity.ERROR, 'signal', 'a.vhd', _row, 1, _message)
+
+
+def _warning(_message='Signal "s" is declared but never used'):
+    return (Severity.WARNING, 'unused-signal', 'a.vhd', 0, 0, _message)
+
+
+def test_keeps_identical_diagnostics():
+    # e.g. the same unused signal in the architectures of two entities
+    logger = Logger()
+    logger.add_record(_warning())
+    logger.add_record(_warning())
+
+    assert list(logger.records()) == [_warning(), _warning()]
+    assert logger.count(Severity.WARNING) == 2
+
+
+def test_limits_suppress_repeats():
+    logger = Logger(max_per_rule=2)
+    for row in range(1, 6):
+        logger.add_record(_error(row))
+    logger.add_suppressed_summary()
+
+    records = list(logger.records())
+    assert records[:2] == [_error(1), _error(2)]
+    assert len(records) == 3 and records[2][0] == Severity.INFO
+    assert 'Suppressed 3 more' in records[2][5]
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: test_runner.py
+#
+#  Description: Tests of the toolchain stage runner
+#
+# -----------------------------------------------------------------------------
+import os
+import sys
+import signal
+
+from src.Runner import StageRunner
+
+
+def test_log_paths_are_unique(tmp_path):
+    runner = StageRunner(str(tmp_path))
+    stages = ['ghdl -a a/b.vhd', 'ghdl -a a_b.vhd', 'ghdl_-a_a_b.vhd', 'ghdl -a a b.vhd']
+    paths = [runner.log_path(stage) for stage in stages]
+    assert len(set(paths)) == len(stages)
+    assert all(os.path.dirname(path) == str(tmp_path) for path in paths)
+    assert runner.log_path('yosys') == os.path.join(str(tmp_path), 'yosys.log')
+
+
+def test_run_captures_output(tmp_path):
+    runner = StageRunner(str(tmp_path))
+    result = runner.run('echo a/b', [sys.executable, '-c', 'print("hello")'])
+    assert result.ok and not result.timed_out
+    assert result.output == 'hello\n'
+    assert result.log == runner.log_path('echo a/b')
+
+
+def test_run_decodes_exit_status(tmp_path):
+    runner = StageRunner(str(tmp_path))
+    assert runner.run('exit', [sys.executable, '-c', 'exit(3)']).returncode == 3
+    result = runner.run('kill', [sys.executable, '-c',
+                                 'import os, signal; os.kill(os.getpid(), signal.SIGTERM)'])
+    assert result.returncode == -signal.SIGTERM and not result.ok
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: test_testbench.py
+#
+#  Description: Tests of the testbench regression runner
+#
+# -----------------------------------------------------------------------------
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+
+from src.Testbench import run_testbenches
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TESTBENCH = '''entity counter_tb is
+end counter_tb;
+architecture sim of counter_tb is
+begin
+end sim;
+'''
+
+
+class FakeResult:
+    def __init__(self):
+        self.returncode = 0
+        self.output = ''
+        self.wall = 0.0
+        self.log = None
+        self.timed_out = False
+
+    @property
+    def ok(self):
+        return True
+
+
+class FakeRunner:
+    """ Runs nothing, but records how many commands of each GHDL step overlapped """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = {'-e': 0, '-r': 0}
+        self.max_running = {'-e': 0, '-r': 0}
+
+    def run(self, _stage, _argv, _env=None, _timeout=None):
+        step = _argv[1]
+        with self._lock:
+            self.running[step] += 1
+            self.max_running[step] = max(self.max_running[step], self.running[step])
+        time.sleep(0.05)
+        with self._lock:
+            self.running[step] -= 1
+        return FakeResult()
+
+
+def test_elaboration_is_serialized_and_simulation_concurrent(tmp_path):
+    tests = [('t{}_tb'.format(k), 't{}_tb.vhd'.format(k)) for k in range(4)]
+    runner = FakeRunner()
+    results = run_testbenches(tests, runner, ['--workdir=' + str(tmp_path)], _jobs=4)
+    assert [result.status for result in results] == ['pass'] * len(tests)
+    assert runner.max_running['-e'] == 1
+    assert runner.max_running['-r'] > 1
+
+
+def test_passed_results_depend_on_timeout_and_libraries(tmp_path):
+    ghdl = tmp_path / 'dist' / 'fpga-toolchain' / 'bin' / 'ghdl'
+    os.makedirs(str(ghdl.parent))
+    os.symlink(os.path.join(ROOT, 'tests', 'tools', 'ghdl'), str(ghdl))
+    (tmp_path / 'counter_tb.vhd').write_text(TESTBENCH)
+    log = tmp_path / 'ghdl-argv.log'
+
+    def num_runs(*_args):
+        if log.exists():
+            log.unlink()
+        subprocess.run([sys.executable, os.path.join(ROOT, '__main__.py'), '--no-cache',
+                        '--test', 'counter_tb.vhd'] + list(_args), cwd=str(tmp_path),
+                       env=dict(os.environ, FAKE_GHDL_LOG=str(log)),
+                       stdout=subprocess.DEVNULL, check=True)
+        return sum(1 for line in log.read_text().splitlines() if json.loads(line)[0] == '-r')
+
+    libraries = ['--library-cache', str(tmp_path / 'libraries')]
+    assert num_runs(*libraries) == 1
+    assert num_runs(*libraries) == 0
+    assert num_runs('--test-timeout', '30', *libraries) == 1
+    assert num_runs('--test-timeout', '30', *libraries) == 0
+    assert num_runs('--test-timeout', '30', '--library-cache', str(tmp_path / 'other')) == 1
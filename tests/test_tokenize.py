@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: test_tokenize.py
+#
+#  Description: Tests of the streaming tokenizer backends
+#
+# -----------------------------------------------------------------------------
+import os
+import sys
+import resource
+import subprocess
+
+import pytest
+
+from src.Tokenize import Tokenize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Every kind of lexeme, with multi-character ones that a small chunk size
+# splits across chunks
+SOURCE = '''library ieee;
+use ieee.std_logic_1164.all;
+-- a comment spanning => several := delimiters
+entity \\odd name\\ is
+  generic (WIDTH : integer := 1_000; RATIO : real := 3.14);
+  port (a, b : in std_logic; y : out std_logic_vector(7 downto 0));
+end \\odd name\\;
+/* a block
+   comment */
+architecture rtl of \\odd name\\ is
+  signal s : std_logic := '0';
+  constant msg : string := "hello, world";
+begin
+  y <= (others => '1') when a /= b and s = '0' else (others => '0');
+  s <= '1' when WIDTH ** 2 >= 4 or WIDTH <= 2 else '0';
+end rtl;
+'''
+
+LARGE_FILE_SIZE = 256 * 1024 * 1024
+
+# Peak RSS of tokenizing LARGE_FILE_SIZE bytes, far below the file size
+MAX_RSS_MB = 64
+
+
+def _tokens(_filename, _backend, _chunk_size):
+    return [(t.value, t.kind, tuple(t.Start))
+            for t in Tokenize(_filename, _backend, _chunk_size).get_significant_token_iter()]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 4, 5, 7, 16])
+def test_tokens_across_chunk_boundaries(tmp_path, chunk_size):
+    filename = str(tmp_path / 'lexemes.vhd')
+    with open(filename, 'w') as f:
+        f.write(SOURCE)
+
+    reference = _tokens(filename, 'pyvhdlparser', 1 << 16)
+    assert _tokens(filename, 'fast', chunk_size) == reference
+    assert _tokens(filename, 'pyvhdlparser', chunk_size) == reference
+
+
+def test_large_file_in_bounded_memory(tmp_path):
+    filename = str(tmp_path / 'large.vhd')
+    line = '  s0 <= a and b; -- ' + 'x' * 1000 + '\n'
+    block = line * 1000
+    num_blocks = LARGE_FILE_SIZE // len(block)
+    with open(filename, 'w') as f:
+        for _ in range(num_blocks):
+            f.write(block)
+
+    code = ('import sys\n'
+            'from src.Tokenize import Tokenize\n'
+            'print(sum(1 for _ in Tokenize(sys.argv[1], "fast").get_significant_token_iter()))\n')
+    try:
+        result = subprocess.run([sys.executable, '-c', code, filename], cwd=ROOT,
+                                stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    finally:
+        os.remove(filename)
+    assert int(result.stdout) == 6 * 1000 * num_blocks
+
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    max_rss /= 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+    assert max_rss < MAX_RSS_MB
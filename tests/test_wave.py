@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+#  Turquoise - VHDL linter and compilation toolchain
+#  Copyright (c) 2020-2021: Turquoise team
+#
+#  File name: test_wave.py
+#
+#  Description: Tests of the waveform options of -w, with the ghdl and
+#  gtkwave stand-ins of tests/tools, and of the VCD helpers
+#
+# -----------------------------------------------------------------------------
+import os
+import sys
+import json
+import random
+import subprocess
+
+import pytest
+
+from src.Wave import VCDIndex, trim_vcd, parse_time, parse_window, format_time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS = os.path.join(ROOT, 'tests', 'tools')
+
+TOP = '''entity top is
+end top;
+architecture sim of top is
+begin
+end sim;
+'''
+
+VCD = '''$timescale 1ns $end
+$scope module top $end
+$var reg 1 ! clk $end
+$var reg 4 " count $end
+$var real 64 # level $end
+$upscope $end
+$enddefinitions $end
+#0
+$dumpvars
+0!
+b0 "
+r0 #
+$end
+#10
+1!
+b1 "
+#20
+0!
+r0.5 #
+#30
+1!
+b10 "
+#40
+0!
+'''
+
+# Hierarchical name -> id code. Id "a" is the end of ids "ba" and "ca".
+SIGNALS = {'top.a': 'a', 'top.ba': 'ba', 'top.sub.ca': 'ca', 'top.sub.level': '%'}
+
+PS = 10 ** 3
+
+
+def _write_vcd(_path, _seed, _steps=400):
+    """ Write a random dump with a 1 ps timescale, and return the changes of
+    every id as lists of (time in ps, value) """
+    rng = random.Random(_seed)
+    changes = dict((ident, []) for ident in SIGNALS.values())
+    lines = ['$timescale 1ps $end', '$scope module top $end',
+             '$var wire 1 a a $end', '$var wire 1 ba ba $end',
+             '$scope module sub $end', '$var wire 4 ca ca $end', '$var real 64 % level $end',
+             '$upscope $end', '$upscope $end', '$enddefinitions $end']
+    for step in range(_steps):
+        time = step * 3
+        lines.append('#' + str(time))
+        for ident in sorted(changes):
+            if step and rng.random() < 0.6:
+                continue
+            if ident == 'ca':
+                value = 'b' + format(rng.randrange(16), 'b')
+                lines.append(value + ' ' + ident)
+            elif ident == '%':
+                value = 'r' + str(rng.randrange(100) / 4)
+                lines.append(value + ' ' + ident)
+            else:
+                value = rng.choice('01xz')
+                lines.append(value + ident)
+            changes[ident].append((time, value))
+    _path.write_text('\n'.join(lines) + '\n')
+    return changes
+
+
+def _value_at(_changes, _time):
+    values = [value for time, value in _changes if time <= _time]
+    return values[-1] if values else None
+
+
+def _check_index(_index, _changes):
+    for name, ident in SIGNALS.items():
+        for time in range(0, 1200, 7):
+            assert _index.value(name, time * PS) == _value_at(_changes[ident], time)
+        for start, end in ((0, 1200), (100, 101), (301, 650), (1190, 1300)):
+            assert _index.changes('/' + name.replace('.', '/'), start * PS, end * PS) == \
+                [(time * PS, value) for time, value in _changes[ident] if start <= time <= end]
+
+
+def _turquoise(_tmp_path, *_args):
+    """ Run turquoise in _tmp_path with the stand-in tools, and return the
+    ghdl command lines """
+    for tool, path in (('ghdl', os.path.join('dist', 'fpga-toolchain', 'bin', 'ghdl')),
+                       ('gtkwave', os.path.join('dist', 'gtkwave', 'Contents', 'MacOS',
+                                                'gtkwave'))):
+        path = str(_tmp_path / path)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path))
+            os.symlink(os.path.join(TOOLS, tool), path)
+    (_tmp_path / 'top.vhd').write_text(TOP)
+
+    log = str(_tmp_path / 'ghdl-argv.log')
+    env = dict(os.environ, FAKE_GHDL_LOG=log)
+    subprocess.run([sys.executable, os.path.join(ROOT, '__main__.py'), '--no-cache',
+                    '--library-cache', str(_tmp_path / 'libraries')] + list(_args),
+                   cwd=str(_tmp_path), env=env, stdout=subprocess.DEVNULL, check=True)
+    with open(log) as f:
+        return [json.loads(line) for line in f]
+
+
+def _run_argv(_argvs):
+    return [argv for argv in _argvs if argv[0] == '-r'][-1]
+
+
+def test_wave_fst_dumps_selected_signals_until_stop_time(tmp_path):
+    (tmp_path / 'signals.opt').write_text('/top/*\n')
+    argv = _run_argv(_turquoise(tmp_path, '-w', 'top.vhd', 'top', '--wave-format', 'fst',
+                                '--signals', 'signals.opt', '--stop-time', '1000 ns'))
+    assert argv[-4:] == ['top', '--fst=top.fst', '--read-wave-opt=signals.opt',
+                         '--stop-time=1us']
+    assert any(arg.startswith('-P') for arg in argv)
+    assert os.path.getsize(str(tmp_path / 'top.fst')) == 64
+
+
+def test_wave_ghw_uses_wave_option(tmp_path):
+    argv = _run_argv(_turquoise(tmp_path, '-w', 'top.vhd', 'top', '--wave-format', 'ghw'))
+    assert argv[-2:] == ['top', '--wave=top.ghw']
+
+
+def test_wave_window_stops_and_trims_dump(tmp_path):
+    argv = _run_argv(_turquoise(tmp_path, '-w', 'top.vhd', 'top', '--window', '42ns:80ns'))
+    assert argv[-3:] == ['top', '--vcd=top.vcd', '--stop-time=80ns']
+
+    # At 42 ns, the clock last fell at 40 ns, and the counter last counted
+    # the rising edge at 35 ns
+    dump = (tmp_path / 'top.vcd').read_text()
+    body = dump[dump.index('$enddefinitions'):].splitlines()[1:]
+    assert body[:6] == ['#42', '$dumpvars', '0!', 'b100 "', '$end', '#45']
+    assert '#40' not in body
+
+
+def test_trim_vcd_writes_last_values_before_start(tmp_path):
+    dump = tmp_path / 'dump.vcd'
+    dump.write_text(VCD)
+    trim_vcd(str(dump), 25 * 10 ** 6)
+
+    text = dump.read_text()
+    header, _, body = text.partition('$enddefinitions $end\n')
+    assert header == VCD.partition('$enddefinitions $end\n')[0]
+    assert body == '#25\n$dumpvars\n0!\nb1 "\nr0.5 #\n$end\n#30\n1!\nb10 "\n#40\n0!\n'
+
+
+def test_parse_and_format_time():
+    assert parse_time('10us') == 10 ** 10
+    assert parse_time(' 1.5 ms ') == 15 * 10 ** 11
+    assert parse_time('2s') == 2 * 10 ** 15
+    assert format_time(15 * 10 ** 11) == '1500us'
+    assert format_time(1) == '1fs'
+    with pytest.raises(ValueError):
+        parse_time('10 parsecs')
+
+
+def test_parse_window():
+    assert parse_window('0ns:100ns') == (0, 10 ** 8)
+    assert parse_window('1ns:2ns') == (10 ** 6, 2 * 10 ** 6)
+    for window in ('100ns', '0:100ns', '2ns:1ns', '1ns:1ns'):
+        with pytest.raises(ValueError):
+            parse_window(window)
+
+
+def test_vcd_index_matches_scan(tmp_path):
+    dump = tmp_path / 'dump.vcd'
+    changes = _write_vcd(dump, 1)
+    index = VCDIndex(str(dump), block_size=256)
+    widths = {'a': 1, 'ba': 1, 'ca': 4, '%': 64}
+    assert index.signals == dict((name, (ident, widths[ident])) for name, ident in SIGNALS.items())
+    assert index.timescale == PS
+    _check_index(index, changes)
+    with pytest.raises(KeyError):
+        index.value('top.b', 0)
+
+
+def test_vcd_index_reloads_and_rebuilds(tmp_path, monkeypatch):
+    dump = tmp_path / 'dump.vcd'
+    changes = _write_vcd(dump, 1)
+    VCDIndex(str(dump), block_size=256)
+    assert os.path.isfile(str(dump) + '.idx')
+
+    # Unchanged dump: the sidecar index is used as is
+    def build(self, _block_size):
+        raise AssertionError('index rebuilt')
+    with monkeypatch.context() as m:
+        m.setattr(VCDIndex, '_build', build)
+        _check_index(VCDIndex(str(dump), block_size=256), changes)
+
+    # Modified dump: the index is rebuilt
+    changes = _write_vcd(dump, 2, _steps=350)
+    st = os.stat(str(dump))
+    os.utime(str(dump), ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    _check_index(VCDIndex(str(dump), block_size=256), changes)
+
+
+def test_wave_query(tmp_path):
+    dump = tmp_path / 'dump.vcd'
+    changes = _write_vcd(dump, 3)
+
+    def query(*_query):
+        result = subprocess.run([sys.executable, os.path.join(ROOT, '__main__.py'), '--no-cache',
+                                 '--wave-query', str(dump)] + list(_query),
+                                cwd=str(tmp_path), stdout=subprocess.PIPE, check=True)
+        return result.stdout.decode().splitlines()
+
+    assert query('signals') == ['top.a 1', 'top.ba 1', 'top.sub.ca 4', 'top.sub.level 64']
+    assert query('value', 'top.ba', '100ps') == [_value_at(changes['ba'], 100)]
+    assert query('changes', 'top/sub/ca', '30ps', '60ps') == \
+        ['{}ps {}'.format(time, value) for time, value in changes['ca'] if 30 <= time <= 60]